@@ -0,0 +1,63 @@
+"""
+Compare dense and sparse SORT association across scene densities.
+
+Usage (from the repository root):
+    python -m benchmarks.association_bench [--densities 10 50 150 300 600] [--repeats 20]
+"""
+import argparse
+import time
+import numpy as np
+
+from sort.sort import associate_detections_to_trackers, associate_detections_to_trackers_sparse
+
+
+def make_scene(n, rng, width=4000, height=3000, jitter=4.0, miss_rate=0.05):
+    """
+    Parking-lot style scene: n vehicle boxes on a loose grid, trackers are the same
+    boxes shifted by a little motion noise, a few detections missing and a few new.
+    """
+    cols = int(np.ceil(np.sqrt(n * width / height)))
+    gx, gy = np.meshgrid(np.arange(cols), np.arange(int(np.ceil(n / cols))))
+    cx = (gx.ravel()[:n] + 0.5) * width / cols + rng.normal(0, 10, n)
+    cy = (gy.ravel()[:n] + 0.5) * height / max(1, gy.shape[0]) + rng.normal(0, 10, n)
+    w = rng.uniform(80, 160, n)
+    h = w * rng.uniform(0.5, 0.8, n)
+    trks = np.stack([cx - w/2, cy - h/2, cx + w/2, cy + h/2], axis=1)
+
+    dets = trks + rng.normal(0, jitter, trks.shape)
+    dets = dets[rng.random(n) > miss_rate]
+    new = max(1, int(n * miss_rate))
+    nx, ny = rng.uniform(0, width, new), rng.uniform(0, height, new)
+    dets = np.concatenate([dets, np.stack([nx, ny, nx + 120, ny + 80], axis=1)])
+    dets = np.concatenate([dets, np.ones((len(dets), 1))], axis=1)
+    return dets, np.concatenate([trks, np.zeros((n, 1))], axis=1)
+
+
+def time_call(fn, dets, trks, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn(dets, trks, 0.3)
+        samples.append(time.perf_counter() - t0)
+    return np.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SORT association benchmark")
+    parser.add_argument("--densities", type=int, nargs="+", default=[10, 50, 150, 300, 600, 1200])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'objects':>8} {'dense ms':>10} {'sparse ms':>10} {'speedup':>8} {'same matches':>13}")
+    for n in args.densities:
+        dets, trks = make_scene(n, rng)
+        dense_ms, dense = time_call(associate_detections_to_trackers, dets, trks, args.repeats)
+        sparse_ms, sparse = time_call(associate_detections_to_trackers_sparse, dets, trks, args.repeats)
+        same = set(map(tuple, np.asarray(dense[0]).tolist())) == set(map(tuple, sparse[0].tolist()))
+        print(f"{n:>8} {dense_ms:>10.3f} {sparse_ms:>10.3f} {dense_ms / sparse_ms:>7.1f}x {str(same):>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Track fragmentation of SORT with and without timestamps when frames are skipped.
+
+Samples a synthetic scene with constant or irregular frame gaps (dropped frames, a
+detector that falls behind, keyframe mode) and feeds the sampled frames to each tracker
+backend twice: untimed (every update is one frame, as in the original SORT) and with
+the frames' capture timestamps. Reports the number of distinct track IDs; every extra
+ID is a fragment that costs its own plate detection, OCR and possibly a second alert.
+
+Usage (from the repository root):
+    python -m benchmarks.frame_gap_bench [--objects 30] [--frames 900] [--max-age 1]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.synthetic_scene import SceneConfig, synthetic_scene
+from sort.sort import TRACKER_BACKENDS, KalmanBoxTracker
+
+FPS = 25.0
+
+
+def sample(n_frames, gaps, rng):
+    """Frame indexes with gaps drawn from `gaps` (a list of frame steps)."""
+    idx = [0]
+    while True:
+        nxt = idx[-1] + int(rng.choice(gaps))
+        if nxt >= n_frames:
+            return idx
+        idx.append(nxt)
+
+
+def track_ids(tracker_cls, frames, idx, max_age, timed):
+    KalmanBoxTracker.count = 0
+    tracker = tracker_cls(max_age=max_age, frame_interval=1 / FPS)
+    ids = set()
+    for i in idx:
+        out = tracker.update(frames[i], timestamp=i / FPS if timed else None)
+        ids.update(int(row[4]) for row in out)
+    return len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SORT fragmentation under frame gaps")
+    parser.add_argument("--objects", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=900)
+    parser.add_argument("--speed", type=float, default=4.0)
+    parser.add_argument("--max-age", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = SceneConfig(num_objects=args.objects, frames=args.frames, speed=args.speed, seed=args.seed)
+    frames = list(synthetic_scene(config))
+    patterns = {
+        "every frame": [1],
+        "gap 3": [3],
+        "gap 1-6": [1, 2, 3, 4, 5, 6],
+        "mostly 1, bursts 4-6": [1, 1, 1, 4, 6],
+    }
+
+    print(f"{args.objects} objects, {args.frames} frames, max_age {args.max_age}: distinct track IDs")
+    print(f"{'gaps':<22} {'backend':<11} {'untimed':>8} {'timed':>7}")
+    for name, gaps in patterns.items():
+        idx = sample(len(frames), gaps, np.random.default_rng(args.seed))
+        for backend, cls in TRACKER_BACKENDS.items():
+            untimed = track_ids(cls, frames, idx, args.max_age, timed=False)
+            timed = track_ids(cls, frames, idx, args.max_age, timed=True)
+            print(f"{name:<22} {backend:<11} {untimed:>8} {timed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Check that utils.ocr_cache never answers a plate crop with a neighbouring plate's reading.
+
+Renders plates and every one-character neighbour of them (MH12AB1234 / MH12AB1284 ...)
+at several crop sizes and contrasts, stores the plate in an OCRCache and looks up each
+neighbour. Any hit is a collision: CameraWorker would store and alert on the wrong car.
+Also reports how often a re-render of the same plate with sensor noise hits (exact and
+near), which is what the cache is for.
+
+Exits with status 1 when the configuration under test has a collision.
+
+Usage (from the repository root):
+    python -m benchmarks.ocr_cache_check [--max-distance 0] [--noise 3] [--repeats 10]
+"""
+import argparse
+import sys
+
+import cv2
+import numpy as np
+
+from utils.ocr_cache import OCRCache, crop_hash, OCR_CACHE_MAX_DISTANCE
+
+PLATES = ["MH12AB1234", "KA05MN7788", "DL3CAF0420"]
+NEIGHBOURS = {"0": "8O", "1": "7I", "2": "Z7", "3": "8B", "4": "A1", "5": "6S", "6": "58", "7": "1T",
+              "8": "3B0", "9": "0", "A": "4H", "B": "83", "C": "G", "F": "E", "K": "X", "M": "N",
+              "N": "M", "H": "N"}
+SIZES = [(60, 14), (80, 18), (100, 22), (120, 28), (160, 36), (240, 54), (320, 72)]
+CONTRASTS = [(220, 30), (200, 60), (150, 110), (90, 60)]  # (background, text) grey levels
+
+
+def render(text, w, h, bg, fg, rng=None, noise=0.0):
+    """A plate as a camera would crop it: drawn at 4x and area-downscaled, optional noise."""
+    s = 4
+    img = np.full((h * s, w * s, 3), bg, np.uint8)
+    cv2.putText(img, text, (2 * s, int(h * s * 0.8)), cv2.FONT_HERSHEY_SIMPLEX, w * s / 230,
+                (fg, fg, fg), max(1, w * s // 150))
+    img = cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
+    if noise:
+        img = np.clip(img + rng.normal(0, noise, img.shape), 0, 255).astype(np.uint8)
+    return img
+
+
+def neighbours(plate):
+    for i, ch in enumerate(plate):
+        for other in NEIGHBOURS.get(ch, ""):
+            yield plate[:i] + other + plate[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR cache collision check")
+    parser.add_argument("--max-distance", type=int, default=OCR_CACHE_MAX_DISTANCE)
+    parser.add_argument("--noise", type=float, default=3.0, help="grey-level sigma of the re-renders")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    collisions = lookups = unkeyed = 0
+    hits = rereads = 0
+    print(f"max distance {args.max_distance}")
+    print(f"{'size':>8} {'contrast':>9} {'keyed':>6} {'collisions':>11} {'noisy hit rate':>15}")
+    for w, h in SIZES:
+        for bg, fg in CONTRASTS:
+            cache = OCRCache(max_distance=args.max_distance)
+            keyed = row_collisions = row_hits = 0
+            for plate in PLATES:
+                key = crop_hash(render(plate, w, h, bg, fg))
+                if key is None:
+                    unkeyed += 1
+                    continue
+                keyed += 1
+                cache.clear()
+                cache.put(key, plate)
+                for other in neighbours(plate):
+                    lookups += 1
+                    found = cache.get(crop_hash(render(other, w, h, bg, fg)))
+                    if found is not None:
+                        row_collisions += 1
+                        print(f"  collision: {other} answered as {found} at {w}x{h} bg {bg} fg {fg}")
+                for _ in range(args.repeats):
+                    rereads += 1
+                    if cache.get(crop_hash(render(plate, w, h, bg, fg, rng, args.noise))) == plate:
+                        row_hits += 1
+            collisions += row_collisions
+            hits += row_hits
+            rate = row_hits / (keyed * args.repeats) if keyed else 0.0
+            print(f"{w:>4}x{h:<3} {bg:>4}/{fg:<4} {keyed:>6} {row_collisions:>11} {rate:>14.0%}")
+
+    print(f"{lookups} neighbour lookups, {collisions} collisions; {unkeyed} crops not keyed; "
+          f"noisy re-renders hit {hits}/{rereads}")
+    sys.exit(1 if collisions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+OCR engine accuracy vs throughput on a labeled set of plate crops.
+
+Runs each engine (utils.ocr_engines: TrOCR, Tesseract, LPRNet ONNX) over a CSV with
+filepath,label columns (as written by make_dataset.py) in parallel worker processes and
+reports exact-match rate, character error rate, crops/sec and per-crop latency.
+Nothing is displayed; pass --debug-dir to keep the crops each engine got wrong.
+
+Usage (from the repository root):
+    python -m benchmarks.ocr_eval --csv OCR_DATASET/train.csv
+    python -m benchmarks.ocr_eval --engines trocr,lprnet --workers 4 --limit 500
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from utils.ocr_engines import ENGINES, clean_plate
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+_engine = None
+_engine_error = None
+
+
+def levenshtein(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def load_samples(csv_path, limit=None):
+    df = pd.read_csv(csv_path, dtype=str).dropna(subset=["filepath", "label"])
+    base = os.path.dirname(os.path.abspath(csv_path))
+    samples = []
+    for path, label in zip(df["filepath"], df["label"]):
+        if not os.path.exists(path):
+            path = os.path.join(base, path)
+        samples.append((path, clean_plate(label)))
+    return samples[:limit] if limit else samples
+
+
+def _init(engine_name, threads):
+    global _engine, _engine_error
+    from utils.ocr_engines import load_engine
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    try:
+        _engine = load_engine(engine_name)
+    except Exception as e:
+        # an exception in a pool initializer only surfaces as BrokenProcessPool; report it with the first chunk
+        _engine_error = e
+
+
+def _run_chunk(chunk):
+    """[(path, label)] -> [(prediction, seconds)], timed per crop inside the worker."""
+    if _engine_error is not None:
+        raise _engine_error
+    out = []
+    for path, _ in chunk:
+        crop = cv2.imread(path)
+        if crop is None:
+            out.append((None, 0.0))
+            continue
+        t0 = time.perf_counter()
+        try:
+            pred = clean_plate(_engine(crop))
+        except Exception as e:
+            print(f"⚠️ {path}: {e}")
+            pred = ""
+        out.append((pred, time.perf_counter() - t0))
+    return out
+
+
+def evaluate(engine_name, samples, workers, chunk_size=16):
+    if engine_name not in ENGINES:
+        raise ValueError(f"unknown engine, expected one of {', '.join(ENGINES)}")
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    chunks = [samples[i:i + chunk_size] for i in range(0, len(samples), chunk_size)]
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=_init,
+                             initargs=(engine_name, threads)) as pool:
+        # warm-up: model loading is not part of the throughput
+        list(pool.map(_run_chunk, [samples[:1]] * workers))
+        t0 = time.perf_counter()
+        results = [r for chunk in pool.map(_run_chunk, chunks) for r in chunk]
+        elapsed = time.perf_counter() - t0
+
+    scored = [(label, pred, sec) for (_, label), (pred, sec) in zip(samples, results) if pred is not None]
+    exact = sum(pred == label for label, pred, _ in scored)
+    edits = sum(levenshtein(pred, label) for label, pred, _ in scored)
+    chars = sum(len(label) for label, _, _ in scored)
+    ms = np.asarray([sec for _, _, sec in scored]) * 1000
+    report = {
+        "crops": len(scored),
+        "unreadable_files": len(results) - len(scored),
+        "exact_match": exact / len(scored) if scored else 0.0,
+        "cer": edits / chars if chars else 0.0,
+        "crops_per_sec": len(scored) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else 0.0,
+        "p95_ms": float(np.percentile(ms, 95)) if len(ms) else 0.0,
+        "elapsed_s": elapsed,
+    }
+    return report, [(path, label, pred) for (path, label), (pred, _) in zip(samples, results)]
+
+
+def dump_errors(debug_dir, engine_name, predictions):
+    out_dir = os.path.join(debug_dir, engine_name)
+    os.makedirs(out_dir, exist_ok=True)
+    for i, (path, label, pred) in enumerate(predictions):
+        if pred is None or pred == label:
+            continue
+        crop = cv2.imread(path)
+        cv2.imwrite(os.path.join(out_dir, f"{i:05d}_{label}_as_{pred or 'EMPTY'}.jpg"), crop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR engine accuracy vs throughput")
+    parser.add_argument("--csv", default=os.path.join("OCR_DATASET", "train.csv"))
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Comma separated subset of " + ",".join(ENGINES))
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--limit", type=int, help="Only the first N crops")
+    parser.add_argument("--debug-dir", help="Write the misread crops of each engine here")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/ocr-<timestamp>.json)")
+    args = parser.parse_args()
+
+    samples = load_samples(args.csv, args.limit)
+    print(f"🔍 {len(samples)} labeled crops from {args.csv}, {args.workers} workers per engine")
+
+    reports = {}
+    for name in [e.strip() for e in args.engines.split(",") if e.strip()]:
+        try:
+            report, predictions = evaluate(name, samples, args.workers)
+        except Exception as e:
+            print(f"⚠️ {name}: skipped ({e})")
+            continue
+        reports[name] = report
+        if args.debug_dir:
+            dump_errors(args.debug_dir, name, predictions)
+
+    print(f"{'engine':<10} {'crops':>6} {'exact':>7} {'CER':>7} {'crops/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, r in reports.items():
+        print(f"{name:<10} {r['crops']:>6} {r['exact_match']:>7.1%} {r['cer']:>7.3f} "
+              f"{r['crops_per_sec']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"ocr-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"created_at": datetime.now().isoformat(timespec="seconds"), "platform": platform.platform(),
+                   "config": vars(args), "engines": reports}, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+End-to-end CameraWorker benchmark on recorded footage.
+
+Drives the real camera pipeline (capture -> vehicle detection -> SORT -> plate detection
+-> best-frame OCR -> image write -> event bus -> DB / notification outbox) from a video file, an image
+directory or generated frames, with real or stub models. Everything it writes goes to a
+scratch directory, so it never touches the production database. The "emit" stage
+includes the OCR calls it triggers.
+
+Usage (from the repository root):
+    python -m benchmarks.pipeline_bench --source synthetic            # no files, no weights
+    python -m benchmarks.pipeline_bench --source clip.mp4 --pace realtime
+    python -m benchmarks.pipeline_bench --source frames/ --detector real --ocr real
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.tracker_bench import RESULTS_DIR
+from utils.metrics import metrics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BenchCamera:
+    def __init__(self, source, location="Bench"):
+        self.source = source
+        self.location = location
+
+    def getCamera(self):
+        return self.source
+
+    def getLocation(self):
+        return self.location
+
+
+class SyntheticCapture:
+    """Generated frames (textured background) for runs without any recorded footage."""
+
+    def __init__(self, frames, width, height, seed=0):
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(90, 160, (height, width, 3), dtype=np.uint8)
+        self.remaining = frames
+
+    def read(self):
+        if self.remaining <= 0:
+            return False, None
+        self.remaining -= 1
+        return True, self.background.copy()
+
+    def release(self):
+        self.remaining = 0
+
+
+class StageTimes:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, stage, fn):
+        samples = self.samples[stage]
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter_ns() - t0)
+        return timed
+
+    def summary(self):
+        out = {}
+        for stage, ns in self.samples.items():
+            if not ns:
+                continue
+            ms = np.asarray(ns) / 1e6
+            out[stage] = {
+                "count": int(len(ms)),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "total_s": float(ms.sum() / 1000),
+            }
+        return out
+
+
+def build_worker(args, times, bus):
+    from workers.CameraWorker import CameraWorker
+    from benchmarks.stubs import StubVehicleDetector, StubPlateDetector, make_stub_ocr
+
+    if args.detector == "stub":
+        vehicle_model = StubVehicleDetector(num_objects=args.vehicles, seed=args.seed, latency_ms=args.stub_detector_ms)
+        plate_model = StubPlateDetector(latency_ms=args.stub_detector_ms / 4)
+    else:
+        from ultralytics import YOLO
+        vehicle_model = YOLO(os.path.join(REPO_ROOT, "weights", "yolov8n.pt"), verbose=False)
+        plate_model = YOLO(os.path.join(REPO_ROOT, "weights", "LPR.pt"), verbose=False)
+
+    if args.ocr == "stub":
+        ocr_func = make_stub_ocr(latency_ms=args.stub_ocr_ms)
+    else:
+        from utils.util import ocr_plate, load_trocr
+        load_trocr()
+        ocr_func = ocr_plate
+
+    source = args.source
+    if source != "synthetic":
+        source = os.path.abspath(source)
+
+    class BenchCameraWorker(CameraWorker):
+        def open_capture(self):
+            if source == "synthetic":
+                cap = SyntheticCapture(args.frames, args.width, args.height, args.seed)
+            else:
+                cap = super().open_capture()
+            cap.read = times.wrap("capture", cap.read)
+            if args.detector == "stub" and args.keyframe_interval > 1:
+                # the synthetic vehicles move on every frame, not only on detector frames
+                read = cap.read
+
+                def read_and_render():
+                    ret, frame = read()
+                    if ret:
+                        vehicle_model.render(frame)
+                    return ret, frame
+                cap.read = read_and_render
+            return cap
+
+    worker = BenchCameraWorker(BenchCamera(source), None, times.wrap("ocr", ocr_func), bus,
+                               vehicle_model=times.wrap("vehicle_detect", vehicle_model),
+                               plate_model=times.wrap("plate_detect", plate_model),
+                               realtime=args.pace == "realtime",
+                               keyframe_interval=args.keyframe_interval, keyframe_refine=args.keyframe_refine)
+    worker.tracker.update = times.wrap("track", worker.tracker.update)
+    worker.tracker.propagate = times.wrap("propagate", worker.tracker.propagate)
+    worker.emit_consensus = times.wrap("emit", worker.emit_consensus)
+    return worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end camera pipeline benchmark")
+    parser.add_argument("--source", default="synthetic", help="Video file, image directory or 'synthetic'")
+    parser.add_argument("--pace", choices=["fast", "realtime"], default="fast")
+    parser.add_argument("--detector", choices=["stub", "real"], default="stub")
+    parser.add_argument("--ocr", choices=["stub", "real"], default="stub")
+    parser.add_argument("--frames", type=int, default=500, help="Frames to generate for --source synthetic")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--vehicles", type=int, default=8, help="Stub detector: simultaneous vehicles")
+    parser.add_argument("--stub-detector-ms", type=float, default=0.0, help="Simulated vehicle detector latency")
+    parser.add_argument("--stub-ocr-ms", type=float, default=0.0, help="Simulated OCR latency")
+    parser.add_argument("--keyframe-interval", type=int, default=1, help="Run the vehicle detector every Nth frame")
+    parser.add_argument("--keyframe-refine", choices=["flow", "none"], default="none",
+                        help="Refine propagated boxes with optical flow (stub frames have nothing to follow)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/pipeline-<timestamp>.json)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="autovision-bench-")
+    cwd = os.getcwd()
+    source = args.source if args.source == "synthetic" else os.path.abspath(args.source)
+    os.chdir(scratch)  # the image store writes under ./database
+    try:
+        from utils import db_helper
+        from utils.image_store import image_store
+        from utils.outbox import outbox
+        from utils.event_bus import EventBus, db_sink
+        db_helper.DB_PATH = os.path.join(scratch, "database", "autovision.db")
+        os.makedirs(os.path.dirname(db_helper.DB_PATH), exist_ok=True)
+        db_helper.init_db()
+
+        args.source = source
+        times = StageTimes()
+        bus = EventBus()
+        bus.add_sink("db", db_sink(outbox))
+        bus.start()
+        worker = build_worker(args, times, bus)
+
+        t0 = time.perf_counter()
+        worker.run()  # in the calling thread; returns at the end of the source
+        elapsed = time.perf_counter() - t0
+        bus.stop()            # drains the db sink
+        image_store.flush()  # JPEG writes are asynchronous
+
+        conn = sqlite3.connect(db_helper.DB_PATH)
+        rows = conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        notifications = conn.execute("SELECT COUNT(*) FROM detections WHERE processed=0").fetchone()[0]
+        conn.close()
+        images = sum(len(files) for _, _, files in os.walk(os.path.join(scratch, "database", "detections")))
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    frames = worker.frame_idx
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "frames": frames,
+        "elapsed_s": elapsed,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "stages": times.summary(),
+        "detections_rows": rows,
+        "images_written": images,
+        "notifications": notifications,
+        "metrics": metrics.snapshot(),
+    }
+
+    print(f"Frames: {frames} in {elapsed:.2f}s → {report['fps']:.1f} fps "
+          f"({args.detector} detector, {args.ocr} OCR, {args.pace} pacing)")
+    print(f"{'stage':<16} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>9}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<16} {s['count']:>7} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} "
+              f"{s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f} {s['total_s']:>9.2f}")
+    for name, s in report["metrics"]["stages"].items():
+        if name.split("/")[-1] in ("save_image", "sink_db", "sink_lag_db"):
+            print(f"{name.split('/')[-1]:<16} {s['count']:>7} {s['mean_ms']:>9.3f}")
+    print(f"Detections rows: {rows}   images: {images}   notifications: {report['notifications']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
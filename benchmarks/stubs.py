@@ -0,0 +1,117 @@
+"""
+Deterministic stand-ins for the YOLO detectors and TrOCR, so the camera pipeline can be
+benchmarked offline on a CPU-only box without model weights.
+
+The stub vehicle detector moves synthetic vehicles over whatever frames it is given
+(see benchmarks.synthetic_scene) and paints a plate patch on each one whose grey level
+encodes the vehicle's identity. The stub plate detector finds that patch and the stub
+OCR decodes it back into a plate string, so per-vehicle identities survive the real
+crop / track / vote / emit path.
+"""
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic_scene import SceneConfig, synthetic_scene
+
+PLATE_POOL = [f"MH{d:02d}AB{n:04d}" for d, n in zip(range(1, 100), range(1111, 9999, 97))]
+PLATE_W, PLATE_H = 0.5, 0.18  # plate patch size relative to the vehicle box
+
+
+class _Box:
+    """Mimics one ultralytics Boxes row: indexable cls, conf and xyxy tensors."""
+    __slots__ = ("cls", "conf", "xyxy")
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = np.asarray([xyxy], dtype=np.float32)
+        self.conf = np.asarray([conf], dtype=np.float32)
+        self.cls = np.asarray([cls], dtype=np.float32)
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def _plate_rect(x1, y1, x2, y2):
+    w, h = x2 - x1, y2 - y1
+    px1 = x1 + w * (1 - PLATE_W) / 2
+    py1 = y1 + h * (0.95 - PLATE_H)
+    return int(px1), int(py1), int(px1 + w * PLATE_W), int(py1 + h * PLATE_H)
+
+
+class StubVehicleDetector:
+    def __init__(self, num_objects=8, speed=3.0, occlusion_rate=0.01, seed=0, latency_ms=0.0):
+        self.config = dict(num_objects=num_objects, speed=speed, occlusion_rate=occlusion_rate,
+                           noise=0.01, false_positive_rate=0.0, seed=seed)
+        self.scene = None
+        self.latency_ms = latency_ms
+        self.rendered = (None, None)  # (frame, result) of the last render()
+
+    def __call__(self, frame, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.rendered[0] is frame:
+            return self.rendered[1]
+        return self.render(frame)
+
+    def render(self, frame):
+        """
+        Advance the scene by one frame and paint it. Benchmarks that skip detector calls
+        (keyframe mode) render every captured frame so the scene keeps moving; the detector
+        call on a rendered frame returns its boxes without advancing again.
+        """
+        h, w = frame.shape[:2]
+        if self.scene is None:
+            # one object id per synthetic vehicle, stable for the whole run
+            self.scene = synthetic_scene(SceneConfig(width=w, height=h, frames=10 ** 9, **self.config), with_ids=True)
+
+        dets, ids = next(self.scene)
+        boxes = []
+        for obj_id, (x1, y1, x2, y2, score) in zip(ids, dets):
+            x1, y1 = max(0, int(x1)), max(0, int(y1))
+            x2, y2 = min(w, int(x2)), min(h, int(y2))
+            if x2 - x1 < 20 or y2 - y1 < 20:
+                continue
+            px1, py1, px2, py2 = _plate_rect(x1, y1, x2, y2)
+            cv2.rectangle(frame, (px1, py1), (px2, py2), (0, 0, 0), -1)
+            cv2.rectangle(frame, (px1 + 2, py1 + 2), (px2 - 2, py2 - 2), (encode_id(int(obj_id)),) * 3, -1)
+            boxes.append(_Box([x1, y1, x2, y2], float(score), 2))  # class 2 = car
+        self.rendered = (frame, [_Result(boxes)])
+        return self.rendered[1]
+
+
+class StubPlateDetector:
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+
+    def __call__(self, crop, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        h, w = crop.shape[:2]
+        if h < 10 or w < 10:
+            return [_Result([])]
+        return [_Result([_Box(_plate_rect(0, 0, w, h), 0.8, 0)])]
+
+
+def encode_id(obj_id):
+    return 40 + 2 * (obj_id % 100)
+
+
+def decode_id(value):
+    return int(round((value - 40) / 2.0)) % 100
+
+
+def make_stub_ocr(latency_ms=0.0):
+    """Returns an ocr_func with the (plate, raw_text) contract of utils.util.ocr_plate."""
+    def stub_ocr(crop):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        h, w = crop.shape[:2]
+        centre = crop[h // 3: max(h // 3 + 1, 2 * h // 3), w // 3: max(w // 3 + 1, 2 * w // 3)]
+        if centre.size == 0:
+            return "", ""
+        plate = PLATE_POOL[decode_id(float(np.median(centre))) % len(PLATE_POOL)]
+        return plate, plate
+    return stub_ocr
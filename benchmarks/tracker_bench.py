@@ -0,0 +1,170 @@
+"""
+Reproducible SORT tracker benchmark.
+
+Runs every requested tracker backend / association method over deterministic synthetic
+scenes and over the MOT sequences bundled in sort/data, and reports per-frame update
+latency percentiles, tracks/sec and per-frame allocation churn. Results are written as JSON so
+runs can be compared across backends and commits.
+
+Usage (from the repository root):
+    python -m benchmarks.tracker_bench
+    python -m benchmarks.tracker_bench --objects 50 200 500 --backends vectorized
+    python -m benchmarks.tracker_bench --compare benchmarks/results/tracker-<before>.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic_scene import SceneConfig, synthetic_scene, mot_sequences
+from sort.sort import TRACKER_BACKENDS, ASSOCIATION_METHODS, KalmanBoxTracker
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def run_tracker(tracker_cls, association, frames, warmup=10):
+    """Feed frames through a fresh tracker; returns per-frame latencies (ns) and output rows."""
+    KalmanBoxTracker.count = 0
+    tracker = tracker_cls(association=association)
+    for dets in frames[:warmup]:
+        tracker.update(dets)
+
+    latencies = np.empty(len(frames) - warmup, dtype=np.int64)
+    rows = 0
+    for i, dets in enumerate(frames[warmup:]):
+        t0 = time.perf_counter_ns()
+        out = tracker.update(dets)
+        latencies[i] = time.perf_counter_ns() - t0
+        rows += len(out)
+    return latencies, rows
+
+
+def count_allocations(tracker_cls, association, frames):
+    """
+    Second, traced pass. tracemalloc does not count allocations, so churn is measured
+    per update() as its transient high-water mark: the traced memory peak during the
+    call above what was allocated before it.
+      transient_kib_per_frame  mean of that per update (allocation churn per frame)
+      peak_kib                 traced memory peak over the whole run
+      retained_blocks          blocks still allocated after the run that were not before
+                               (a run total; near zero for a leak-free tracker)
+    """
+    KalmanBoxTracker.count = 0
+    tracker = tracker_cls(association=association)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    transient = np.empty(len(frames))
+    peak = 0
+    for i, dets in enumerate(frames):
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        tracker.update(dets)
+        _, frame_peak = tracemalloc.get_traced_memory()
+        transient[i] = frame_peak - start
+        peak = max(peak, frame_peak)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    retained = sum(s.count_diff for s in stats if s.count_diff > 0)
+    return {"transient_kib_per_frame": float(transient.mean()) / 1024 if len(frames) else 0.0,
+            "peak_kib": peak / 1024, "retained_blocks": retained}
+
+
+def summarize(latencies, rows):
+    ms = latencies / 1e6
+    total = latencies.sum() / 1e9
+    return {
+        "frames": int(len(latencies)),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "fps": float(len(latencies) / total) if total else 0.0,
+        "tracks_per_sec": float(rows / total) if total else 0.0,
+    }
+
+
+def scenarios(args):
+    for n in args.objects:
+        config = SceneConfig(num_objects=n, frames=args.frames, speed=args.speed,
+                             occlusion_rate=args.occlusion_rate, noise=args.noise, seed=args.seed)
+        yield f"synthetic-{n}", config.to_dict(), list(synthetic_scene(config))
+    if not args.no_mot:
+        for seq, frames in mot_sequences(args.seq_path).items():
+            yield f"mot-{seq}", {"source": "det.txt"}, frames
+
+
+def compare(results, baseline_path, tolerance):
+    """Print per-case p50 ratios against a previous result file; returns True on regression."""
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["backend"], r["association"]): r for r in json.load(f)["results"]}
+    regressed = False
+    print(f"\nComparison against {baseline_path}")
+    for r in results:
+        key = (r["scenario"], r["backend"], r["association"])
+        if key not in baseline:
+            continue
+        ratio = r["p50_ms"] / baseline[key]["p50_ms"] if baseline[key]["p50_ms"] else 1.0
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        regressed |= bool(flag)
+        print(f"  {key[0]:<24} {key[1]:<11} {key[2]:<7} p50 x{ratio:.2f} {flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SORT tracker benchmark")
+    parser.add_argument("--backends", nargs="+", default=sorted(TRACKER_BACKENDS), choices=sorted(TRACKER_BACKENDS))
+    parser.add_argument("--associations", nargs="+", default=sorted(ASSOCIATION_METHODS), choices=sorted(ASSOCIATION_METHODS))
+    parser.add_argument("--objects", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--speed", type=float, default=4.0)
+    parser.add_argument("--occlusion-rate", type=float, default=0.02)
+    parser.add_argument("--noise", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seq-path", help="MOT root containing <phase>/<seq>/det/det.txt (default: sort/data)")
+    parser.add_argument("--no-mot", action="store_true", help="Skip the MOT det.txt replay")
+    parser.add_argument("--no-alloc", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/tracker-<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous result file to compare p50 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed p50 slowdown before flagging")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'scenario':<24} {'backend':<11} {'assoc':<7} {'p50 ms':>8} {'p99 ms':>8} {'fps':>8} {'tracks/s':>10} "
+          f"{'KiB/frame':>9} {'peak KiB':>9}")
+    for name, scene, frames in scenarios(args):
+        for backend in args.backends:
+            for association in args.associations:
+                latencies, rows = run_tracker(TRACKER_BACKENDS[backend], association, frames)
+                r = {"scenario": name, "scene": scene, "backend": backend, "association": association}
+                r.update(summarize(latencies, rows))
+                if not args.no_alloc:
+                    r.update(count_allocations(TRACKER_BACKENDS[backend], association, frames))
+                results.append(r)
+                print(f"{name:<24} {backend:<11} {association:<7} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} "
+                      f"{r['fps']:>8.0f} {r['tracks_per_sec']:>10.0f} "
+                      f"{r.get('transient_kib_per_frame', float('nan')):>9.1f} {r.get('peak_kib', float('nan')):>9.1f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"tracker-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
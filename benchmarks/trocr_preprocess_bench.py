@@ -0,0 +1,88 @@
+"""
+Compare TrOCR image preprocessing: TrOCRProcessor (PIL) vs utils.trocr_fast (OpenCV / NumPy).
+
+Renders synthetic plate crops of typical sizes, runs both paths over them at several
+batch sizes and reports crops/sec and the largest / mean difference of the pixel values
+in 1/255 steps. Only the image processor config is loaded, not the model weights.
+
+Usage (from the repository root):
+    python -m benchmarks.trocr_preprocess_bench [--crops 256] [--batches 1 8 32] [--repeats 5]
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.trocr_fast import TrOCRPreprocessor
+
+
+def make_crops(n, rng):
+    """Dark text on a light plate, 60-400 px wide, a few larger than the 384 px model input."""
+    crops = []
+    for _ in range(n):
+        w = int(rng.choice([rng.uniform(60, 380), rng.uniform(400, 700)], p=[0.85, 0.15]))
+        h = max(12, int(w / rng.uniform(3.0, 5.0)))
+        img = np.full((h, w, 3), rng.integers(170, 250), np.uint8)
+        text = "".join(rng.choice(list("ABCDEFGHJKLMNPRSTUVWXYZ0123456789"), 10))
+        cv2.putText(img, text, (2, h - max(2, h // 5)), cv2.FONT_HERSHEY_SIMPLEX, w / 260,
+                    tuple(int(c) for c in rng.integers(0, 60, 3)), max(1, w // 150))
+        crops.append(cv2.GaussianBlur(img, (3, 3), 0))
+    return crops
+
+
+def load_image_processor(name):
+    from transformers import AutoImageProcessor, ViTImageProcessor
+    try:
+        return AutoImageProcessor.from_pretrained(name)
+    except Exception as e:
+        print(f"⚠️ Could not load {name} ({e}); using TrOCR's default settings")
+        return ViTImageProcessor(size={"height": 384, "width": 384}, resample=2,
+                                 image_mean=[0.5, 0.5, 0.5], image_std=[0.5, 0.5, 0.5])
+
+
+def processor_path(image_processor, crops):
+    """What ocr_plate / ocr_images did per call."""
+    pil_imgs = [Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)) for img in crops]
+    return image_processor(images=pil_imgs, return_tensors="np").pixel_values
+
+
+def crops_per_sec(fn, crops, batch, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for i in range(0, len(crops), batch):
+            fn(crops[i:i + batch])
+        samples.append(time.perf_counter() - t0)
+    return len(crops) / np.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TrOCR preprocessing benchmark")
+    parser.add_argument("--model", default="microsoft/trocr-base-printed")
+    parser.add_argument("--crops", type=int, default=256)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    crops = make_crops(args.crops, np.random.default_rng(args.seed))
+    image_processor = load_image_processor(args.model)
+    fast = TrOCRPreprocessor.from_processor(image_processor)
+
+    diffs = [np.abs(processor_path(image_processor, [c]) - fast.fill([c])) * 127.5 for c in crops]
+    max_diff = max(float(d.max()) for d in diffs)
+    mean_diff = float(np.mean([d.mean() for d in diffs]))
+    print(f"{len(crops)} crops, difference in 1/255 steps: max {max_diff:.1f}, mean {mean_diff:.3f}")
+
+    print(f"{'batch':>6} {'processor/s':>12} {'fast/s':>10} {'speedup':>8}")
+    for batch in args.batches:
+        slow = crops_per_sec(lambda b: processor_path(image_processor, b), crops, batch, args.repeats)
+        quick = crops_per_sec(fast.fill, crops, batch, args.repeats)
+        print(f"{batch:>6} {slow:>12.1f} {quick:>10.1f} {quick / slow:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import cv2
 import numpy as np
 from telegram.ext import filters, ApplicationBuilder, CommandHandler, MessageHandler, ContextTypes
@@ -7,6 +8,8 @@ import io
 import dotenv
 dotenv.load_dotenv()
 import util as helper  # your util.py
+from utils.inference_batcher import InferenceBatcher, InferenceBusy
+from utils.ocr_cache import ocr_cache
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
@@ -15,6 +18,32 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+# Inference runs on one worker thread; concurrent uploads are micro-batched into
+# shared detector / OCR calls so the event loop keeps serving other users.
+batcher = InferenceBatcher(
+    helper.read_plates_batch,
+    max_batch=int(os.getenv("BOT_BATCH_SIZE", "8")),
+    max_wait=float(os.getenv("BOT_BATCH_WAIT_MS", "25")) / 1000,
+    max_pending=int(os.getenv("BOT_MAX_PENDING", "64")),
+    name="bot",
+)
+
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(f"📊 {ocr_cache.summary()}")
+
+
+def annotate(frame, plates):
+    """Draw every detected plate with its reading; returns JPEG bytes."""
+    out = frame.copy()
+    for box, _, text in plates:
+        x1, y1, x2, y2 = map(int, box[:4])
+        cv2.rectangle(out, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(out, text or "?", (x1, max(0, y1 - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    _, buffer = cv2.imencode(".jpg", out)
+    return buffer.tobytes()
+
+
 async def handle_image_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("✅ Image received, processing...")
 
@@ -23,34 +52,31 @@ async def handle_image_message(update: Update, context: ContextTypes.DEFAULT_TYP
     file = await photo.get_file()
     file_bytes = await file.download_as_bytearray()
 
-    # Convert to OpenCV image
+    # Convert to OpenCV image (off the event loop, large photos take a while to decode)
     npImg = np.frombuffer(file_bytes, np.uint8)
-    frame = cv2.imdecode(npImg, cv2.IMREAD_COLOR)
+    frame = await asyncio.to_thread(cv2.imdecode, npImg, cv2.IMREAD_COLOR)
 
     if frame is None:
         await update.message.reply_text("❌ Error reading the image.")
         return
 
-    # Detect plates
-    detections = helper.detect_plates(frame)
+    # Detect and read all plates
+    try:
+        plates = await batcher.submit(frame)
+    except InferenceBusy:
+        await update.message.reply_text("⏳ The bot is busy right now, please try again in a minute.")
+        return
 
-    if len(detections) == 0:
+    if len(plates) == 0:
         await update.message.reply_text("⚠️ No license plate detected.")
         return
 
-    # Process the first detected plate
-    box = detections[0]
-    plate_img = helper.crop_plate(frame, box)
-    plate_text = helper.ocr_image(plate_img)
-    corrected_plate = helper.correct_plate_simple(plate_text)
-
-    # Encode cropped plate to send back
-    _, buffer = cv2.imencode(".jpg", plate_img)
-    plate_bytes = io.BytesIO(buffer)
-
+    # Send the image back with every plate marked
+    image = await asyncio.to_thread(annotate, frame, plates)
+    readings = "\n".join(f"{i}. `{text or '?'}`" for i, (_, _, text) in enumerate(plates, 1))
     await update.message.reply_photo(
-        photo=InputFile(plate_bytes, filename="plate.jpg"),
-        caption=f"🔍 Detected Plate: `{corrected_plate}`",
+        photo=InputFile(io.BytesIO(image), filename="plates.jpg"),
+        caption=f"🔍 Detected Plates:\n{readings}",
         parse_mode="Markdown"
     )
 
@@ -58,10 +84,12 @@ async def handle_image_message(update: Update, context: ContextTypes.DEFAULT_TYP
 def main():
     token = os.getenv("TOKEN")
     print(token)# ⚠️ replace with your actual token
-    app = ApplicationBuilder().token(token).build()
+    # handle updates concurrently, otherwise one upload still holds up everyone else's
+    app = ApplicationBuilder().token(token).concurrent_updates(True).build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", start))
+    app.add_handler(CommandHandler("stats", stats))
     app.add_handler(MessageHandler(filters.PHOTO, handle_image_message))
 
     print("🚀 Bot started...")
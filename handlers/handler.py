@@ -5,6 +5,15 @@ import sqlite3
 from telegram import Update
 from telegram.ext import *
 
+from utils.metrics import metrics
+from utils.profiler import profiler
+
+
+def is_admin(chat_id: int) -> bool:
+    """Admins are listed in ADMIN_CHAT_IDS (comma separated chat ids)."""
+    admins = {a.strip() for a in os.getenv("ADMIN_CHAT_IDS", "").split(",") if a.strip()}
+    return str(chat_id) in admins
+
 
 def check_for_chatID(chat_id: int) -> bool:
     db_path = os.path.join(os.getcwd(), "database", "autovision.db")
@@ -87,6 +96,7 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• /add <code>plate_no</code> [plate_no2 …] — Register one or more plates\n"
         "• /list — See all your registered plates\n"
         "• /remove <code>plate_no</code> [plate_no2 …] — Stop tracking plates\n"
+        "• /digest <code>seconds</code> — Bundle alerts within a time window (/digest off to undo)\n"
         "• /stop — Unregister yourself and all your plates\n\n"
         "Start by registering your first car with\n /add! usage /add plate_no"
     )
@@ -298,3 +308,85 @@ async def search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
     finally:
         conn.close()
+
+async def metrics_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_chat.id):
+        await update.effective_message.reply_text("⛔ This command is only available to admins.")
+        return
+
+    text = metrics.summary()
+    # Telegram caps messages at 4096 characters
+    for i in range(0, len(text), 4000):
+        await update.effective_message.reply_text(text[i:i + 4000])
+
+async def profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_chat.id):
+        await update.effective_message.reply_text("⛔ This command is only available to admins.")
+        return
+
+    # Usage: /profile [seconds]
+    try:
+        seconds = int(context.args[0]) if context.args else 30
+    except ValueError:
+        await update.effective_message.reply_text("Usage: /profile [seconds]")
+        return
+    seconds = max(1, min(seconds, 600))
+
+    out_dir = profiler.start(seconds)
+    if out_dir is None:
+        await update.effective_message.reply_text("⏳ A profiling session is already running.")
+        return
+    await update.effective_message.reply_text(
+        f"🔬 Profiling camera and notification threads for {seconds}s.\n"
+        f"Results (pstats, collapsed stacks, tracemalloc diff) will be in:\n{out_dir}"
+    )
+
+MAX_DIGEST_SECONDS = 3600
+
+async def digest_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    if not check_for_chatID(chat_id):
+        await update.effective_message.reply_text("Please /register first.")
+        return
+
+    db_path = os.path.join(os.getcwd(), "database", "autovision.db")
+    conn = sqlite3.connect(db_path)
+    try:
+        # Usage: /digest [seconds|off]
+        if not context.args:
+            row = conn.execute("SELECT digest_seconds FROM users WHERE chat_id = ?", (chat_id,)).fetchone()
+            seconds = (row[0] or 0) if row else 0
+            if seconds:
+                await update.effective_message.reply_text(
+                    f"📦 Digest mode is on: alerts within {seconds}s are sent together.\n"
+                    "Use /digest off to get every alert right away."
+                )
+            else:
+                await update.effective_message.reply_text(
+                    "🔔 Every alert is sent right away.\n"
+                    "Use /digest <seconds> to bundle alerts into one message."
+                )
+            return
+
+        arg = context.args[0].lower()
+        try:
+            seconds = 0 if arg in ("off", "0") else int(arg)
+        except ValueError:
+            await update.effective_message.reply_text("Usage: /digest [seconds|off]")
+            return
+        seconds = max(0, min(seconds, MAX_DIGEST_SECONDS))
+
+        conn.execute("UPDATE users SET digest_seconds = ? WHERE chat_id = ?", (seconds, chat_id))
+        conn.commit()
+        if seconds:
+            await update.effective_message.reply_text(
+                f"📦 Alerts within {seconds}s will now be bundled into one message (up to 10 photos)."
+            )
+        else:
+            await update.effective_message.reply_text("🔔 Digest mode is off. Every alert is sent right away.")
+
+    except Exception as e:
+        print("DB Error in digest_handler:", e)
+        await update.effective_message.reply_text("⚠️ There was an error while saving your digest setting.")
+    finally:
+        conn.close()
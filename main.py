@@ -1,12 +1,18 @@
 import os
-from queue import Queue
+import signal
 from telegram.ext import ApplicationBuilder, CommandHandler
 from utils.db_helper import init_db
-from utils.util import ocr_plate
+from utils.util import ocr_plate, load_trocr
 from workers.CameraWorker import CameraWorker
 from workers.NotificationWorker import NotificationWorker
+from workers.RetentionWorker import RetentionWorker
 import dotenv
-from handlers.handler import start_handler, stop_handler, list_handler, add_handler, remove_handler, search_handler, register_handler
+from handlers.handler import start_handler, stop_handler, list_handler, add_handler, remove_handler, search_handler, register_handler, metrics_handler, profile_handler, digest_handler
+from utils.metrics import metrics, start_metrics_server
+from utils.profiler import profiler
+from utils.image_store import image_store
+from utils.outbox import outbox
+from utils.event_bus import EventBus, db_sink, jsonl_sink, webhook_sink, BLOCK, DROP_OLDEST, COALESCE
 import warnings
 import logging
 logging.getLogger("ultralytics").setLevel(logging.CRITICAL)
@@ -27,6 +33,8 @@ class Camera:
 def main():
     print("Checking Database...")
     init_db()
+    print("Loading OCR model...")
+    load_trocr()
     token = os.getenv("TOKEN")
     app = ApplicationBuilder().token(token).build()
     bot = app.bot
@@ -39,16 +47,46 @@ def main():
     app.add_handler(CommandHandler("add",add_handler))
     app.add_handler(CommandHandler("remove",remove_handler))
     app.add_handler(CommandHandler("search",search_handler))
+    app.add_handler(CommandHandler("metrics",metrics_handler))
+    app.add_handler(CommandHandler("profile",profile_handler))
+    app.add_handler(CommandHandler("digest",digest_handler))
 
-    notify_queue = Queue()
-    notifier = NotificationWorker(notify_queue, bot)
+    metrics.gauge("outbox_pending", outbox.pending_count)
+
+    metrics_port = int(os.getenv("METRICS_PORT", "9108"))
+    if metrics_port:
+        start_metrics_server(metrics_port)
+        print(f"Metrics on http://127.0.0.1:{metrics_port}/metrics")
+
+    # `kill -USR1 <pid>` profiles the running service for PROFILE_SECONDS
+    if hasattr(signal, "SIGUSR1"):
+        profile_seconds = int(os.getenv("PROFILE_SECONDS", "30"))
+        signal.signal(signal.SIGUSR1, lambda *_: profiler.start(profile_seconds))
+
+    notifier = NotificationWorker(outbox, bot)
     notifier.start()
 
+    # Detection events fan out to independent sinks, each with its own bounded queue
+    bus = EventBus()
+    # a stuck database must not stall the cameras: when the db queue is full an event goes
+    # straight to a local spill journal that the db sink replays once it has caught up
+    bus.add_sink("db", db_sink(outbox), capacity=int(os.getenv("EVENT_DB_QUEUE", "10000")), policy=BLOCK,
+                 block_timeout=float(os.getenv("EVENT_DB_BLOCK_TIMEOUT", "0")),
+                 spill_path=os.getenv("EVENT_DB_SPILL", os.path.join("database", "event_spill.jsonl")))
+    if os.getenv("EVENT_LOG_PATH"):
+        bus.add_sink("file", jsonl_sink(os.getenv("EVENT_LOG_PATH")), capacity=1000, policy=DROP_OLDEST)
+    if os.getenv("EVENT_WEBHOOK_URL"):
+        bus.add_sink("webhook", webhook_sink(os.getenv("EVENT_WEBHOOK_URL")), capacity=1000, policy=COALESCE)
+    bus.start()
+
+    retention = RetentionWorker()
+    retention.start()
+
     cameras = [Camera(0,"Gate 1")]
     workers = []
 
     for cam in cameras:
-        worker = CameraWorker(cam, "weights/LPR.pt", ocr_plate, notify_queue)
+        worker = CameraWorker(cam, "weights/LPR.pt", ocr_plate, bus)
         worker.start()
         workers.append(worker)
 
@@ -58,7 +96,12 @@ def main():
     # Cleanup
     for w in workers:
         w.stop()
+    for w in workers:
+        w.join()
+    bus.stop()
     notifier.stop()
+    retention.stop()
+    image_store.close()
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,16 @@
 import os
+import csv
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
-import re
-import pandas as pd
 import numpy as np
+import pandas as pd
 import onnxruntime as ort
 
+from utils.ocr_engines import clean_plate, ctc_greedy_decode, lprnet_preprocess
+
 # -----------------------
 # Paths
 # -----------------------
@@ -13,86 +19,132 @@ CSV_FILE_PATH = "OCR_DATASET/train.csv"
 ONNX_MODEL_PATH = "us_lprnet_baseline18_deployable.onnx"
 
 # -----------------------
-# Reset CSV if exists
+# Pipeline settings
 # -----------------------
-if os.path.exists(CSV_FILE_PATH):
-    os.remove(CSV_FILE_PATH)
-    print("🗑️ Old CSV deleted.")
+# Images are decoded and preprocessed on a thread pool (cv2 releases the GIL) a few
+# batches ahead of inference; rows are appended to the CSV after every batch, so the
+# CSV doubles as the checkpoint and a rerun only labels images not in it yet.
+BATCH_SIZE = 64
+PREFETCH_BATCHES = 4
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
 
-# -----------------------
-# Character set
-# -----------------------
-characters = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 
 # -----------------------
 # Helper functions
 # -----------------------
-def clean_plate(text: str) -> str:
-    """Keep only alphanumeric, uppercase."""
-    text = text.replace(" ", "").upper()
-    return "".join(re.findall(r"[A-Z0-9]", text))
-
-def preprocess(img):
-    """Resize, normalize, and convert to CHW for ONNX input."""
-    img_resized = cv2.resize(img, (96, 48))
-    img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
-    img_norm = img_rgb.astype(np.float32) / 255.0
-    img_chw = np.transpose(img_norm, (2,0,1))
-    return np.expand_dims(img_chw, axis=0)
-
-def decode(output, characters):
-    """
-    Decode LPRNet ONNX output.
-    Assumes output shape: [1, seq_len] → class indices directly.
-    """
-    pred = output[0]  # already class indices
-    plate = ""
-    last_char = -1
-    for c in pred:
-        if c != last_char and c != 0:  # collapse repeated + skip blank
-            plate += characters[c-1]
-        last_char = c
-    return plate
+def list_images(images_dir):
+    return [
+        os.path.join(images_dir, f).replace("\\", "/")
+        for f in sorted(os.listdir(images_dir))
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    ]
 
-# -----------------------
-# Load ONNX model
-# -----------------------
-session = ort.InferenceSession(ONNX_MODEL_PATH)
-input_name = session.get_inputs()[0].name
 
-# -----------------------
-# Process images
-# -----------------------
-rows = []
-for f in sorted(os.listdir(CROPPED_IMAGES_DIR)):
-    if not f.lower().endswith((".jpg", ".jpeg", ".png")):
-        continue
+def drop_torn_line(csv_path):
+    """A crash mid-write can leave a partial last line; cut it so appends start on a fresh line."""
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        return
+    with open(csv_path, "rb+") as f:
+        data = f.read()
+        if not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
 
-    path = os.path.join(CROPPED_IMAGES_DIR, f).replace("\\", "/")
-    print(f"🔍 Processing {f}...")
+def labelled_paths(csv_path):
+    """Image paths already in the CSV."""
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        return set()
+    df = pd.read_csv(csv_path, dtype=str).dropna(subset=["filepath"])  # labels may be empty
+    return set(df["filepath"]) if "filepath" in df else set()
 
+
+def load_and_preprocess(path):
     img = cv2.imread(path)
     if img is None:
-        print(f"⚠️ Skipped {f}, could not read image.")
-        continue
+        return path, None
+    return path, lprnet_preprocess(img)[0]
+
+
+def model_batch_size(session, requested):
+    """Exports with a fixed batch dimension (often 1) only accept that many images per run."""
+    dim = session.get_inputs()[0].shape[0]
+    if isinstance(dim, int) and dim > 0:
+        return min(requested, dim)
+    return requested
 
-    # Preprocess
-    pre_img = preprocess(img)
 
-    # Run inference
-    outputs = session.run(None, {input_name: pre_img})
-    print(f"Output shape: {outputs[0].shape}")  # for debugging
+def preprocessed_batches(paths, batch_size, pool):
+    """Yield lists of (path, CHW array or None) with PREFETCH_BATCHES batches in flight."""
+    chunks = (paths[i:i + batch_size] for i in range(0, len(paths), batch_size))
+    in_flight = deque()
+    for chunk in chunks:
+        in_flight.append([pool.submit(load_and_preprocess, p) for p in chunk])
+        if len(in_flight) > PREFETCH_BATCHES:
+            yield [f.result() for f in in_flight.popleft()]
+    while in_flight:
+        yield [f.result() for f in in_flight.popleft()]
 
-    # Decode prediction
-    plate_text = decode(outputs[0], characters)
-    plate_text = clean_plate(plate_text)
 
-    print(f"✅ Detected: {plate_text}")
-    rows.append({"filepath": path, "label": plate_text})
+def run_batch(session, input_name, arrays, max_batch):
+    out = []
+    for i in range(0, len(arrays), max_batch):
+        batch = np.stack(arrays[i:i + max_batch])
+        out.extend(ctc_greedy_decode(session.run(None, {input_name: batch})[0]))
+    return out
+
 
 # -----------------------
-# Save CSV
+# Build
 # -----------------------
-df = pd.DataFrame(rows)
-df.to_csv(CSV_FILE_PATH, index=False)
-print(f"🎉 New CSV generated with {len(df)} records → {CSV_FILE_PATH}")
+def build(images_dir=CROPPED_IMAGES_DIR, csv_path=CSV_FILE_PATH, model_path=ONNX_MODEL_PATH,
+          batch_size=BATCH_SIZE, workers=None, fresh=False):
+    if fresh and os.path.exists(csv_path):
+        os.remove(csv_path)
+        print("🗑️ Old CSV deleted.")
+
+    drop_torn_line(csv_path)
+    paths = list_images(images_dir)
+    done = labelled_paths(csv_path)
+    todo = [p for p in paths if p not in done]
+    print(f"🔍 {len(paths)} images, {len(done)} already labelled, {len(todo)} to go")
+    if not todo:
+        return 0
+
+    session = ort.InferenceSession(model_path)
+    input_name = session.get_inputs()[0].name
+    max_batch = model_batch_size(session, batch_size)
+
+    os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+    write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    written = 0
+    with open(csv_path, "a", newline="") as f, ThreadPoolExecutor(workers or os.cpu_count()) as pool:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(["filepath", "label"])
+        for batch in preprocessed_batches(todo, batch_size, pool):
+            readable = [(p, a) for p, a in batch if a is not None]
+            for p, a in batch:
+                if a is None:
+                    print(f"⚠️ Skipped {p}, could not read image.")
+            if not readable:
+                continue
+            texts = run_batch(session, input_name, [a for _, a in readable], max_batch)
+            writer.writerows((p, clean_plate(t)) for (p, _), t in zip(readable, texts))
+            f.flush()  # checkpoint: everything above this line survives a crash
+            written += len(readable)
+            print(f"✅ {written}/{len(todo)} labelled")
+
+    print(f"🎉 CSV updated with {written} new records → {csv_path}")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Label cropped plates with LPRNet into a CSV")
+    parser.add_argument("--images", default=CROPPED_IMAGES_DIR)
+    parser.add_argument("--csv", default=CSV_FILE_PATH)
+    parser.add_argument("--model", default=ONNX_MODEL_PATH)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, help="Decode threads (default: CPU count)")
+    parser.add_argument("--fresh", action="store_true", help="Delete the existing CSV and relabel everything")
+    args = parser.parse_args()
+    build(args.images, args.csv, args.model, args.batch_size, args.workers, args.fresh)
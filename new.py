@@ -4,7 +4,7 @@ import numpy as np
 from ultralytics import YOLO
 import torch
 import pytesseract
-import re
+from utils.plate_grammar import normalize as normalize_plate
 
 # --- Torch override fix ---
 orig_load = torch.load
@@ -38,11 +38,10 @@ def read_license_plate(crop):
         text = pytesseract.image_to_string(crop, config=config)
         text = text.strip().replace(" ", "").replace("\n", "")
 
-        # Apply regex filtering for Indian number plates (basic cleanup)
-        pattern = r"[A-Z]{2}[0-9]{1,2}[A-Z]{1,2}[0-9]{3,4}"
-        match = re.search(pattern, text.upper())
-        if match:
-            return match.group(), 1.0
+        # Look for a valid plate in the text (utils.plate_grammar fixes common confusions)
+        match = normalize_plate(text, search=True)
+        if match.format:
+            return match.plate, match.score
         elif len(text) > 0:
             return text.upper(), 0.5  # low confidence
         else:
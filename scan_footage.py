@@ -0,0 +1,312 @@
+"""
+Offline scan of recorded footage.
+
+Splits every video into time segments and processes them in parallel worker processes.
+In each worker a reader thread decodes ahead of inference, every --stride-th frame goes
+through batched vehicle and plate detection, SORT tracking and best-frame OCR voting (the
+same steps as CameraWorker), and the plates found are stored in `detections` with the
+time they appear in the footage. Finished segments are recorded in the database together
+with their rows, so an interrupted scan resumes where it stopped.
+
+Usage:
+    python scan_footage.py recordings/ --workers 8 --stride 2
+    python scan_footage.py gate1.mp4 --start-time "2026-03-01 18:00:00" --plate MH12AB1234
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from queue import Queue
+
+import cv2
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".ts", ".mpg")
+VEHICLE_CLASSES = (2, 3, 5, 7)  # car, motorcycle, bus, truck
+READ_AHEAD = 64                  # decoded frames buffered per worker
+
+
+@dataclass
+class Segment:
+    path: str
+    index: int
+    start_frame: int
+    end_frame: int
+    fps: float
+    start_time: float  # epoch seconds of frame 0 of the file
+
+    def key(self, stride):
+        st = os.stat(self.path)
+        return f"{self.path}|{st.st_size}|{int(st.st_mtime)}|{self.start_frame}-{self.end_frame}|{stride}"
+
+    @property
+    def seconds(self):
+        return (self.end_frame - self.start_frame) / self.fps
+
+
+# -----------------------
+# Planning
+# -----------------------
+def list_videos(inputs):
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                videos += [os.path.join(root, f) for f in files if f.lower().endswith(VIDEO_EXTENSIONS)]
+        else:
+            videos.append(item)
+    return sorted(os.path.abspath(v) for v in videos)
+
+
+def plan_segments(path, segment_seconds, start_time=None):
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if frames <= 0:
+        print(f"⚠️ Skipped {path}, could not read the frame count.")
+        return []
+    if start_time is None:
+        # the file is closed when the recording ends
+        start_time = os.path.getmtime(path) - frames / fps
+    step = max(1, int(segment_seconds * fps))
+    return [Segment(path, i, start, min(start + step, frames), fps, start_time)
+            for i, start in enumerate(range(0, frames, step))]
+
+
+# -----------------------
+# Worker process
+# -----------------------
+_models = {}
+
+
+def _batched(model):
+    """Stub detectors take one frame at a time; give them the list interface of YOLO."""
+    return lambda frames, **kwargs: [model(f, **kwargs)[0] for f in frames]
+
+
+def init_worker(stub_models, threads):
+    cv2.setNumThreads(1)
+    if stub_models:
+        from benchmarks.stubs import StubVehicleDetector, StubPlateDetector, make_stub_ocr
+        _models["vehicle"] = _batched(StubVehicleDetector(seed=os.getpid()))
+        _models["plate"] = _batched(StubPlateDetector())
+        _models["ocr"] = make_stub_ocr()
+        return
+    import torch
+    from ultralytics import YOLO
+    from utils.util import ocr_plate, load_trocr
+    torch.set_num_threads(threads)
+    vehicle, plate = YOLO("weights/yolov8n.pt", verbose=False), YOLO("weights/LPR.pt", verbose=False)
+    _models["vehicle"] = lambda frames: vehicle(frames, verbose=False)
+    _models["plate"] = lambda crops: plate(crops, verbose=False)
+    load_trocr()
+    _models["ocr"] = ocr_plate
+
+
+def read_frames(segment, stride, out):
+    """Decode the segment ahead of inference; skipped frames are only grabbed, not converted."""
+    cap = cv2.VideoCapture(segment.path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, segment.start_frame)
+    for idx in range(segment.start_frame, segment.end_frame):
+        if (idx - segment.start_frame) % stride:
+            ok = cap.grab()
+            frame = None
+        else:
+            ok, frame = cap.read()
+        if not ok:
+            break
+        if frame is not None:
+            out.put((idx, frame))
+    cap.release()
+    out.put(None)
+
+
+def scan_segment(segment, stride, batch_size, location):
+    """Returns [(plate, detected_at epoch, vehicle crop)] for one segment."""
+    from sort.sort import Sort
+    from utils.event_policy import DetectionEventPolicy
+    from utils.frame_selector import BestFrameBuffer, score_plate_crop
+    from utils.plate_vote import PlateVoteAccumulator
+    from utils.plate_grammar import normalize, normalize_many
+
+    vehicle_model, plate_model, ocr = _models["vehicle"], _models["plate"], _models["ocr"]
+    video_now = [segment.start_time]
+    # cooldowns run on footage time, not on how fast we scan it
+    policy = DetectionEventPolicy(min_confirmations=1, clock=lambda: video_now[0])
+    dropped = []
+    # timestamps in footage time: the Kalman steps cover the stride, expiry is in seconds
+    tracker = Sort(on_track_deleted=dropped.append, frame_interval=1.0 / segment.fps,
+                   max_age_seconds=1.5 * stride / segment.fps)
+    # a vehicle is in view for fewer processed frames with a stride
+    frames = BestFrameBuffer(k=3, confirm_after=max(1, 5 // stride))
+    hits = []
+
+    def read_track(track_id, retired=False):
+        try:
+            emit(track_id)
+        finally:
+            if retired:
+                frames.discard(track_id)
+                policy.forget_track(track_id)
+
+    def emit(track_id):
+        for entry in frames.pending(track_id):
+            entry["read"], _ = ocr(entry["plate"])
+        entries = [e for e in frames.best(track_id) if e["read"]]
+        valid = [(e, m) for e, m in zip(entries, normalize_many([e["read"] for e in entries])) if m.valid]
+        if not valid:
+            return
+        votes = PlateVoteAccumulator()
+        for e, m in valid:
+            votes.add(m.plate, e["score"] * m.score)
+        plate = votes.vote()
+        if not normalize(plate).valid:
+            plate = valid[0][1].plate
+        best = next((e for e, m in valid if m.plate == plate), valid[0][0])
+        if policy.observe(track_id, plate, location, best["score"]):
+            # footage time of the best crop, not of the frame that made the track due or retired it
+            hits.append((plate, best["ts"], best["vehicle"]))
+
+    queue = Queue(maxsize=READ_AHEAD)
+    reader = threading.Thread(target=read_frames, args=(segment, stride, queue), daemon=True)
+    reader.start()
+
+    done = False
+    while not done:
+        batch = []
+        while len(batch) < batch_size:
+            item = queue.get()
+            if item is None:
+                done = True
+                break
+            batch.append(item)
+        if not batch:
+            break
+
+        # one detector call per batch of frames, one plate detector call per batch of vehicles
+        results = vehicle_model([frame for _, frame in batch])
+        crops = []  # (frame_idx, track_id, vehicle crop)
+        for (idx, frame), result in zip(batch, results):
+            dets = [[*map(int, det.xyxy[0]), 1.0] for det in result.boxes if int(det.cls[0]) in VEHICLE_CLASSES]
+            tracked = tracker.update(np.array(dets) if dets else np.empty((0, 5)), timestamp=idx / segment.fps)
+            for x1, y1, x2, y2, track_id in tracked:
+                x1, y1 = max(0, int(x1)), max(0, int(y1))
+                crop = frame[y1:int(y2), x1:int(x2)]
+                if crop.size:
+                    crops.append((idx, int(track_id), crop))
+        plate_results = plate_model([crop for _, _, crop in crops]) if crops else []
+
+        for (idx, track_id, crop), result in zip(crops, plate_results):
+            video_now[0] = segment.start_time + idx / segment.fps
+            for det in result.boxes:
+                px1, py1, px2, py2 = map(int, det.xyxy[0])
+                plate_crop = crop[max(0, py1):py2, max(0, px1):px2]
+                score = score_plate_crop(plate_crop, float(det.conf[0]))
+                if score > 0 and frames.add(track_id, score, plate_crop, crop, idx, video_now[0]):
+                    read_track(track_id)
+        while dropped:
+            read_track(dropped.pop(), retired=True)
+
+    for track_id in list(frames.tracks):
+        read_track(track_id, retired=True)
+    reader.join()
+    return hits
+
+
+def run_segment(segment, stride, batch_size, location):
+    started = time.perf_counter()
+    hits = scan_segment(segment, stride, batch_size, location)
+    return segment, hits, time.perf_counter() - started
+
+
+# -----------------------
+# Driver
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser(description="Scan recorded footage for number plates")
+    parser.add_argument("inputs", nargs="+", help="Video files or directories")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--segment-seconds", type=float, default=120.0)
+    parser.add_argument("--stride", type=int, default=2, help="Process every Nth frame")
+    parser.add_argument("--batch", type=int, default=8, help="Frames per detector call")
+    parser.add_argument("--start-time", help="Wall-clock time of the first frame (UTC, 'YYYY-mm-dd HH:MM:SS'); "
+                                             "only with a single input file; "
+                                             "default: file modification time minus its duration")
+    parser.add_argument("--location", help="Location stored with the detections (default: file name)")
+    parser.add_argument("--plate", help="Print the sightings of this plate at the end")
+    parser.add_argument("--restart", action="store_true", help="Ignore segments finished by an earlier run")
+    parser.add_argument("--stub-models", action="store_true", help=argparse.SUPPRESS)  # smoke tests without weights
+    args = parser.parse_args()
+
+    from utils.db_helper import init_db, add_scan_results, get_scanned_segments
+    from utils.image_store import image_store
+
+    videos = list_videos(args.inputs)
+    start_time = None
+    if args.start_time:
+        # one start time would give every recording the same footage timestamps
+        if len(videos) != 1:
+            parser.error(f"--start-time needs exactly one input file, got {len(videos)}")
+        start_time = datetime.strptime(args.start_time, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+
+    init_db()
+    segments = [s for path in videos for s in plan_segments(path, args.segment_seconds, start_time)]
+    finished = set() if args.restart else get_scanned_segments()
+    todo = [s for s in segments if s.key(args.stride) not in finished]
+    print(f"🎞️ {len(segments)} segments, {len(segments) - len(todo)} already scanned, "
+          f"{len(todo)} to go on {args.workers} workers")
+    if not todo:
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    sightings = []
+    footage = 0.0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, mp_context=get_context("spawn"), initializer=init_worker,
+                             initargs=(args.stub_models, threads)) as pool:
+        futures = [pool.submit(run_segment, s, args.stride, args.batch,
+                               args.location or os.path.basename(s.path)) for s in todo]
+        for n, future in enumerate(as_completed(futures), 1):
+            segment, hits, seconds = future.result()
+            location = args.location or os.path.basename(segment.path)
+            found = []
+            for plate, ts, vehicle in hits:
+                when = datetime.fromtimestamp(ts, timezone.utc)
+                found.append((when, plate, location, image_store.put(vehicle, plate, location, when=when)))
+            # the segment only counts as scanned once its images are on disk; a crash
+            # before that makes the resumed run redo it instead of keeping dangling rows
+            try:
+                for *_, handle in found:
+                    if not os.path.exists(image_store.wait(handle)):
+                        raise FileNotFoundError(handle)
+            except Exception as e:
+                print(f"⚠️ {os.path.basename(segment.path)} #{segment.index}: image write failed ({e}); "
+                      f"the segment will be scanned again next run")
+                continue
+            add_scan_results(segment.key(args.stride), segment.path,
+                             [(plate, loc, handle, when.strftime("%Y-%m-%d %H:%M:%S"))
+                              for when, plate, loc, handle in found])
+            sightings += found
+            footage += segment.seconds
+            print(f"✅ [{n}/{len(todo)}] {os.path.basename(segment.path)} #{segment.index}: "
+                  f"{len(hits)} plates, {segment.seconds / seconds:.1f}x realtime")
+    image_store.flush()
+
+    elapsed = time.perf_counter() - t0
+    print(f"🎉 Scanned {footage / 60:.1f} min of footage in {elapsed:.1f}s "
+          f"({footage / elapsed:.1f}x realtime), {len(sightings)} plates stored")
+    if args.plate:
+        from utils.plate_grammar import normalize
+        wanted = normalize(args.plate).plate  # stored plates went through the same grammar
+        for when, plate, location, handle in sorted(sightings):
+            if plate == wanted:
+                print(f"🔍 {plate} at {location} {when:%Y-%m-%d %H:%M:%S} UTC → {handle}")
+
+
+if __name__ == "__main__":
+    main()
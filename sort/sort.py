@@ -33,12 +33,18 @@ from filterpy.kalman import KalmanFilter
 np.random.seed(0)
 
 
+try:
+  import lap
+except ImportError:
+  lap = None
+
+
 def linear_assignment(cost_matrix):
-  try:
-    import lap
+  # the solver is resolved once at import; a failed "import lap" per call is not free
+  if lap is not None:
     _, x, y = lap.lapjv(cost_matrix, extend_cost=True)
     return np.array([[y[i],i] for i in x if i >= 0]) #
-  except ImportError:
+  else:
     from scipy.optimize import linear_sum_assignment
     x, y = linear_sum_assignment(cost_matrix)
     return np.array(list(zip(x, y)))
@@ -91,6 +97,17 @@ def convert_x_to_bbox(x,score=None):
     return np.array([x[0]-w/2.,x[1]-h/2.,x[0]+w/2.,x[1]+h/2.,score]).reshape((1,5))
 
 
+def motion_model(F, Q, dt):
+  """
+  Constant velocity transition and process noise for a step of dt model frames, from the
+  unit-step F and Q: velocity enters position times dt and the process noise grows
+  linearly with dt. dt=1 gives F and Q back unchanged.
+  """
+  F = np.array(F, dtype=float)  # KalmanBoxTracker's F is an int array
+  F[0,4] = F[1,5] = F[2,6] = dt
+  return F, Q * dt
+
+
 class KalmanBoxTracker(object):
   """
   This class represents the internal state of individual tracked objects observed as bbox.
@@ -119,6 +136,8 @@ class KalmanBoxTracker(object):
     self.hits = 0
     self.hit_streak = 0
     self.age = 0
+    self.confirmed = False
+    self.last_seen = None  # timestamp of the last matched detection (timestamped updates only)
 
   def update(self,bbox):
     """
@@ -130,13 +149,12 @@ class KalmanBoxTracker(object):
     self.hit_streak += 1
     self.kf.update(convert_bbox_to_z(bbox))
 
-  def predict(self):
+  def predict(self, dt=None):
     """
     Advances the state vector and returns the predicted bounding box estimate.
+    dt - step in model frames (see Sort.frame_interval); None is one frame.
     """
-    if((self.kf.x[6]+self.kf.x[2])<=0):
-      self.kf.x[6] *= 0.0
-    self.kf.predict()
+    self.advance(dt)
     self.age += 1
     if(self.time_since_update>0):
       self.hit_streak = 0
@@ -144,6 +162,20 @@ class KalmanBoxTracker(object):
     self.history.append(convert_x_to_bbox(self.kf.x))
     return self.history[-1]
 
+  def advance(self, dt=None):
+    """
+    Kalman prediction step only, without the bookkeeping of predict.
+    """
+    if dt is None:
+      if((self.kf.x[6]+self.kf.x[2])<=0):
+        self.kf.x[6] *= 0.0
+      self.kf.predict()
+      return
+    if((self.kf.x[6]*dt+self.kf.x[2])<=0):
+      self.kf.x[6] *= 0.0
+    F, Q = motion_model(self.kf.F, self.kf.Q, dt)
+    self.kf.predict(F=F, Q=Q)
+
   def get_state(self):
     """
     Returns the current bounding box estimate.
@@ -196,62 +228,439 @@ def associate_detections_to_trackers(detections,trackers,iou_threshold = 0.3):
   return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
 
 
+def overlap_candidates(bb_test, bb_gt):
+  """
+  Sorted-interval prefilter for dense scenes: returns index arrays (i, j) of all pairs
+  whose boxes overlap, without building the full len(bb_test) x len(bb_gt) matrix.
+  bb_gt is sorted by x1; for each test box only the gt boxes whose x1 lies in
+  (x1_test - widest_gt, x2_test) can overlap it, and those form a contiguous slice.
+  """
+  if len(bb_test) == 0 or len(bb_gt) == 0:
+    return np.empty(0, dtype=int), np.empty(0, dtype=int)
+  order = np.argsort(bb_gt[:, 0], kind='stable')
+  x1_sorted = bb_gt[order, 0]
+  max_w = np.max(bb_gt[:, 2] - bb_gt[:, 0])
+  lo = np.searchsorted(x1_sorted, bb_test[:, 0] - max_w, side='right')
+  hi = np.searchsorted(x1_sorted, bb_test[:, 2], side='left')
+  counts = np.maximum(hi - lo, 0)
+  total = counts.sum()
+  if total == 0:
+    return np.empty(0, dtype=int), np.empty(0, dtype=int)
+  i = np.repeat(np.arange(len(bb_test)), counts)
+  offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+  j = order[np.repeat(lo, counts) + offsets]
+  # exact overlap test on both axes
+  keep = ((bb_test[i, 0] < bb_gt[j, 2]) & (bb_gt[j, 0] < bb_test[i, 2]) &
+          (bb_test[i, 1] < bb_gt[j, 3]) & (bb_gt[j, 1] < bb_test[i, 3]))
+  return i[keep], j[keep]
+
+
+def iou_pairs(bb_test, bb_gt):
+  """
+  Row-wise IOU between two equally long arrays of bboxes in the form [x1,y1,x2,y2]
+  """
+  w = np.maximum(0., np.minimum(bb_test[:, 2], bb_gt[:, 2]) - np.maximum(bb_test[:, 0], bb_gt[:, 0]))
+  h = np.maximum(0., np.minimum(bb_test[:, 3], bb_gt[:, 3]) - np.maximum(bb_test[:, 1], bb_gt[:, 1]))
+  wh = w * h
+  return wh / ((bb_test[:, 2] - bb_test[:, 0]) * (bb_test[:, 3] - bb_test[:, 1])
+    + (bb_gt[:, 2] - bb_gt[:, 0]) * (bb_gt[:, 3] - bb_gt[:, 1]) - wh)
+
+
+def associate_detections_to_trackers_sparse(detections,trackers,iou_threshold = 0.3):
+  """
+  Scalable variant of associate_detections_to_trackers for scenes with many objects.
+
+  IOU is only computed for spatially overlapping candidates (see overlap_candidates)
+  and the bipartite overlap graph is split into connected components. Pairs in
+  different components have zero IOU, so solving each component on its own gives the
+  same optimum as the full matrix. Components with a single candidate pair are matched
+  directly; only the others go through linear_assignment, each on its own small
+  matrix. As in the dense version, matches below iou_threshold are then rejected.
+  Unmatched sets come from boolean masks.
+
+  Returns the same 3 arrays as associate_detections_to_trackers.
+  """
+  num_dets, num_trks = len(detections), len(trackers)
+  if num_trks == 0 or num_dets == 0:
+    return np.empty((0,2),dtype=int), np.arange(num_dets), np.arange(num_trks)
+
+  from scipy.sparse import coo_matrix
+  from scipy.sparse.csgraph import connected_components
+
+  di, ti = overlap_candidates(detections, trackers)
+  iou = iou_pairs(detections[di], trackers[ti])
+  gate = iou > 0.
+  di, ti, iou = di[gate], ti[gate], iou[gate]
+
+  matches = np.empty((0,2),dtype=int)
+  if len(di) > 0:
+    # detections are nodes [0, D), trackers are nodes [D, D+T)
+    n = num_dets + num_trks
+    graph = coo_matrix((np.ones(len(di)), (di, ti + num_dets)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    edge_label = labels[di]
+    edges_per_comp = np.bincount(edge_label, minlength=n)
+
+    single = edges_per_comp[edge_label] == 1
+    single_ok = single & (iou >= iou_threshold)
+    found = [np.stack([di[single_ok], ti[single_ok]], axis=1)]
+
+    multi = ~single
+    if multi.any():
+      m_di, m_ti, m_iou, m_lab = di[multi], ti[multi], iou[multi], edge_label[multi]
+      order = np.argsort(m_lab, kind='stable')
+      m_di, m_ti, m_iou, m_lab = m_di[order], m_ti[order], m_iou[order], m_lab[order]
+      bounds = np.flatnonzero(np.diff(m_lab)) + 1
+      for c_di, c_ti, c_iou in zip(np.split(m_di, bounds), np.split(m_ti, bounds), np.split(m_iou, bounds)):
+        rows, r_inv = np.unique(c_di, return_inverse=True)
+        cols, c_inv = np.unique(c_ti, return_inverse=True)
+        sub = np.zeros((len(rows), len(cols)))
+        sub[r_inv, c_inv] = c_iou
+        pairs = linear_assignment(-sub)
+        if len(pairs) == 0:
+          continue
+        pairs = pairs[sub[pairs[:, 0], pairs[:, 1]] >= iou_threshold]
+        found.append(np.stack([rows[pairs[:, 0]], cols[pairs[:, 1]]], axis=1))
+    matches = np.concatenate(found).astype(int)
+
+  det_free = np.ones(num_dets, dtype=bool)
+  det_free[matches[:, 0]] = False
+  trk_free = np.ones(num_trks, dtype=bool)
+  trk_free[matches[:, 1]] = False
+  return matches, np.flatnonzero(det_free), np.flatnonzero(trk_free)
+
+
+ASSOCIATION_METHODS = {'dense': associate_detections_to_trackers, 'sparse': associate_detections_to_trackers_sparse}
+
+
 class Sort(object):
-  def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3):
+  def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3,
+               on_track_created=None, on_track_confirmed=None, on_track_deleted=None,
+               association='dense', frame_interval=1/25., max_age_seconds=None):
     """
     Sets key parameters for SORT
+
+    association selects the matching step: 'dense' (full IOU matrix, the original
+    algorithm) or 'sparse' (spatially gated, per-component assignment for crowded scenes).
+
+    update / propagate take an optional timestamp (seconds). With timestamps, each Kalman
+    step covers the real time since the previous call in units of frame_interval (the
+    nominal seconds per frame), so skipped or dropped frames keep velocities right. A
+    track is deleted once it has both missed more than max_age updates and gone
+    max_age_seconds without a matching detection (default (max_age + 0.5) * frame_interval).
+    Gaps between updates therefore never cut a track sooner than counting calls would,
+    and a burst of fast updates does not cut it before max_age_seconds. Without
+    timestamps every call is one frame and max_age counts calls, as in the original
+    algorithm. Pass timestamps on every call or on none.
+
+    The optional lifecycle callbacks are called with the track ID as it appears in the
+    output of update (i.e. tracker id + 1):
+      on_track_created   - a new tracker was initialised from an unmatched detection
+      on_track_confirmed - a track is reported by update for the first time
+      on_track_deleted   - a tracker was removed; per-track state can be freed
     """
     self.max_age = max_age
     self.min_hits = min_hits
     self.iou_threshold = iou_threshold
+    self.associate = ASSOCIATION_METHODS[association]
     self.trackers = []
     self.frame_count = 0
-
-  def update(self, dets=np.empty((0, 5))):
+    self.frame_interval = frame_interval
+    self.max_age_seconds = max_age_seconds
+    self.last_timestamp = None
+    self.on_track_created = on_track_created
+    self.on_track_confirmed = on_track_confirmed
+    self.on_track_deleted = on_track_deleted
+
+  def _step(self, timestamp):
+    """Model frames since the previous timestamped call (None: one frame)."""
+    if timestamp is None:
+      return None
+    last, self.last_timestamp = self.last_timestamp, timestamp
+    if last is None:
+      return None
+    return max(timestamp - last, 0.) / self.frame_interval
+
+  def _max_age_seconds(self):
+    if self.max_age_seconds is None:
+      return (self.max_age + 0.5) * self.frame_interval
+    return self.max_age_seconds
+
+  def _expired(self, time_since_update, last_seen, timestamp):
+    if time_since_update <= self.max_age:
+      return False
+    if timestamp is None or last_seen is None:
+      return True
+    return timestamp - last_seen > self._max_age_seconds()
+
+  def _delete_tracker(self, i):
+    trk = self.trackers.pop(i)
+    if self.on_track_deleted is not None:
+      self.on_track_deleted(trk.id+1)
+
+  def update(self, dets=np.empty((0, 5)), timestamp=None):
     """
     Params:
       dets - a numpy array of detections in the format [[x1,y1,x2,y2,score],[x1,y1,x2,y2,score],...]
+      timestamp - optional capture time in seconds (see __init__)
     Requires: this method must be called once for each frame even with empty detections (use np.empty((0, 5)) for frames without detections).
     Returns the a similar array, where the last column is the object ID.
 
     NOTE: The number of objects returned may differ from the number of detections provided.
     """
     self.frame_count += 1
+    dt = self._step(timestamp)
     # get predicted locations from existing trackers.
     trks = np.zeros((len(self.trackers), 5))
     to_del = []
     ret = []
     for t, trk in enumerate(trks):
-      pos = self.trackers[t].predict()[0]
+      pos = self.trackers[t].predict(dt)[0]
       trk[:] = [pos[0], pos[1], pos[2], pos[3], 0]
       if np.any(np.isnan(pos)):
         to_del.append(t)
     trks = np.ma.compress_rows(np.ma.masked_invalid(trks))
     for t in reversed(to_del):
-      self.trackers.pop(t)
-    matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets,trks, self.iou_threshold)
+      self._delete_tracker(t)
+    matched, unmatched_dets, unmatched_trks = self.associate(dets,trks, self.iou_threshold)
 
     # update matched trackers with assigned detections
     for m in matched:
       self.trackers[m[1]].update(dets[m[0], :])
+      self.trackers[m[1]].last_seen = timestamp
 
     # create and initialise new trackers for unmatched detections
     for i in unmatched_dets:
         trk = KalmanBoxTracker(dets[i,:])
+        trk.last_seen = timestamp
         self.trackers.append(trk)
+        if self.on_track_created is not None:
+          self.on_track_created(trk.id+1)
     i = len(self.trackers)
     for trk in reversed(self.trackers):
         d = trk.get_state()[0]
         if (trk.time_since_update < 1) and (trk.hit_streak >= self.min_hits or self.frame_count <= self.min_hits):
           ret.append(np.concatenate((d,[trk.id+1])).reshape(1,-1)) # +1 as MOT benchmark requires positive
+          if not trk.confirmed:
+            trk.confirmed = True
+            if self.on_track_confirmed is not None:
+              self.on_track_confirmed(trk.id+1)
         i -= 1
         # remove dead tracklet
-        if(trk.time_since_update > self.max_age):
-          self.trackers.pop(i)
+        if self._expired(trk.time_since_update, trk.last_seen, timestamp):
+          self._delete_tracker(i)
     if(len(ret)>0):
       return np.concatenate(ret)
     return np.empty((0,5))
 
+  def propagate(self, refine=None, timestamp=None):
+    """
+    Keyframe mode: advance every track by one frame (or to timestamp) on its motion model,
+    for frames the detector is not run on. Hit / miss bookkeeping and max_age are left
+    alone, so the next update() carries on as if the skipped frames had not happened.
+    refine - optional callable (M,5) predicted [x1,y1,x2,y2,id] -> (M,4) boxes measured by a
+             cheap local method (optical flow, template match); NaN rows are left as predicted.
+    Returns the tracks update() reported last time, at their propagated positions, in the
+    same format as update.
+    """
+    dt = self._step(timestamp)
+    ret = []
+    for trk in reversed(self.trackers):
+      trk.advance(dt)
+      if (trk.time_since_update < 1) and (trk.hit_streak >= self.min_hits or self.frame_count <= self.min_hits):
+        ret.append(trk)
+    if not ret:
+      return np.empty((0,5))
+    out = np.array([np.concatenate((trk.get_state()[0], [trk.id+1])) for trk in ret])
+    if refine is not None:
+      measured = np.asarray(refine(out), dtype=float)
+      for trk, row, box in zip(ret, out, measured):
+        if not np.any(np.isnan(box)):
+          trk.kf.update(convert_bbox_to_z(box))
+          row[:4] = trk.get_state()[0]
+    return out
+
+class VectorizedSort(Sort):
+  """
+  Drop-in alternative to Sort that keeps every track in stacked arrays instead of one
+  KalmanBoxTracker/filterpy KalmanFilter per track. State is (N,7), covariance (N,7,7)
+  and the bookkeeping counters live in flat (N,) arrays, so predict and update are a
+  handful of batched matmuls per frame regardless of the number of tracks.
+
+  It runs the same constant velocity model with the same noise settings as
+  KalmanBoxTracker and produces the same output as Sort.
+  """
+  F = np.array([[1,0,0,0,1,0,0],[0,1,0,0,0,1,0],[0,0,1,0,0,0,1],[0,0,0,1,0,0,0],  [0,0,0,0,1,0,0],[0,0,0,0,0,1,0],[0,0,0,0,0,0,1]], dtype=float)
+  R = np.diag([1., 1., 10., 10.])
+  Q = np.diag([1., 1., 1., 1., .01, .01, .0001])
+  P0 = np.diag([10., 10., 10., 10., 10000., 10000., 10000.])
+
+  def __init__(self, *args, **kwargs):
+    super(VectorizedSort, self).__init__(*args, **kwargs)
+    self.x = np.zeros((0, 7))
+    self.P = np.zeros((0, 7, 7))
+    self.ids = np.zeros(0, dtype=np.int64)
+    self.hits = np.zeros(0, dtype=np.int32)
+    self.hit_streak = np.zeros(0, dtype=np.int32)
+    self.age = np.zeros(0, dtype=np.int32)
+    self.time_since_update = np.zeros(0, dtype=np.int32)
+    self.confirmed = np.zeros(0, dtype=bool)
+    self.last_seen = np.zeros(0)  # NaN for tracks last matched by an untimestamped update
+
+  def __len__(self):
+    return len(self.ids)
+
+  @staticmethod
+  def _bbox_to_z(bboxes):
+    """Vectorised convert_bbox_to_z: (M,4+) boxes -> (M,4) [x,y,s,r]."""
+    w = bboxes[:, 2] - bboxes[:, 0]
+    h = bboxes[:, 3] - bboxes[:, 1]
+    return np.stack([bboxes[:, 0] + w/2., bboxes[:, 1] + h/2., w * h, w / h], axis=1)
+
+  @staticmethod
+  def _x_to_bbox(x):
+    """Vectorised convert_x_to_bbox: (N,7+) states -> (N,4) [x1,y1,x2,y2]."""
+    w = np.sqrt(x[:, 2] * x[:, 3])
+    h = x[:, 2] / w
+    return np.stack([x[:, 0]-w/2., x[:, 1]-h/2., x[:, 0]+w/2., x[:, 1]+h/2.], axis=1)
+
+  def _advance(self, dt=None):
+    """Kalman prediction step for all tracks, without the bookkeeping."""
+    F, Q = (self.F, self.Q) if dt is None else motion_model(self.F, self.Q, dt)
+    self.x[(self.x[:, 6] * (1 if dt is None else dt) + self.x[:, 2]) <= 0, 6] *= 0.0
+    self.x = np.einsum('ij,nj->ni', F, self.x)
+    self.P = np.matmul(np.matmul(F, self.P), F.T) + Q
+
+  def _predict(self, dt=None):
+    """Batched KalmanBoxTracker.predict over all tracks; returns predicted boxes."""
+    self._advance(dt)
+    self.age += 1
+    self.hit_streak[self.time_since_update > 0] = 0
+    self.time_since_update += 1
+    return self._x_to_bbox(self.x)
+
+  def _update(self, idx, bboxes):
+    """Batched KalmanBoxTracker.update for the tracks at idx with the matching boxes."""
+    self._correct(idx, bboxes)
+    self.time_since_update[idx] = 0
+    self.hits[idx] += 1
+    self.hit_streak[idx] += 1
+
+  def _correct(self, idx, bboxes):
+    """Kalman measurement step for the tracks at idx, without the bookkeeping."""
+    x = self.x[idx]
+    P = self.P[idx]
+    # H picks the first four state entries, so HP' and HPH' are plain slices
+    y = self._bbox_to_z(bboxes) - x[:, :4]
+    PHT = P[:, :, :4]
+    S = PHT[:, :4, :] + self.R
+    K = np.matmul(PHT, np.linalg.inv(S))
+    x = x + np.einsum('nij,nj->ni', K, y)
+    I_KH = np.broadcast_to(np.eye(7), P.shape).copy()
+    I_KH[:, :, :4] -= K
+    P = np.matmul(np.matmul(I_KH, P), I_KH.transpose(0, 2, 1)) + np.matmul(np.matmul(K, self.R), K.transpose(0, 2, 1))
+    self.x[idx] = x
+    self.P[idx] = P
+
+  def _create(self, bboxes, timestamp=None):
+    n = len(bboxes)
+    x = np.zeros((n, 7))
+    x[:, :4] = self._bbox_to_z(bboxes)
+    ids = np.arange(KalmanBoxTracker.count, KalmanBoxTracker.count + n)
+    KalmanBoxTracker.count += n
+    self.x = np.concatenate([self.x, x])
+    self.P = np.concatenate([self.P, np.broadcast_to(self.P0, (n, 7, 7))])
+    self.ids = np.concatenate([self.ids, ids])
+    zeros = np.zeros(n, dtype=np.int32)
+    self.hits = np.concatenate([self.hits, zeros])
+    self.hit_streak = np.concatenate([self.hit_streak, zeros])
+    self.age = np.concatenate([self.age, zeros])
+    self.time_since_update = np.concatenate([self.time_since_update, zeros])
+    self.confirmed = np.concatenate([self.confirmed, np.zeros(n, dtype=bool)])
+    self.last_seen = np.concatenate([self.last_seen, np.full(n, np.nan if timestamp is None else timestamp)])
+    if self.on_track_created is not None:
+      for track_id in ids:
+        self.on_track_created(int(track_id)+1)
+
+  def _keep(self, keep):
+    """Drop every track where keep is False, firing on_track_deleted for each."""
+    if keep.all():
+      return
+    if self.on_track_deleted is not None:
+      for track_id in self.ids[~keep][::-1]:
+        self.on_track_deleted(int(track_id)+1)
+    self.x = self.x[keep]
+    self.P = self.P[keep]
+    self.ids = self.ids[keep]
+    self.hits = self.hits[keep]
+    self.hit_streak = self.hit_streak[keep]
+    self.age = self.age[keep]
+    self.time_since_update = self.time_since_update[keep]
+    self.confirmed = self.confirmed[keep]
+    self.last_seen = self.last_seen[keep]
+
+  def update(self, dets=np.empty((0, 5)), timestamp=None):
+    """
+    Same contract as Sort.update.
+    """
+    self.frame_count += 1
+    dt = self._step(timestamp)
+    # get predicted locations from existing trackers.
+    trks = self._predict(dt)
+    valid = ~np.any(np.isnan(trks), axis=1)
+    self._keep(valid)
+    trks = trks[valid]
+    matched, unmatched_dets, unmatched_trks = self.associate(dets, trks, self.iou_threshold)
+
+    # update matched trackers with assigned detections
+    if len(matched) > 0:
+      self._update(matched[:, 1].astype(int), dets[matched[:, 0].astype(int), :])
+      self.last_seen[matched[:, 1].astype(int)] = np.nan if timestamp is None else timestamp
+
+    # create and initialise new trackers for unmatched detections
+    if len(unmatched_dets) > 0:
+      self._create(dets[np.asarray(unmatched_dets, dtype=int), :], timestamp)
+
+    # report tracks in the same (newest first) order as Sort
+    report = (self.time_since_update < 1) & ((self.hit_streak >= self.min_hits) | (self.frame_count <= self.min_hits))
+    newly_confirmed = report & ~self.confirmed
+    self.confirmed |= report
+    if self.on_track_confirmed is not None:
+      for track_id in self.ids[newly_confirmed][::-1]:
+        self.on_track_confirmed(int(track_id)+1)
+    ret = np.concatenate([self._x_to_bbox(self.x[report]), (self.ids[report]+1)[:, None]], axis=1)[::-1]
+
+    # remove dead tracklets
+    expired = self.time_since_update > self.max_age
+    if timestamp is not None:
+      # NaN (last matched without a timestamp) compares False: expiry by count alone
+      expired &= ~(timestamp - self.last_seen <= self._max_age_seconds())
+    self._keep(~expired)
+    if(len(ret)>0):
+      return ret
+    return np.empty((0,5))
+
+  def propagate(self, refine=None, timestamp=None):
+    """
+    Same contract as Sort.propagate.
+    """
+    self._advance(self._step(timestamp))
+    report = np.flatnonzero((self.time_since_update < 1) & ((self.hit_streak >= self.min_hits) | (self.frame_count <= self.min_hits)))[::-1]
+    if len(report) == 0:
+      return np.empty((0,5))
+    out = np.concatenate([self._x_to_bbox(self.x[report]), (self.ids[report]+1)[:, None]], axis=1)
+    if refine is not None:
+      measured = np.asarray(refine(out), dtype=float)
+      ok = ~np.any(np.isnan(measured), axis=1)
+      if ok.any():
+        self._correct(report[ok], measured[ok])
+        out[ok, :4] = self._x_to_bbox(self.x[report[ok]])
+    return out
+
+
+TRACKER_BACKENDS = {'filterpy': Sort, 'vectorized': VectorizedSort}
+
+
 def parse_args():
     """Parse input arguments."""
     parser = argparse.ArgumentParser(description='SORT demo')
@@ -265,6 +674,8 @@ def parse_args():
                         help="Minimum number of associated detections before track is initialised.", 
                         type=int, default=3)
     parser.add_argument("--iou_threshold", help="Minimum IOU for match.", type=float, default=0.3)
+    parser.add_argument("--association", help="Association method.", choices=sorted(ASSOCIATION_METHODS), default='dense')
+    parser.add_argument("--backend", help="Tracker implementation.", choices=sorted(TRACKER_BACKENDS), default='filterpy')
     args = parser.parse_args()
     return args
 
@@ -288,9 +699,10 @@ if __name__ == '__main__':
     os.makedirs('output')
   pattern = os.path.join(args.seq_path, phase, '*', 'det', 'det.txt')
   for seq_dets_fn in glob.glob(pattern):
-    mot_tracker = Sort(max_age=args.max_age, 
+    mot_tracker = TRACKER_BACKENDS[args.backend](max_age=args.max_age, 
                        min_hits=args.min_hits,
-                       iou_threshold=args.iou_threshold) #create instance of the SORT tracker
+                       iou_threshold=args.iou_threshold,
+                       association=args.association) #create instance of the SORT tracker
     seq_dets = np.loadtxt(seq_dets_fn, delimiter=',')
     seq = seq_dets_fn[pattern.find('*'):].split(os.path.sep)[0]
     
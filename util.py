@@ -1,3 +1,4 @@
+import os
 import cv2
 import numpy as np
 import torch
@@ -8,7 +9,10 @@ from sympy import false
 from transformers import TrOCRProcessor, VisionEncoderDecoderModel
 from ultralytics import YOLO
 from sort.sort import Sort
-from collections import defaultdict, Counter
+from utils.plate_vote import PlateVotes
+from utils.plate_grammar import normalize as normalize_plate
+from utils.trocr_fast import TrOCRPreprocessor
+from utils.ocr_cache import ocr_cache, crop_hash
 
 # -----------------------------
 # Initialize Models
@@ -17,6 +21,9 @@ processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-printed")
 model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-printed")
 device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
 model.to(device)
+# OpenCV/NumPy preprocessing instead of PIL + TrOCRProcessor (utils/trocr_fast.py)
+TROCR_FAST_PREPROCESS = os.getenv("TROCR_FAST_PREPROCESS", "1") == "1"
+preprocess = TrOCRPreprocessor.from_processor(processor)
 
 YOLO_WEIGHTS_PATH = "License-Plate-Detection/runs/detect/train/weights/best.pt"
 plate_model = YOLO(YOLO_WEIGHTS_PATH)
@@ -32,22 +39,17 @@ def clean_plate(text: str) -> str:
 
 def correct_plate_confusion(plate: str) -> str:
     """
-    Correct common OCR misreads for Indian-style plates.
+    Canonical plate per utils.plate_grammar; the cleaned read when it fits no known format.
     """
-    plate = plate.upper()
-    # State code (first 2 letters)
-    if len(plate) >= 2:
-        plate = plate[:2].replace("0", "O").replace("1", "I").replace("5", "S") + plate[2:]
-    # District code (next 2 digits)
-    if len(plate) >= 4:
-        plate = plate[:2] + plate[2:4].replace("O", "0").replace("I", "1") + plate[4:]
-    # Series letters (next 1-2 letters)
-    if len(plate) >= 6:
-        plate = plate[:4] + plate[4:6].replace("0", "O").replace("1", "I").replace("5", "S") + plate[6:]
-    # Last 4 digits
-    if len(plate) >= 10:
-        plate = plate[:-4] + plate[-4:].replace("O", "0").replace("I", "1").replace("S", "5").replace("B", "8")
-    return plate
+    return normalize_plate(plate).plate
+
+
+def trocr_pixel_values(imgs: list) -> torch.Tensor:
+    """BGR crops -> TrOCR pixel_values tensor (N, 3, 384, 384)."""
+    if TROCR_FAST_PREPROCESS:
+        return preprocess(imgs)
+    pil_imgs = [Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)) for img in imgs]
+    return processor(images=pil_imgs, return_tensors="pt").pixel_values
 
 
 def ocr_image(img: np.ndarray,d=false) -> (str, str):
@@ -55,8 +57,14 @@ def ocr_image(img: np.ndarray,d=false) -> (str, str):
     Run TrOCR on cropped plate image.
     Returns: (corrected_plate, raw_ocr_text)
     """
-    pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-    pixel_values = processor(images=pil_img, return_tensors="pt").pixel_values.to(device)
+    key = crop_hash(img)
+    cached = ocr_cache.get(key)
+    if cached is not None:
+        if d:
+            print(f"Cached: {cached[1]}\tCorrected: {cached[0]}")
+        return cached[0]
+
+    pixel_values = trocr_pixel_values([img]).to(device)
     generated_ids = model.generate(pixel_values, max_new_tokens=20)
     raw_text = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
 
@@ -64,9 +72,30 @@ def ocr_image(img: np.ndarray,d=false) -> (str, str):
     corrected = correct_plate_confusion(cleaned)
     if d:
         print(f"Raw text: {raw_text}\tCleaned: {cleaned}\tCorrected: {corrected}")
+    ocr_cache.put(key, (corrected, raw_text))
     return corrected
 
 
+def ocr_images(imgs: list) -> list:
+    """
+    Batched ocr_image: one TrOCR generate call for the crops not in ocr_cache.
+    Returns corrected plates.
+    """
+    if not imgs:
+        return []
+    keys = [crop_hash(img) for img in imgs]
+    results = [ocr_cache.get(key) for key in keys]
+    misses = [i for i, r in enumerate(results) if r is None]
+    if misses:
+        pixel_values = trocr_pixel_values([imgs[i] for i in misses]).to(device)
+        generated_ids = model.generate(pixel_values, max_new_tokens=20)
+        raw_texts = processor.batch_decode(generated_ids, skip_special_tokens=True)
+        for i, raw in zip(misses, raw_texts):
+            results[i] = (correct_plate_confusion(clean_plate(raw)), raw)
+            ocr_cache.put(keys[i], results[i])
+    return [corrected for corrected, _ in results]
+
+
 # -----------------------------
 # Detection / Masking
 # -----------------------------
@@ -81,6 +110,42 @@ def detect_plates(frame: np.ndarray) -> list:
     return dets
 
 
+def detect_plates_batch(frames: list) -> list:
+    """detect_plates for several frames in one YOLO call; one box list per frame."""
+    if not frames:
+        return []
+    results = plate_model.predict(frames, verbose=False)
+    out = []
+    for result in results:
+        dets = []
+        for box in result.boxes:
+            x1, y1, x2, y2 = map(int, box.xyxy[0].cpu().numpy())
+            score = float(box.conf[0].cpu().numpy())
+            dets.append([x1, y1, x2, y2, score])
+        out.append(dets)
+    return out
+
+
+def read_plates_batch(frames: list) -> list:
+    """
+    Detect and read every plate in each frame, batching both models across frames.
+    Returns one [(box, plate_crop, plate_text), ...] list per frame.
+    """
+    detections = detect_plates_batch(frames)
+    crops, owners = [], []
+    for i, (frame, dets) in enumerate(zip(frames, detections)):
+        for box in dets:
+            crop = crop_plate(frame, box)
+            if crop.size:
+                crops.append((box, crop))
+                owners.append(i)
+    texts = ocr_images([crop for _, crop in crops])
+    out = [[] for _ in frames]
+    for owner, (box, crop), text in zip(owners, crops, texts):
+        out[owner].append((box, crop, text))
+    return out
+
+
 def crop_plate(frame: np.ndarray, box: list) -> np.ndarray:
     """Crop plate using bounding box."""
     x1, y1, x2, y2 = map(int, box[:4])
@@ -90,7 +155,9 @@ def crop_plate(frame: np.ndarray, box: list) -> np.ndarray:
 # -----------------------------
 # SORT + Tracking
 # -----------------------------
-tracker = Sort()
+# Per-track OCR votes, freed as soon as SORT drops the track
+plate_votes = PlateVotes()
+tracker = Sort(on_track_deleted=plate_votes.release)
 
 
 def track_plates(detections: list) -> list:
@@ -109,23 +176,14 @@ def track_plates(detections: list) -> list:
 # -----------------------------
 # OCR aggregation per ID
 # -----------------------------
-id_to_plate_frames = defaultdict(list)
-
-
 def aggregate_ocr(track_id: int, plate_text: str) -> str:
     """
-    Store OCR results per track_id and return majority-vote corrected plate.
+    Fold OCR result into the track's vote and return the majority-vote corrected plate.
     """
     if plate_text:
-        id_to_plate_frames[track_id].append(plate_text)
-
-    plates = id_to_plate_frames[track_id]
-    if not plates:
+        aggregated = plate_votes.add(track_id, plate_text)
+    else:
+        aggregated = plate_votes.vote(track_id)
+    if not aggregated:
         return ""
-
-    # Majority vote per character
-    aggregated = ""
-    for chars in zip(*plates):
-        aggregated += Counter(chars).most_common(1)[0][0]
-
     return correct_plate_confusion(aggregated)
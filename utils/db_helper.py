@@ -1,4 +1,5 @@
 import os
+import json
 import sqlite3
 from datetime import datetime
 
@@ -7,12 +8,18 @@ os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
 def init_db():
     conn = sqlite3.connect(DB_PATH)
+    # incremental auto_vacuum lets the retention job hand freed pages back (only takes
+    # effect on a new database; `python -m utils.retention --full-vacuum` converts an old one),
+    # WAL keeps readers and the retention deletes from blocking the camera writes
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
     cur = conn.cursor()
     cur.executescript("""
     CREATE TABLE if not exists users (
         chat_id INTEGER PRIMARY KEY,
         username TEXT,
-        registered_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        registered_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        digest_seconds INTEGER DEFAULT 0
     );
 
     CREATE TABLE if not exists cars (
@@ -29,31 +36,120 @@ def init_db():
         detected_at DATETIME DEFAULT CURRENT_TIMESTAMP,
         processed INTEGER DEFAULT 0,
         location TEXT DEFAULT 'unknown',
-        image_path TEXT
+        image_path TEXT,
+        attempts INTEGER DEFAULT 0,
+        next_attempt_at REAL DEFAULT 0,
+        locations TEXT
+    );
+    CREATE INDEX if not exists idx_detections_location_time ON detections(location, detected_at);
+
+    CREATE TABLE if not exists detection_traces (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        trace_id INTEGER,
+        detect_id INTEGER,
+        location TEXT,
+        capture_ts REAL,
+        delivered_ts REAL,
+        stages TEXT,
+        FOREIGN KEY(detect_id) REFERENCES detections(detect_id) ON DELETE CASCADE
+    );
+    CREATE INDEX if not exists idx_detection_traces_capture ON detection_traces(capture_ts);
+
+    CREATE TABLE if not exists scan_segments (
+        segment_key TEXT PRIMARY KEY,
+        source TEXT,
+        detections INTEGER,
+        finished_at DATETIME DEFAULT CURRENT_TIMESTAMP
     );
     """)
+
+    # Databases created before the notification outbox (utils.outbox): add its columns and
+    # mark the existing rows as delivered, so they are not announced again
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(detections)")}
+    if "attempts" not in columns:
+        cur.execute("ALTER TABLE detections ADD COLUMN attempts INTEGER DEFAULT 0")
+        cur.execute("ALTER TABLE detections ADD COLUMN next_attempt_at REAL DEFAULT 0")
+        cur.execute("UPDATE detections SET processed = 1 WHERE processed = 0")
+    if "locations" not in columns:
+        # cameras of one cross-camera sighting (utils.plate_dedup), first one included
+        cur.execute("ALTER TABLE detections ADD COLUMN locations TEXT")
+    # per-chat digest window of the notifier (/digest), 0 sends every alert at once
+    if "digest_seconds" not in {row[1] for row in cur.execute("PRAGMA table_info(users)")}:
+        cur.execute("ALTER TABLE users ADD COLUMN digest_seconds INTEGER DEFAULT 0")
+    # image lookups of the retention job (utils.retention)
+    cur.execute("CREATE INDEX if not exists idx_detections_image_path ON detections(image_path)")
+    cur.execute("CREATE INDEX if not exists idx_detections_outbox ON detections(next_attempt_at) WHERE processed = 0")
     conn.commit()
     conn.close()
 
-def add_detection(plate_number, location="unknown", image_path=None):
-    conn = sqlite3.connect(DB_PATH)
+def add_detection(plate_number, location="unknown", image_path=None, processed=0):
+    """processed=0 queues the detection for notification (utils.outbox), 1 stores it as handled."""
+    conn = sqlite3.connect(DB_PATH, timeout=30)  # same as the outbox: wait out retention chunks
     cur = conn.cursor()
     cur.execute(
-        "INSERT INTO detections (plate_number, location, image_path, processed) VALUES (?, ?, ?, 0)",
-        (plate_number, location, image_path)
+        "INSERT INTO detections (plate_number, location, image_path, processed, locations) VALUES (?, ?, ?, ?, ?)",
+        (plate_number, location, image_path, processed, location)
     )
+    detect_id = cur.lastrowid
     conn.commit()
     conn.close()
+    return detect_id
 
-def get_user_chat_ids_for_plate(plate_number):
+def add_detection_location(detect_id, location):
+    """Append a camera to the locations of a detection (a merged cross-camera sighting)."""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute(
+        "UPDATE detections SET locations = COALESCE(locations, location) || ', ' || ? WHERE detect_id = ?",
+        (location, detect_id)
+    )
+    conn.commit()
+    conn.close()
+
+def add_scan_results(segment_key, source, rows):
+    """
+    Store the detections of one offline footage segment (scan_footage.py) and mark the
+    segment finished in the same transaction, so a resumed scan never duplicates rows.
+    rows: (plate_number, location, image_path, detected_at "YYYY-mm-dd HH:MM:SS" UTC)
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    with conn:
+        conn.executemany(
+            "INSERT INTO detections (plate_number, location, image_path, detected_at, processed) "
+            "VALUES (?, ?, ?, ?, 1)",
+            rows
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO scan_segments (segment_key, source, detections) VALUES (?, ?, ?)",
+            (segment_key, source, len(rows))
+        )
+    conn.close()
+
+def get_scanned_segments():
     conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT u.chat_id 
+    keys = {row[0] for row in conn.execute("SELECT segment_key FROM scan_segments")}
+    conn.close()
+    return keys
+
+def add_trace(trace, delivered_ts=None):
+    """Persist a sampled DetectionTrace (utils.tracing) next to its detections row."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "INSERT INTO detection_traces (trace_id, detect_id, location, capture_ts, delivered_ts, stages) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (trace.trace_id, trace.detect_id, trace.location, trace.capture_ts, delivered_ts,
+         json.dumps(trace.stages()))
+    )
+    conn.commit()
+    conn.close()
+
+def get_subscribers_for_plate(plate_number):
+    """[(chat_id, digest_seconds)] of the chats that registered plate_number."""
+    conn = sqlite3.connect(DB_PATH)
+    rows = conn.execute("""
+        SELECT u.chat_id, COALESCE(u.digest_seconds, 0)
         FROM users u
         JOIN cars c ON u.chat_id=c.chat_id
         WHERE c.plate_number=?
-    """, (plate_number,))
-    chat_ids = [row[0] for row in cur.fetchall()]
+    """, (plate_number,)).fetchall()
     conn.close()
-    return chat_ids
+    return rows
@@ -0,0 +1,332 @@
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields, replace
+from typing import Optional
+
+from utils.metrics import metrics
+from utils.tracing import DetectionTrace
+
+# ----------------------------
+# Detection event bus
+# ----------------------------
+# Camera workers publish one DetectionEvent per emitted plate. Every sink has
+# its own bounded queue and thread, so a slow sink only falls behind itself.
+# When a sink's queue is full, its overflow policy decides what happens:
+#   block        the publisher waits (for at most block_timeout, then the event is dropped)
+#   drop_oldest  the oldest queued event is discarded
+#   coalesce     a queued event for the same plate is replaced by the newer one;
+#                when full, the oldest is discarded
+# Events carry the image path, not pixels, so even large bounds cost little memory.
+#
+# A block sink can be given a spill journal. An event that still finds the queue full
+# after block_timeout, or whose handler fails (e.g. "database is locked"), is appended
+# there as a JSON line instead of being lost, and the sink replays the journal whenever
+# its queue runs empty. The db sink uses this, so a stuck SQLite writer (a long
+# retention delete, a locked file) costs the cameras at most block_timeout per event
+# (main uses 0: spill at once) and never loses a detection. A spilled event that fails EVENT_SPILL_MAX_ATTEMPTS
+# replays is moved to <journal>.failed for inspection. Replayed events have no trace,
+# and merges replayed without their sighting are stored as rows of their own.
+BLOCK, DROP_OLDEST, COALESCE = "block", "drop_oldest", "coalesce"
+SPILL_MAX_ATTEMPTS = int(os.getenv("EVENT_SPILL_MAX_ATTEMPTS", "1000"))
+MERGE_WAIT = float(os.getenv("EVENT_MERGE_WAIT", "30"))  # see db_sink
+
+
+@dataclass
+class DetectionEvent:
+    plate_number: str
+    location: str
+    image_path: str
+    action: str                      # utils.event_policy.NEW / UPDATE / MERGE
+    score: float = 0.0
+    track_id: int = -1
+    detected_at: float = field(default_factory=time.time)
+    trace: Optional[DetectionTrace] = None
+    sighting: Optional[object] = None  # utils.plate_dedup.Sighting shared by merged events
+
+    def to_dict(self):
+        d = {f.name: getattr(self, f.name) for f in fields(self) if f.name not in ("trace", "sighting")}
+        if self.sighting is not None:
+            d["locations"] = list(self.sighting.locations)
+        return d
+
+
+class SinkQueue:
+    def __init__(self, capacity, policy=BLOCK, block_timeout=None):
+        if policy not in (BLOCK, DROP_OLDEST, COALESCE):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.items = OrderedDict()  # key -> event, oldest first
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, event):
+        """Queue an event; returns False if it (or an older one) had to be discarded."""
+        with self.cond:
+            if self.policy == COALESCE:
+                key = (event.location, event.plate_number)
+                if key in self.items:
+                    older = self.items[key]
+                    if older.action != event.action:
+                        # an update folded into a not yet delivered first sighting is still new
+                        event = replace(event, action=older.action)
+                    self.items[key] = event  # keeps the queue position of the older event
+                    self.coalesced += 1
+                    return True
+            else:
+                key = next(self.seq)
+
+            lost = False
+            if len(self.items) >= self.capacity:
+                if self.policy == BLOCK:
+                    if not self.cond.wait_for(lambda: len(self.items) < self.capacity, self.block_timeout):
+                        self.dropped += 1
+                        return False
+                else:
+                    self.items.popitem(last=False)
+                    self.dropped += 1
+                    lost = True
+            self.items[key] = event
+            self.cond.notify_all()
+            return not lost
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items, timeout):
+                return None
+            _, event = self.items.popitem(last=False)
+            self.cond.notify_all()
+            return event
+
+
+class Sink(threading.Thread):
+    def __init__(self, name, handler, capacity=1000, policy=BLOCK, block_timeout=None, spill_path=None):
+        super().__init__(name=f"sink-{name}", daemon=True)
+        if spill_path and policy != BLOCK:
+            raise ValueError("Only block sinks can spill")
+        self.sink_name = name
+        self.handler = handler
+        self.queue = SinkQueue(capacity, policy, block_timeout)
+        self.spill_path = spill_path
+        self.spill_lock = threading.Lock()
+        self.spilled = 0
+        self.running = True
+        metrics.gauge("event_sink_depth", self.queue.__len__, label=name)
+        metrics.gauge("event_sink_dropped", lambda: self.queue.dropped, label=name)
+        metrics.gauge("event_sink_coalesced", lambda: self.queue.coalesced, label=name)
+        metrics.gauge("event_sink_spilled", lambda: self.spilled, label=name)
+
+    def run(self):
+        self.replay_spill()  # left over from the last run
+        while self.running or len(self.queue):
+            event = self.queue.get(timeout=0.5)
+            if event is None:
+                self.replay_spill()
+                self.idle()
+                continue
+            if not self.handle(event):
+                self.spill(event, overflow=False)
+        self.idle(force=True)
+
+    def idle(self, force=False):
+        """Give a handler with an idle(force) hook (db_sink) a chance to flush held state."""
+        idle = getattr(self.handler, "idle", None)
+        if idle is None:
+            return
+        try:
+            idle(force)
+        except Exception as e:
+            print(f"Event sink {self.sink_name} error:", e)
+
+    def handle(self, event):
+        """Run the handler on one event; False if it raised."""
+        # lag: how far behind the camera this sink is running
+        metrics.observe(f"sink_lag_{self.sink_name}", event.location, time.time() - event.detected_at)
+        try:
+            with metrics.time(f"sink_{self.sink_name}", event.location):
+                self.handler(event)
+            return True
+        except Exception as e:
+            metrics.inc(f"sink_{self.sink_name}_errors", event.location)
+            print(f"Event sink {self.sink_name} error:", e)
+            return False
+
+    def spill(self, event, overflow=True):
+        """
+        Append an event to the spill journal; False without one.
+        overflow: the queue could not take it (else its handler failed)
+        """
+        if not self.spill_path:
+            return False
+        try:
+            with self.spill_lock, open(self.spill_path, "a") as f:
+                f.write(json.dumps(event.to_dict()) + "\n")
+        except OSError as e:
+            print(f"Event sink {self.sink_name} spill error:", e)
+            return False
+        if overflow:
+            with self.queue.cond:
+                self.queue.dropped -= 1  # counted by the timed-out put(), but it was kept
+        self.spilled += 1
+        metrics.inc(f"sink_{self.sink_name}_spilled", event.location)
+        return True
+
+    def replay_spill(self):
+        """Feed the spill journal back through the handler (sink thread, queue empty)."""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        replaying = self.spill_path + ".replay"
+        with self.spill_lock:
+            if not os.path.exists(replaying):
+                os.replace(self.spill_path, replaying)
+        with open(replaying) as f:
+            lines = f.readlines()
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                d = json.loads(line)
+                d.pop("locations", None)
+                attempts = d.pop("spill_attempts", 0) + 1
+                event = DetectionEvent(**d)
+            except (ValueError, TypeError) as e:
+                print(f"Event sink {self.sink_name}: skipping unreadable spilled event:", e)
+                continue
+            if not self.handle(event):
+                # still failing: keep it and the rest for the next attempt
+                d = dict(event.to_dict(), spill_attempts=attempts)
+                target = self.spill_path
+                if attempts >= SPILL_MAX_ATTEMPTS:
+                    target = self.spill_path + ".failed"
+                    print(f"Event sink {self.sink_name}: giving up on a spilled event after {attempts} "
+                          f"attempts, moved to {target}")
+                with self.spill_lock:
+                    with open(target, "a") as f:
+                        f.write(json.dumps(d) + "\n")
+                    with open(self.spill_path, "a") as f:
+                        f.writelines(lines[i + 1:])
+                break
+        os.remove(replaying)
+
+    def stop(self):
+        self.running = False
+
+
+class EventBus:
+    def __init__(self):
+        self.sinks = []
+
+    def add_sink(self, name, handler, capacity=1000, policy=BLOCK, block_timeout=None, spill_path=None):
+        sink = Sink(name, handler, capacity, policy, block_timeout, spill_path)
+        self.sinks.append(sink)
+        return sink
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+
+    def publish(self, event):
+        if event.trace is not None:
+            event.trace.stamp("publish")
+        for sink in self.sinks:
+            if not sink.queue.put(event) and not sink.spill(event):
+                metrics.inc(f"sink_{sink.sink_name}_dropped", event.location)
+
+    def stop(self, timeout=None):
+        """Stop the sinks once they have drained their queues."""
+        for sink in self.sinks:
+            sink.stop()
+        for sink in self.sinks:
+            if sink.is_alive():
+                sink.join(timeout)
+
+
+# ----------------------------
+# Sinks
+# ----------------------------
+def db_sink(outbox, merge_wait=MERGE_WAIT):
+    """
+    Store the detection; NEW plates go through the notification outbox (utils.outbox).
+    MERGE events only add their camera to the row of the sighting's first event. The
+    first camera saves its image before publishing, so a merge can arrive before that
+    NEW: it is held until the NEW is stored, or stored on its own after merge_wait
+    seconds (the first event never made it). handle.idle() expires held merges.
+    """
+    from utils.db_helper import add_detection, add_detection_location
+    from utils.event_policy import NEW, MERGE
+    from utils.outbox import PENDING, DONE
+
+    held = {}  # id(sighting) -> [MERGE events waiting for the sighting's NEW]
+
+    def store_alone(event):
+        add_detection(event.plate_number, event.location, event.image_path, processed=DONE)
+
+    def idle(force=False):
+        now = time.time()
+        for key, events in list(held.items()):
+            if force or now - events[0].detected_at > merge_wait:
+                del held[key]
+                for event in events:
+                    try:
+                        store_alone(event)
+                    except Exception as e:
+                        print("Event sink db error (held merge):", e)
+
+    def handle(event):
+        idle()  # a busy sink may never run empty
+        sighting = event.sighting
+        if event.action == MERGE:
+            if sighting is not None and sighting.detect_id is not None:
+                add_detection_location(sighting.detect_id, event.location)
+            elif sighting is not None:
+                held.setdefault(id(sighting), []).append(event)
+            else:
+                store_alone(event)
+            return
+
+        trace = event.trace
+        detect_id = add_detection(event.plate_number, event.location, event.image_path,
+                                  processed=PENDING if event.action == NEW else DONE)
+        if sighting is not None and event.action == NEW:
+            sighting.detect_id = detect_id
+            for merged in held.pop(id(sighting), ()):
+                add_detection_location(detect_id, merged.location)
+        if trace is not None:
+            trace.detect_id = detect_id
+            trace.stamp("db_write")
+        if event.action == NEW:
+            if trace is not None:
+                trace.stamp("enqueue")
+            outbox.notify(detect_id, trace)
+
+    handle.idle = idle
+    return handle
+
+
+def jsonl_sink(path):
+    """Append every event as one JSON line (for local integrations and audits)."""
+    def handle(event):
+        with open(path, "a") as f:
+            f.write(json.dumps(event.to_dict()) + "\n")
+    return handle
+
+
+def webhook_sink(url, timeout=5.0):
+    """POST every event as JSON to a local webhook."""
+    def handle(event):
+        req = urllib.request.Request(url, data=json.dumps(event.to_dict()).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+    return handle
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+
+# ----------------------------
+# Detection event emission policy
+# ----------------------------
+# A tracked car shows its plate in every frame it is in view. Without a
+# policy, each of those frames becomes a JPEG, a detections row and a
+# Telegram message. DetectionEventPolicy decides which reads are worth
+# turning into an event:
+#   * one "new" event per (track, plate) once the plate is confirmed
+#   * an optional "update" event when a clearly better read arrives
+#   * a cooldown per (plate, location) shared by all tracks, so a car that
+#     loses and regains its track id does not re-alert
+
+NEW = "new"
+UPDATE = "update"
+MERGE = "merge"  # another camera's sighting folded into an earlier event (utils.plate_dedup)
+
+
+class DetectionEventPolicy:
+    def __init__(self, min_confirmations=None, cooldown_seconds=None,
+                 send_updates=None, update_margin=0.1, track_ttl=30.0, clock=time.monotonic):
+        """
+        min_confirmations: identical reads of a plate on one track before it is emitted
+        cooldown_seconds: minimum gap between events for the same (plate, location)
+        send_updates: emit an "update" event when a better read of an emitted plate arrives
+        update_margin: how much higher the score of a read must be to count as better
+        track_ttl: seconds after which state of a track that stopped reporting is dropped
+        """
+        if min_confirmations is None:
+            min_confirmations = int(os.getenv("EVENT_MIN_CONFIRMATIONS", "3"))
+        if cooldown_seconds is None:
+            cooldown_seconds = float(os.getenv("EVENT_COOLDOWN_SECONDS", "300"))
+        if send_updates is None:
+            send_updates = os.getenv("EVENT_SEND_UPDATES", "0") == "1"
+
+        self.min_confirmations = max(1, min_confirmations)
+        self.cooldown_seconds = cooldown_seconds
+        self.send_updates = send_updates
+        self.update_margin = update_margin
+        self.track_ttl = track_ttl
+        self.clock = clock
+
+        # track_id -> {"plates": {plate: count}, "emitted": {plate: score},
+        #              "suppressed": {plate}, "seen": t}
+        # suppressed: confirmed plates the cooldown held back; they never get an update
+        self.tracks = {}
+        # (plate, location) -> time of last event
+        self.last_event = {}
+        self.last_prune = clock()
+        self.lock = threading.Lock()
+
+    def observe(self, track_id, plate, location, score=1.0):
+        """
+        Record one plate read for a track.
+        Returns NEW, UPDATE or None (nothing should be written or sent).
+        """
+        if not plate:
+            return None
+
+        now = self.clock()
+        with self.lock:
+            if now - self.last_prune > 1.0:
+                self._prune(now)
+            state = self.tracks.get(track_id)
+            if state is None:
+                state = {"plates": {}, "emitted": {}, "suppressed": set(), "seen": now}
+                self.tracks[track_id] = state
+            state["seen"] = now
+
+            count = state["plates"].get(plate, 0) + 1
+            state["plates"][plate] = count
+
+            if plate in state["suppressed"]:
+                return None
+            emitted_score = state["emitted"].get(plate)
+            if emitted_score is not None:
+                if self.send_updates and score >= emitted_score + self.update_margin:
+                    state["emitted"][plate] = score
+                    return UPDATE
+                return None
+
+            if count < self.min_confirmations:
+                return None
+
+            # Confirmed on this track, now check the cross-track cooldown
+            key = (plate, location)
+            last = self.last_event.get(key)
+            if last is not None and now - last < self.cooldown_seconds:
+                # another track already announced it: nothing for this track, not even updates
+                state["suppressed"].add(plate)
+                return None
+            state["emitted"][plate] = score
+            self.last_event[key] = now
+            return NEW
+
+    def forget_track(self, track_id):
+        """Drop all state for a track that is no longer tracked."""
+        with self.lock:
+            self.tracks.pop(track_id, None)
+
+    def _prune(self, now):
+        self.last_prune = now
+        stale = [tid for tid, s in self.tracks.items() if now - s["seen"] > self.track_ttl]
+        for tid in stale:
+            del self.tracks[tid]
+        expired = [k for k, t in self.last_event.items() if now - t >= self.cooldown_seconds]
+        for k in expired:
+            del self.last_event[k]
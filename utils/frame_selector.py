@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import cv2
+import numpy as np
+
+# ----------------------------
+# Plate crop quality
+# ----------------------------
+# Cheap per-crop score used to decide which frames are worth an OCR call.
+# Every term is normalized to [0, 1] and combined with fixed weights.
+SHARPNESS_REF = 300.0      # Laplacian variance of a crisp plate crop
+AREA_REF = 120 * 30        # pixels of a comfortably readable plate
+ASPECT_RANGE = (2.0, 6.0)  # single-line plates ~4.5:1, two-line ~2:1
+WEIGHTS = {"sharpness": 0.45, "size": 0.2, "aspect": 0.15, "confidence": 0.2}
+
+
+def score_plate_crop(crop: np.ndarray, confidence: float = 1.0) -> float:
+    """
+    Score a plate crop by sharpness, size, aspect ratio and detector confidence.
+    Returns a value in [0, 1]; 0 for empty crops.
+    """
+    if crop is None or crop.size == 0:
+        return 0.0
+    h, w = crop.shape[:2]
+    if h < 2 or w < 2:
+        return 0.0
+
+    gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    sharpness = min(1.0, cv2.Laplacian(gray, cv2.CV_64F).var() / SHARPNESS_REF)
+    size = min(1.0, (w * h) / AREA_REF)
+
+    aspect = w / float(h)
+    lo, hi = ASPECT_RANGE
+    if aspect < lo:
+        aspect_score = aspect / lo
+    elif aspect > hi:
+        aspect_score = hi / aspect
+    else:
+        aspect_score = 1.0
+
+    return (WEIGHTS["sharpness"] * sharpness
+            + WEIGHTS["size"] * size
+            + WEIGHTS["aspect"] * aspect_score
+            + WEIGHTS["confidence"] * float(confidence))
+
+
+# ----------------------------
+# Top-K crops per track
+# ----------------------------
+class BestFrameBuffer:
+    """
+    Keeps the K best plate crops of every live track in a bounded min-heap,
+    so OCR runs on a handful of good frames per vehicle instead of every frame.
+    """
+
+    def __init__(self, k=3, confirm_after=5):
+        """
+        k: crops kept per track
+        confirm_after: plate sightings on a track before its crops are OCRed
+        """
+        self.k = k
+        self.confirm_after = confirm_after
+        self.tracks = {}
+        self._seq = itertools.count()
+
+    def add(self, track_id, score, plate_crop, vehicle_crop, frame_idx, ts=None):
+        """
+        Offer a crop for a track. Crops are only copied when they make the top K.
+        frame_idx, ts: frame number and capture time, kept with the entry; first_seen()
+        reports ts of the track's first crop
+        State lives until discard(), which CameraWorker calls when SORT deletes the track.
+        Returns True once the track has enough sightings and has not been OCRed yet.
+        """
+        state = self.tracks.get(track_id)
+        if state is None:
+            state = {"heap": [], "sightings": 0, "confirmed": False, "last_frame": frame_idx, "first_seen": ts}
+            self.tracks[track_id] = state
+        state["sightings"] += 1
+        state["last_frame"] = frame_idx
+
+        heap = state["heap"]
+        if len(heap) < self.k or score > heap[0][0]:
+            entry = {"score": score, "plate": plate_crop.copy(), "vehicle": vehicle_crop.copy(), "read": None,
+                     "frame": frame_idx, "ts": ts}
+            item = (score, next(self._seq), entry)
+            if len(heap) < self.k:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heapreplace(heap, item)
+
+        if not state["confirmed"] and state["sightings"] >= self.confirm_after:
+            state["confirmed"] = True
+            return True
+        return False
+
+    def pending(self, track_id):
+        """Best-first entries of a track that have not been OCRed yet."""
+        state = self.tracks.get(track_id)
+        if state is None:
+            return []
+        return [e for _, _, e in sorted(state["heap"], reverse=True) if e["read"] is None]
+
+    def best(self, track_id):
+        """Best-first entries of a track, OCRed or not."""
+        state = self.tracks.get(track_id)
+        if state is None:
+            return []
+        return [e for _, _, e in sorted(state["heap"], reverse=True)]
+
+    def first_seen(self, track_id):
+        """Capture time of the first plate crop offered for a track (None if not given)."""
+        state = self.tracks.get(track_id)
+        return None if state is None else state["first_seen"]
+
+    def discard(self, track_id):
+        self.tracks.pop(track_id, None)
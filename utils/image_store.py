@@ -0,0 +1,145 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from utils.metrics import metrics
+
+# ----------------------------
+# Detection image store
+# ----------------------------
+# Vehicle crops are JPEG-encoded on a small thread pool instead of the camera
+# thread and land in date/camera shards:
+#   database/detections/YYYY/MM/DD/<camera>/<plate>_<HHMMSS>_<content hash>.jpg
+# The returned handle is that path. It is what add_detection stores and what
+# the notifier opens, so old rows holding flat database/detections/*.jpg paths
+# keep working. The content hash in the name keeps same-second hits apart.
+# With IMAGE_DEDUPE=1, a crop identical to a recent one reuses its file.
+IMAGE_ROOT = os.path.join("database", "detections")
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "90"))
+IMAGE_WRITER_THREADS = int(os.getenv("IMAGE_WRITER_THREADS", "2"))
+IMAGE_DEDUPE = os.getenv("IMAGE_DEDUPE", "0") == "1"
+DEDUPE_CACHE_SIZE = 4096
+
+_unsafe = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def _slug(value):
+    return _unsafe.sub("_", str(value)).strip("_") or "unknown"
+
+
+def content_hash(image):
+    """Short hex digest of the pixels (and shape) of an image."""
+    image = np.ascontiguousarray(image)
+    h = hashlib.blake2b(digest_size=8)
+    h.update(str(image.shape).encode())
+    h.update(image.data)
+    return h.hexdigest()
+
+
+class ImageStore:
+    def __init__(self, root=IMAGE_ROOT, quality=IMAGE_JPEG_QUALITY, workers=IMAGE_WRITER_THREADS,
+                 dedupe=IMAGE_DEDUPE):
+        self.root = root
+        self.quality = quality
+        self.dedupe = dedupe
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-writer")
+        self.pending = {}             # handle -> Future of its write
+        self.recent = OrderedDict()   # content hash -> handle (dedupe only)
+        self.made_dirs = set()
+        self.lock = threading.Lock()
+        metrics.gauge("image_writes_pending", lambda: len(self.pending))
+
+    def put(self, image, plate_number, location, when=None):
+        """Queue a crop for writing and return its handle right away."""
+        when = when or datetime.now()
+        digest = content_hash(image)
+        with self.lock:
+            if self.dedupe and digest in self.recent:
+                handle = self.recent[digest]
+                self.recent.move_to_end(digest)
+                if handle in self.pending or os.path.exists(handle):
+                    metrics.inc("image_dedupe_hits", location)
+                    return handle
+
+            shard = os.path.join(self.root, when.strftime("%Y"), when.strftime("%m"), when.strftime("%d"),
+                                 _slug(location))
+            handle = os.path.join(shard, f"{_slug(plate_number)}_{when.strftime('%H%M%S')}_{digest}.jpg")
+            if handle in self.pending:
+                return handle  # the same crop is already being written
+            # the crop is usually a view into the frame; copy it so the writer never
+            # sees a buffer the camera thread has moved on from
+            future = self.executor.submit(self._write, handle, image.copy(), location)
+            self.pending[handle] = future
+            if self.dedupe:
+                self.recent[digest] = handle
+                if len(self.recent) > DEDUPE_CACHE_SIZE:
+                    self.recent.popitem(last=False)
+        future.add_done_callback(lambda _: self._done(handle))
+        return handle
+
+    def _write(self, handle, image, location):
+        with metrics.time("jpeg_encode", location):
+            ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError(f"JPEG encoding failed for {handle}")
+        directory = os.path.dirname(handle)
+        if directory not in self.made_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self.made_dirs.add(directory)
+        # write-then-rename, so readers never see a half-written file
+        tmp = f"{handle}.{threading.get_ident()}.tmp"
+        try:
+            f = open(tmp, "wb")
+        except FileNotFoundError:
+            # the shard was removed behind our back (retention empties shard dirs)
+            os.makedirs(directory, exist_ok=True)
+            f = open(tmp, "wb")
+        with f:
+            f.write(buf.tobytes())
+        os.replace(tmp, handle)
+
+    def forget_dir(self, directory):
+        """A shard directory was removed: the next write into it has to create it again."""
+        self.made_dirs.discard(directory)
+        self.made_dirs.discard(os.path.normpath(directory))
+
+    def _done(self, handle):
+        with self.lock:
+            future = self.pending.pop(handle, None)
+        if future is not None and future.exception() is not None:
+            metrics.inc("image_write_errors")
+            print("Image write error:", future.exception())
+
+    def wait(self, handle, timeout=None):
+        """Block until the handle's file is on disk (no-op for written or legacy handles)."""
+        future = self.pending.get(handle)
+        if future is not None:
+            future.result(timeout)
+        return handle
+
+    def open(self, handle, timeout=10.0):
+        """Open a stored image for reading, waiting for its write if still queued."""
+        return open(self.wait(handle, timeout), "rb")
+
+    def flush(self, timeout=None):
+        """Wait for every queued write."""
+        for future in list(self.pending.values()):
+            try:
+                future.result(timeout)
+            except Exception:
+                pass  # reported by _done
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+
+# Process-wide store shared by the camera workers and the notifier
+image_store = ImageStore()
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from utils.metrics import metrics
+
+# ----------------------------
+# Async micro-batching for model inference
+# ----------------------------
+# Async handlers submit single items and await their result. A worker thread
+# collects whatever arrives within max_wait of the first item (up to
+# max_batch) and runs them as one batch_fn call, so concurrent requests share
+# a detector / OCR forward pass and the event loop never runs a model itself.
+
+
+class InferenceBusy(Exception):
+    """Raised by submit() when max_pending requests are already waiting."""
+
+
+class InferenceBatcher:
+    def __init__(self, batch_fn, max_batch=8, max_wait=0.025, max_pending=64, name="inference"):
+        """
+        batch_fn: list of items -> list of results (same order); runs on the worker thread
+        """
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.name = name
+        self.pending = deque()  # (item, future, loop, submitted_at)
+        self.cond = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self.thread.start()
+        metrics.gauge("inference_pending", lambda: len(self.pending), label=name)
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.cond:
+            if len(self.pending) >= self.max_pending:
+                metrics.inc("inference_rejected", self.name)
+                raise InferenceBusy()
+            self.pending.append((item, future, loop, time.perf_counter()))
+            self.cond.notify()
+        return await future
+
+    def _next_batch(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self.pending or not self.running)
+            if not self.running:
+                return []
+            # give concurrent requests a moment to join the batch
+            deadline = time.monotonic() + self.max_wait
+            while len(self.pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.cond.wait(remaining):
+                    break
+            return [self.pending.popleft() for _ in range(min(self.max_batch, len(self.pending)))]
+
+    def _run(self):
+        while self.running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            for _, _, _, submitted_at in batch:
+                metrics.observe("inference_queue_wait", self.name, started - submitted_at)
+            metrics.inc("inference_batches", self.name)
+            metrics.inc("inference_items", self.name, len(batch))  # items / batches = mean batch size
+            try:
+                with metrics.time("inference_batch", self.name):
+                    results = self.batch_fn([item for item, _, _, _ in batch])
+                outcomes = [(future, loop, result, None) for (_, future, loop, _), result in zip(batch, results)]
+            except Exception as e:
+                outcomes = [(future, loop, None, e) for _, future, loop, _ in batch]
+            for future, loop, result, error in outcomes:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join()
+
+
+def _resolve(future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -0,0 +1,81 @@
+import os
+
+import cv2
+import numpy as np
+
+# ----------------------------
+# Keyframe mode
+# ----------------------------
+# With KEYFRAME_INTERVAL=N the vehicle detector runs on every Nth frame only. On the frames
+# in between, SORT carries the tracks on their Kalman motion model (Sort.propagate). With
+# KEYFRAME_REFINE=flow, each propagated box is also measured with Lucas-Kanade optical flow
+# on corners inside the track's last box. When fewer than KEYFRAME_MIN_CONFIDENCE of the
+# tracks can be followed that way, the next frame is a keyframe regardless of N.
+# KEYFRAME_INTERVAL=1 (the default) runs the detector on every frame, as before.
+KEYFRAME_INTERVAL = int(os.getenv("KEYFRAME_INTERVAL", "1"))
+KEYFRAME_REFINE = os.getenv("KEYFRAME_REFINE", "flow")  # flow | none
+KEYFRAME_MIN_CONFIDENCE = float(os.getenv("KEYFRAME_MIN_CONFIDENCE", "0.5"))
+
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+class FlowRefiner:
+    """
+    Refine callback for Sort.propagate: shifts each track's last box by the median optical
+    flow of the corners inside it. Call next_frame() on every frame, observe() with
+    every tracker output (detector or propagated frame) and reset() after every keyframe,
+    so a low confidence forces one early keyframe rather than all of them.
+    """
+
+    def __init__(self, max_corners=30, min_points=5, fb_threshold=1.0):
+        self.max_corners = max_corners
+        self.min_points = min_points
+        self.fb_threshold = fb_threshold  # px of forward-backward error a corner may have
+        self.prev_gray = self.gray = None
+        self.boxes = {}        # track id -> last [x1, y1, x2, y2]
+        self.confidence = 1.0  # share of tracks followed on the last propagated frame
+
+    def next_frame(self, frame):
+        self.prev_gray = self.gray
+        self.gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def reset(self):
+        """Forget the last confidence: after a keyframe, or before a propagate that may not call us."""
+        self.confidence = 1.0
+
+    def observe(self, tracked):
+        self.boxes = {int(row[4]): row[:4].copy() for row in tracked}
+
+    def __call__(self, predicted):
+        out = np.full((len(predicted), 4), np.nan)
+        if self.prev_gray is None or not len(predicted):
+            self.confidence = 1.0
+            return out
+        for i, row in enumerate(predicted):
+            box = self.boxes.get(int(row[4]))
+            if box is not None:
+                shift = self._shift(box)
+                if shift is not None:
+                    out[i] = box + np.tile(shift, 2)
+        self.confidence = float(np.mean(~np.isnan(out[:, 0])))
+        return out
+
+    def _shift(self, box):
+        """Median (dx, dy) of the corners inside box from the previous frame to this one."""
+        h, w = self.gray.shape
+        x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+        x2, y2 = min(w, int(box[2])), min(h, int(box[3]))
+        if x2 - x1 < 8 or y2 - y1 < 8:
+            return None
+        corners = cv2.goodFeaturesToTrack(self.prev_gray[y1:y2, x1:x2], self.max_corners, 0.01, 5)
+        if corners is None or len(corners) < self.min_points:
+            return None
+        p0 = (corners + np.float32([x1, y1])).astype(np.float32)
+        p1, st, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, self.gray, p0, None, **LK_PARAMS)
+        back, st_back, _ = cv2.calcOpticalFlowPyrLK(self.gray, self.prev_gray, p1, None, **LK_PARAMS)
+        fb_error = np.linalg.norm((p0 - back).reshape(-1, 2), axis=1)
+        good = (st.ravel() == 1) & (st_back.ravel() == 1) & (fb_error < self.fb_threshold)
+        if good.sum() < self.min_points:
+            return None
+        return np.median((p1 - p0).reshape(-1, 2)[good], axis=0)
@@ -0,0 +1,193 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ----------------------------
+# Hot-path metrics
+# ----------------------------
+# Per-camera stage timers (Prometheus histograms), counters and gauges.
+# Recording is a perf_counter pair, a bisect and a few integer adds, i.e.
+# a few microseconds per frame against tens of milliseconds of inference.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Bucket upper bound below which a fraction q of the observations fall."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class _StageTimer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        self.stages = {}    # (stage, camera) -> _Histogram
+        self.counters = {}  # (name, camera) -> int
+        self.gauges = {}    # (name, label) -> callable returning a number
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _hist(self, stage, camera):
+        key = (stage, camera)
+        hist = self.stages.get(key)
+        if hist is None:
+            with self.lock:
+                hist = self.stages.setdefault(key, _Histogram())
+        return hist
+
+    def time(self, stage, camera=""):
+        """Context manager timing one pass through a stage: with metrics.time("ocr", loc): ..."""
+        return _StageTimer(self._hist(stage, camera))
+
+    def observe(self, stage, camera, seconds):
+        self._hist(stage, camera).observe(seconds)
+
+    def inc(self, name, camera="", n=1):
+        key = (name, camera)
+        # dict item updates are effectively atomic under the GIL; counters are
+        # only ever incremented, so a lost race costs at most one count
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def gauge(self, name, fn, label=""):
+        """Register a callable sampled at export time (e.g. a queue's qsize)."""
+        with self.lock:
+            self.gauges[(name, label)] = fn
+
+    # ----------------------------
+    # Export
+    # ----------------------------
+    # Exporters iterate over dict() copies: the camera threads may add keys meanwhile.
+    def render_prometheus(self):
+        lines = [
+            "# HELP autovision_stage_seconds Time spent per pipeline stage.",
+            "# TYPE autovision_stage_seconds histogram",
+        ]
+        for (stage, camera), hist in sorted(dict(self.stages).items()):
+            labels = f'stage="{_esc(stage)}",camera="{_esc(camera)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, hist.counts):
+                cumulative += n
+                lines.append(f'autovision_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'autovision_stage_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"autovision_stage_seconds_sum{{{labels}}} {hist.total:.6f}")
+            lines.append(f"autovision_stage_seconds_count{{{labels}}} {hist.count}")
+
+        for name in sorted({n for n, _ in dict(self.counters)}):
+            lines.append(f"# TYPE autovision_{name}_total counter")
+            for (n, camera), value in sorted(dict(self.counters).items()):
+                if n == name:
+                    lines.append(f'autovision_{name}_total{{camera="{_esc(camera)}"}} {value}')
+
+        # one TYPE line per metric name; a repeated one makes Prometheus reject the scrape
+        gauges = sorted(dict(self.gauges).items(), key=lambda kv: kv[0])
+        for name in sorted({n for (n, _), _ in gauges}):
+            lines.append(f"# TYPE autovision_{name} gauge")
+            for (n, label), fn in gauges:
+                if n != name:
+                    continue
+                try:
+                    value = float(fn())
+                except Exception:
+                    continue
+                lines.append(f'autovision_{name}{{label="{_esc(label)}"}} {value}')
+
+        lines.append(f"autovision_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Plain dict of all stage timers and counters (for JSON reports)."""
+        stages = {
+            f"{camera}/{stage}": {"count": h.count, "mean_ms": h.total / h.count * 1000 if h.count else 0.0,
+                                  "p95_le_ms": h.quantile(0.95) * 1000}
+            for (stage, camera), h in sorted(dict(self.stages).items())
+        }
+        counters = {f"{camera}/{name}": v for (name, camera), v in sorted(dict(self.counters).items())}
+        return {"stages": stages, "counters": counters}
+
+    def summary(self):
+        """Short human-readable report (used by the /metrics bot command)."""
+        lines = [f"Uptime: {(time.time() - self.started_at) / 3600:.1f} h"]
+        cameras = sorted({c for _, c in dict(self.stages)} | {c for _, c in dict(self.counters)})
+        for camera in cameras:
+            lines.append(f"\n📷 {camera or 'global'}")
+            for (stage, cam), hist in sorted(dict(self.stages).items()):
+                if cam != camera or not hist.count:
+                    continue
+                mean_ms = hist.total / hist.count * 1000
+                lines.append(f"• {stage}: {hist.count}× avg {mean_ms:.1f} ms, p95 ≤ {hist.quantile(0.95) * 1000:g} ms")
+            for (name, cam), value in sorted(dict(self.counters).items()):
+                if cam == camera:
+                    lines.append(f"• {name}: {value}")
+        for (name, label), fn in sorted(self.gauges.items(), key=lambda kv: kv[0]):
+            try:
+                lines.append(f"• {name}{f' ({label})' if label else ''}: {fn():g}")
+            except Exception:
+                continue
+        return "\n".join(lines)
+
+
+def _esc(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide registry shared by the workers
+metrics = Metrics()
+
+
+def start_metrics_server(port, host="127.0.0.1", registry=None):
+    """Serve the Prometheus text format on http://host:port/metrics from a daemon thread."""
+    registry = registry or metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from utils.metrics import metrics
+
+# ----------------------------
+# OCR result cache
+# ----------------------------
+# Parked cars are re-read all day and the bot sees the same demo photos again and
+# again. Plate crops are keyed by a difference hash (dHash): the grayscale crop is
+# area-resized to HASH_WIDTH+1 x HASH_HEIGHT and every bit tells whether a cell is
+# clearly brighter than its left neighbour. Cells within HASH_MARGIN grey levels
+# count as flat, so sensor noise on the plate background does not flip bits.
+# A wrong hit hands one car's plate to another, so only crops that carry enough
+# detail are cached: crops smaller than the hash grid (upscaled, the hash is mostly
+# interpolation) and hashes with fewer than OCR_CACHE_MIN_BITS set bits (flat or
+# low-contrast crops) get no key. Lookups are exact by default. Two neighbouring
+# plates (MH12AB1234 / MH12AB1284) can be only one or two bits apart on small or
+# dim crops, while noise flips a dozen, so near hits cannot be made safe with one
+# fixed distance. OCR_CACHE_MAX_DISTANCE>0 enables them anyway, capped at one bit
+# per BITS_PER_DISTANCE set bits of the hashes compared.
+# benchmarks/ocr_cache_check.py verifies that neighbouring plates never hit each
+# other. Entries live for OCR_CACHE_TTL seconds from when they were read and are
+# evicted least recently used beyond OCR_CACHE_SIZE.
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE", "1") == "1"
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "4096"))
+OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", "3600"))
+OCR_CACHE_MAX_DISTANCE = int(os.getenv("OCR_CACHE_MAX_DISTANCE", "0"))
+OCR_CACHE_MIN_BITS = int(os.getenv("OCR_CACHE_MIN_BITS", "48"))
+BITS_PER_DISTANCE = 32
+HASH_WIDTH, HASH_HEIGHT = 64, 16
+HASH_MARGIN = 8
+
+
+def crop_hash(crop):
+    """dHash of a BGR / gray plate crop as an int, or None for a crop too small or flat to key on."""
+    if crop is None or crop.size == 0:
+        return None
+    if crop.shape[0] < HASH_HEIGHT or crop.shape[1] < HASH_WIDTH + 1:
+        return None
+    gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (HASH_WIDTH + 1, HASH_HEIGHT), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = small[:, 1:] > small[:, :-1] + HASH_MARGIN
+    key = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return key if key.bit_count() >= OCR_CACHE_MIN_BITS else None
+
+
+class OCRCache:
+    def __init__(self, max_size=OCR_CACHE_SIZE, ttl=OCR_CACHE_TTL, max_distance=OCR_CACHE_MAX_DISTANCE,
+                 clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.clock = clock
+        self.entries = OrderedDict()  # hash -> (value, read_at), least recently used first
+        self.lock = threading.Lock()
+        self.hits = self.near_hits = self.misses = self.evictions = self.expired = 0
+
+    def get(self, key):
+        """Cached value for a crop hash, or None."""
+        if key is None:
+            return None
+        with self.lock:
+            now = self.clock()
+            found = self._fresh(key, now)
+            limit = min(self.max_distance, key.bit_count() // BITS_PER_DISTANCE)
+            if found is None and limit:
+                best = limit + 1
+                for other in list(self.entries):
+                    distance = (other ^ key).bit_count()
+                    if (distance < best and distance <= other.bit_count() // BITS_PER_DISTANCE
+                            and self._fresh(other, now) is not None):
+                        found, best = other, distance
+                if found is not None:
+                    self.near_hits += 1
+            if found is None:
+                self.misses += 1
+                metrics.inc("ocr_cache_misses")
+                return None
+            self.hits += 1
+            metrics.inc("ocr_cache_hits")
+            self.entries.move_to_end(found)
+            return self.entries[found][0]
+
+    def _fresh(self, key, now):
+        """key if it is stored and not expired (expired entries are dropped)."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl:
+            del self.entries[key]
+            self.expired += 1
+            return None
+        return key
+
+    def put(self, key, value):
+        if key is None:
+            return
+        with self.lock:
+            self.entries[key] = (value, self.clock())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"OCR cache: {s['size']} entries, {s['hits']} hits ({s['near_hits']} near), "
+                f"{s['misses']} misses, hit rate {s['hit_rate']:.0%}, "
+                f"{s['evictions']} evicted, {s['expired']} expired")
+
+
+class _NoCache(OCRCache):
+    """OCR_CACHE=0: every lookup misses, nothing is stored."""
+
+    def get(self, key):
+        return None
+
+    def put(self, key, value):
+        pass
+
+
+# Process-wide cache shared by CameraWorker (utils.util.ocr_plate) and bot.py (util.ocr_images)
+ocr_cache = OCRCache() if OCR_CACHE_ENABLED else _NoCache()
+metrics.gauge("ocr_cache_size", ocr_cache.__len__)
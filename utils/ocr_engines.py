@@ -0,0 +1,95 @@
+import os
+import re
+
+import cv2
+import numpy as np
+
+from utils.plate_grammar import normalize as normalize_plate
+
+# ----------------------------
+# Plate OCR engines
+# ----------------------------
+# Uniform callables crop (BGR np.ndarray) -> cleaned plate text for every OCR
+# path in the repo, so they can be compared on the same crops
+# (benchmarks/ocr_eval.py). Each engine is loaded lazily because the
+# backends are optional dependencies.
+LPRNET_MODEL_PATH = os.getenv("LPRNET_MODEL_PATH", "us_lprnet_baseline18_deployable.onnx")
+LPRNET_CHARACTERS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+TESSERACT_CMD = os.getenv("TESSERACT_CMD")
+TESSERACT_CONFIG = "-l eng --oem 1 --psm 7"  # single text line
+
+
+def clean_plate(text):
+    """Keep only uppercase alphanumerics."""
+    return "".join(re.findall(r"[A-Z0-9]", (text or "").upper()))
+
+
+def trocr_engine():
+    from utils.util import ocr_plate, load_trocr
+    load_trocr()
+    return lambda crop: ocr_plate(crop)[0]
+
+
+def tesseract_engine():
+    """The new.py path: inverse binary threshold, single-line Tesseract, plate grammar search."""
+    import pytesseract
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+    def read(crop):
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        _, thresh = cv2.threshold(gray, 64, 255, cv2.THRESH_BINARY_INV)
+        text = clean_plate(pytesseract.image_to_string(thresh, config=TESSERACT_CONFIG))
+        match = normalize_plate(text, search=True)
+        return match.plate if match.format else text
+    return read
+
+
+def lprnet_preprocess(crop):
+    """Resize to 96x48, RGB, [0,1], NCHW."""
+    img = cv2.cvtColor(cv2.resize(crop, (96, 48)), cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+    return np.transpose(img, (2, 0, 1))[None]
+
+
+def ctc_greedy_decode(output, characters=LPRNET_CHARACTERS):
+    """
+    Greedy CTC decoding of a batch: (B, T) class indices or (B, T, C) scores -> B strings.
+    Repeats are collapsed and blanks (class 0) dropped with array masks; only the final
+    per-row join is Python.
+    """
+    indices = np.asarray(output)
+    if indices.ndim == 3:
+        indices = indices.argmax(axis=-1)
+    indices = indices.reshape(len(indices), -1).astype(np.int64)
+    prev = np.concatenate([np.full((len(indices), 1), -1), indices[:, :-1]], axis=1)
+    keep = (indices != 0) & (indices != prev)
+    lookup = np.array([""] + list(characters))
+    chars = lookup[np.clip(indices, 0, len(characters))]
+    return ["".join(row[mask]) for row, mask in zip(chars, keep)]
+
+
+def lprnet_engine(model_path=LPRNET_MODEL_PATH):
+    """The make_dataset.py path: LPRNet ONNX export with greedy CTC decoding."""
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    session = ort.InferenceSession(model_path, options)
+    input_name = session.get_inputs()[0].name
+
+    def read(crop):
+        output = session.run(None, {input_name: lprnet_preprocess(crop)})[0]
+        return clean_plate(ctc_greedy_decode(output)[0])
+    return read
+
+
+ENGINES = {
+    "trocr": trocr_engine,
+    "tesseract": tesseract_engine,
+    "lprnet": lprnet_engine,
+}
+
+
+def load_engine(name):
+    if name not in ENGINES:
+        raise ValueError(f"Unknown OCR engine {name!r}, expected one of {', '.join(ENGINES)}")
+    return ENGINES[name]()
@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils import db_helper
+
+# ----------------------------
+# Notification outbox
+# ----------------------------
+# The detections table is the outbox: a row that should be announced is
+# written with processed=PENDING in the same INSERT that records it, so an
+# alert survives crashes and Telegram outages. The notifier claims batches
+# with one UPDATE ... RETURNING, sends them and marks them DONE. A failed
+# delivery goes back to PENDING with exponential backoff until
+# OUTBOX_MAX_ATTEMPTS is reached. Rows still CLAIMED at startup were in
+# flight during a crash and are released again (at-least-once delivery).
+PENDING, DONE, CLAIMED, FAILED = 0, 1, 2, 3
+
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "900"))
+TRACE_CACHE_SIZE = 1024
+
+
+class Outbox:
+    def __init__(self, batch_size=OUTBOX_BATCH, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 backoff_base=OUTBOX_BACKOFF_BASE, backoff_max=OUTBOX_BACKOFF_MAX):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.wakeup = threading.Event()
+        # in-memory latency traces of rows written by this process, by detect_id;
+        # bounded, and simply missing for rows recovered after a restart
+        self.traces = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        # DB_PATH is looked up on every call so benchmarks can point it elsewhere
+        return sqlite3.connect(db_helper.DB_PATH, timeout=30)
+
+    # ----------------------------
+    # Producer side (camera threads)
+    # ----------------------------
+    def notify(self, detect_id, trace=None):
+        """Wake the notifier after a PENDING row was committed."""
+        if trace is not None:
+            with self.lock:
+                self.traces[detect_id] = trace
+                if len(self.traces) > TRACE_CACHE_SIZE:
+                    self.traces.popitem(last=False)
+        self.wakeup.set()
+
+    # ----------------------------
+    # Consumer side (notifier)
+    # ----------------------------
+    def recover(self):
+        """Release rows claimed by a process that died before marking them."""
+        conn = self._connect()
+        with conn:
+            n = conn.execute("UPDATE detections SET processed=? WHERE processed=?", (PENDING, CLAIMED)).rowcount
+        conn.close()
+        return n
+
+    def claim(self, limit=None):
+        """
+        Atomically move up to `limit` due rows from PENDING to CLAIMED and return them as
+        (detect_id, plate_number, location, image_path, attempts, locations, detected_at epoch).
+        """
+        self.wakeup.clear()  # before the query: a notify() racing with it still wakes the next wait()
+        conn = self._connect()
+        with conn:
+            rows = conn.execute("""
+                UPDATE detections SET processed=?
+                WHERE detect_id IN (
+                    SELECT detect_id FROM detections
+                    WHERE processed=? AND next_attempt_at <= ?
+                    ORDER BY detect_id LIMIT ?)
+                RETURNING detect_id, plate_number, location, image_path, attempts, COALESCE(locations, location),
+                          CAST(strftime('%s', detected_at) AS REAL)
+            """, (CLAIMED, PENDING, time.time(), limit or self.batch_size)).fetchall()
+        conn.close()
+        rows.sort()
+        return rows
+
+    def trace_for(self, detect_id):
+        with self.lock:
+            return self.traces.pop(detect_id, None)
+
+    def mark_done(self, detect_ids):
+        if not detect_ids:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany("UPDATE detections SET processed=? WHERE detect_id=?",
+                             [(DONE, i) for i in detect_ids])
+        conn.close()
+
+    def mark_failed(self, failures):
+        """failures: [(detect_id, attempts so far)]. Reschedule with backoff, or give up."""
+        if not failures:
+            return
+        now = time.time()
+        params = []
+        for detect_id, attempts in failures:
+            attempts += 1
+            state = FAILED if attempts >= self.max_attempts else PENDING
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+            params.append((state, attempts, now + delay, detect_id))
+        conn = self._connect()
+        with conn:
+            conn.executemany("UPDATE detections SET processed=?, attempts=?, next_attempt_at=? WHERE detect_id=?",
+                             params)
+        conn.close()
+
+    def next_due_in(self):
+        """Seconds until the earliest PENDING row is due (None when there is none)."""
+        conn = self._connect()
+        row = conn.execute("SELECT MIN(next_attempt_at) FROM detections WHERE processed=?", (PENDING,)).fetchone()
+        conn.close()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def pending_count(self):
+        conn = self._connect()
+        n = conn.execute("SELECT COUNT(*) FROM detections WHERE processed IN (?, ?)", (PENDING, CLAIMED)).fetchone()[0]
+        conn.close()
+        return n
+
+    def wait(self, timeout):
+        self.wakeup.wait(timeout)
+
+
+# Process-wide outbox shared by the camera workers and the notifier
+outbox = Outbox()
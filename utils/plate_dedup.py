@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+
+from utils.metrics import metrics
+
+# ----------------------------
+# Cross-camera plate dedup
+# ----------------------------
+# DetectionEventPolicy only deduplicates per camera. A car passing the entry gate, ramp
+# and exit cameras within a minute would still produce three images, three rows and
+# three alerts. PlateDedup sits in front of the event bus for all CameraWorkers. The
+# first NEW event of a plate in a camera group starts a sighting. Events of the same
+# plate from other cameras of the group are merged into it while the gaps between
+# sightings stay within PLATE_DEDUP_WINDOW seconds (a sliding window). A merge skips
+# the image and the alert; the db sink only adds the camera to the first row's
+# `locations`.
+#
+# Topology: CAMERA_GROUPS="Entry Gate,Ramp,Exit Gate;North,South" ("name=..." prefixes
+# are allowed). Cameras not listed form a group of their own. By default every camera is
+# in one group.
+#
+# Memory is fixed. Sightings live in a hash keyed by (group, plate). A ring of
+# PLATE_DEDUP_BUCKETS time slots per window remembers which keys were touched in each
+# slot. Advancing the clock clears the slot that falls out of the window. observe() does
+# one hash lookup plus amortized O(1) expiry work. At PLATE_DEDUP_CAPACITY sightings the
+# oldest slots are expired early. If the table is still full, an event passes through
+# undeduplicated rather than waiting.
+PLATE_DEDUP_WINDOW = float(os.getenv("PLATE_DEDUP_WINDOW", "60"))
+PLATE_DEDUP_BUCKETS = int(os.getenv("PLATE_DEDUP_BUCKETS", "12"))
+PLATE_DEDUP_CAPACITY = int(os.getenv("PLATE_DEDUP_CAPACITY", "50000"))
+
+FIRST, MERGED, DUPLICATE = "first", "merged", "duplicate"
+ALL_CAMERAS = "*"
+
+
+class Sighting:
+    """One car's pass through a camera group; detect_id is set by the db sink."""
+    __slots__ = ("plate", "group", "locations", "first_seen", "last_seen", "slot", "detect_id")
+
+    def __init__(self, plate, group, location, now, slot):
+        self.plate = plate
+        self.group = group
+        self.locations = [location]
+        self.first_seen = self.last_seen = now
+        self.slot = slot
+        self.detect_id = None
+
+
+def parse_camera_groups(spec):
+    """ "a,b;c,d" or "gate=a,b;yard=c,d" -> {location: group}; empty spec -> one global group."""
+    groups = {}
+    for i, item in enumerate(s for s in (spec or "").split(";") if s.strip()):
+        name, _, cameras = item.rpartition("=")
+        for camera in cameras.split(","):
+            if camera.strip():
+                groups[camera.strip()] = name.strip() or f"group{i}"
+    return groups
+
+
+class PlateDedup:
+    def __init__(self, window=PLATE_DEDUP_WINDOW, groups=None, buckets=PLATE_DEDUP_BUCKETS,
+                 capacity=PLATE_DEDUP_CAPACITY, clock=time.monotonic):
+        """
+        window: max seconds between two sightings of a plate for them to be merged (0 disables)
+        groups: {location: group}; None or {} puts every camera into one group
+        """
+        self.window = window
+        self.groups = groups or {}
+        self.slot_seconds = max(window, 1e-3) / max(1, buckets)
+        self.ring = [[] for _ in range(max(1, buckets) + 1)]  # keys touched per slot
+        self.capacity = capacity
+        self.clock = clock
+        self.index = {}     # (group, plate) -> Sighting
+        self.current = None  # absolute number of the newest slot
+        self.lock = threading.Lock()
+        self.merged = self.overflow = 0
+
+    def group_of(self, location):
+        if not self.groups:
+            return ALL_CAMERAS
+        return self.groups.get(location, location)
+
+    def observe(self, plate, location, now=None):
+        """
+        Record a NEW event of plate at location.
+        Returns (sighting, status):
+          FIRST      publish as usual; the event should carry the sighting
+          MERGED     another camera of the group reported it within the window; location was added
+          DUPLICATE  this camera is already part of the sighting; drop the event
+        sighting is None when dedup is disabled or the table is full (publish as usual).
+        """
+        if self.window <= 0:
+            return None, FIRST
+        now = self.clock() if now is None else now
+        key = (self.group_of(location), plate)
+        with self.lock:
+            self._advance(now)
+            sighting = self.index.get(key)
+            if sighting is not None and now - sighting.last_seen <= self.window:
+                sighting.last_seen = now
+                self._touch(key, sighting)
+                if location in sighting.locations:
+                    return sighting, DUPLICATE
+                sighting.locations.append(location)
+                self.merged += 1
+                return sighting, MERGED
+
+            if sighting is None and len(self.index) >= self.capacity and not self._make_room():
+                self.overflow += 1
+                metrics.inc("plate_dedup_overflow", location)
+                return None, FIRST
+            sighting = Sighting(plate, key[0], location, now, self.current)
+            self.index[key] = sighting
+            self.ring[self.current % len(self.ring)].append(key)
+            return sighting, FIRST
+
+    def _touch(self, key, sighting):
+        """Move a refreshed sighting into the current slot."""
+        if sighting.slot != self.current:
+            sighting.slot = self.current
+            self.ring[self.current % len(self.ring)].append(key)
+
+    def _advance(self, now):
+        slot = int(now // self.slot_seconds)
+        if self.current is None or slot - self.current >= len(self.ring):
+            # first call, or idle for longer than the whole ring: everything has expired
+            if self.current is not None:
+                self.index.clear()
+                for keys in self.ring:
+                    keys.clear()
+            self.current = slot
+            return
+        while self.current < slot:
+            self.current += 1
+            self._expire(self.current % len(self.ring), self.current - len(self.ring))
+
+    def _expire(self, pos, slot):
+        """Clear ring position pos, which holds the keys touched in `slot`."""
+        for key in self.ring[pos]:
+            sighting = self.index.get(key)
+            if sighting is not None and sighting.slot <= slot:
+                del self.index[key]
+        self.ring[pos].clear()
+
+    def _make_room(self):
+        """Table full: expire the oldest slots early. False if everything is in the current slot."""
+        n = len(self.ring)
+        for age in range(n - 1, 0, -1):
+            slot = self.current - age
+            self._expire(slot % n, slot)
+            if len(self.index) < self.capacity:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.index)
+
+
+# Shared by every CameraWorker in the process
+plate_dedup = PlateDedup(groups=parse_camera_groups(os.getenv("CAMERA_GROUPS", "")))
+metrics.gauge("plate_dedup_sightings", plate_dedup.__len__)
@@ -0,0 +1,177 @@
+import itertools
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+# ----------------------------
+# Plate grammar
+# ----------------------------
+# Every plate format is a sequence of position classes:
+#   L letter, D digit, A letter or digit
+# each with a length range and optionally a closed set of values (e.g. state codes).
+# Formats are expanded once into fixed-length templates. A raw OCR read is then
+# matched against the templates of its length. Each run of positions is translated
+# with that class's confusion table (0->O in letter runs, O->0 in digit runs, ...),
+# and the parse with the fewest corrections wins.
+# normalize() returns the canonical plate plus a validity score in [0, 1].
+# Reads scoring below PLATE_MIN_SCORE are rejected before they are stored or sent.
+
+# Confusions seen in TrOCR / Tesseract / LPRNet output
+TO_LETTER = str.maketrans("01245678", "OIZASGTB")
+TO_DIGIT = str.maketrans("OQDUILZSGTBA", "000011256784")
+TABLES = {"L": TO_LETTER, "D": TO_DIGIT, "A": {}}
+CHECKS = {"L": str.isalpha, "D": str.isdigit, "A": str.isalnum}
+
+INDIAN_STATE_CODES = frozenset(
+    "AN AP AR AS BR CG CH DD DL DN GA GJ HP HR JH JK KA KL LA LD MH ML MN MP MZ NL OD OR "
+    "PB PY RJ SK TG TN TR TS UA UK UP WB".split()
+)
+CORRECTION_PENALTY = 0.15
+PLATE_MIN_SCORE = float(os.getenv("PLATE_MIN_SCORE", "0.5"))
+
+
+@dataclass(frozen=True)
+class Segment:
+    name: str
+    cls: str
+    min_len: int
+    max_len: int
+    choices: Optional[frozenset] = None
+
+
+@dataclass(frozen=True)
+class PlateMatch:
+    plate: str                    # canonical plate (the cleaned read when nothing matched)
+    format: Optional[str]         # name of the matching format, None when invalid
+    score: float                  # 1.0 exact, lower per corrected character, 0.0 invalid
+    corrections: int = 0
+
+    @property
+    def valid(self):
+        return self.score >= PLATE_MIN_SCORE
+
+
+class PlateFormat:
+    def __init__(self, name, segments, prior=1.0):
+        self.name = name
+        self.segments = segments
+        self.prior = prior
+
+    @classmethod
+    def from_pattern(cls, name, pattern, prior=1.0):
+        """
+        Compact syntax, one token per segment: "L{2} D{1,2} L{0,3} D{4}".
+        A token is a class letter (L, D, A) or a literal (e.g. BH), with an optional
+        {n} / {min,max} repeat count.
+        """
+        segments = []
+        for i, token in enumerate(pattern.split()):
+            m = re.fullmatch(r"([A-Z0-9]+)(?:\{(\d+)(?:,(\d+))?\})?", token)
+            if not m:
+                raise ValueError(f"Bad plate pattern token {token!r} in {name}")
+            body, lo, hi = m.groups()
+            lo = int(lo) if lo else 1
+            hi = int(hi) if hi else lo
+            if body in CHECKS:
+                segments.append(Segment(f"s{i}", body, lo, hi))
+            else:
+                literal_cls = "D" if body.isdigit() else "L" if body.isalpha() else "A"
+                segments.append(Segment(f"s{i}", literal_cls, len(body), len(body), frozenset([body])))
+        return cls(name, segments, prior)
+
+    def templates(self):
+        """All fixed-length expansions: (length, runs) with runs = [(start, end, cls, choices)]."""
+        ranges = [range(s.min_len, s.max_len + 1) for s in self.segments]
+        # longest segments first: the conventional 2-digit district / 2-letter series wins ties
+        for lengths in sorted(itertools.product(*ranges), key=lambda ls: [-n for n in ls]):
+            runs, pos = [], 0
+            for seg, n in zip(self.segments, lengths):
+                if n:
+                    runs.append((pos, pos + n, seg.cls, seg.choices))
+                pos += n
+            yield pos, runs
+
+
+INDIA = PlateFormat("IN", [
+    Segment("state", "L", 2, 2, INDIAN_STATE_CODES),
+    Segment("district", "D", 1, 2),
+    Segment("series", "L", 0, 3),
+    Segment("number", "D", 4, 4),
+])
+INDIA_BH = PlateFormat.from_pattern("IN_BH", "D{2} BH D{4} L{1,2}")  # Bharat series, e.g. 22BH1234AA
+
+
+def _env_formats():
+    """PLATE_FORMATS="UK=L{2} D{2} L{3};NL=A{2} A{2} A{2}" adds formats for other countries."""
+    formats = []
+    for item in os.getenv("PLATE_FORMATS", "").split(";"):
+        if "=" in item:
+            name, pattern = item.split("=", 1)
+            formats.append(PlateFormat.from_pattern(name.strip(), pattern.strip()))
+    return formats
+
+
+class PlateGrammar:
+    def __init__(self, formats):
+        self.formats = list(formats)
+        self.by_length = {}
+        for fmt in self.formats:
+            for length, runs in fmt.templates():
+                self.by_length.setdefault(length, []).append((fmt, runs))
+        self.lengths = sorted(self.by_length, reverse=True)
+        self.normalize = lru_cache(maxsize=8192)(self._normalize)
+
+    def _parse(self, text, fmt, runs):
+        out, corrections = [], 0
+        for start, end, cls, choices in runs:
+            raw = text[start:end]
+            fixed = raw.translate(TABLES[cls])
+            if not CHECKS[cls](fixed) or (choices is not None and fixed not in choices):
+                return None
+            corrections += sum(a != b for a, b in zip(raw, fixed))
+            out.append(fixed)
+        score = fmt.prior * max(0.0, 1.0 - CORRECTION_PENALTY * corrections)
+        return PlateMatch("".join(out), fmt.name, score, corrections)
+
+    def match(self, text):
+        """Best parse of an already cleaned string of exactly one plate, or None."""
+        best = None
+        for fmt, runs in self.by_length.get(len(text), ()):
+            m = self._parse(text, fmt, runs)
+            if m is not None and (best is None or m.score > best.score):
+                best = m
+                if m.corrections == 0:
+                    break
+        return best
+
+    def _normalize(self, raw, search=False):
+        """
+        Canonical plate and validity score of one OCR read.
+        search=True also looks for a plate inside longer text (Tesseract picks up borders and
+        "IND" stickers), preferring the longest valid substring.
+        """
+        text = "".join(ch for ch in (raw or "").upper() if ch.isalnum() and ch.isascii())
+        best = self.match(text)
+        if search and best is None:
+            for n in self.lengths:
+                if n >= len(text):
+                    continue
+                for i in range(len(text) - n + 1):
+                    m = self.match(text[i:i + n])
+                    if m is not None and (best is None or m.score > best.score):
+                        best = m
+                if best is not None:
+                    break
+        return best or PlateMatch(text, None, 0.0)
+
+    def normalize_many(self, reads, search=False):
+        """Batch API: one PlateMatch per read (repeated reads hit the cache)."""
+        return [self.normalize(r, search) for r in reads]
+
+
+# Shared grammar: Indian formats plus whatever PLATE_FORMATS adds
+grammar = PlateGrammar([INDIA, INDIA_BH] + _env_formats())
+normalize = grammar.normalize
+normalize_many = grammar.normalize_many
@@ -0,0 +1,69 @@
+import threading
+import numpy as np
+
+# ----------------------------
+# Fixed-size OCR vote per track
+# ----------------------------
+# Instead of keeping every OCR string of a track, each read is folded into
+# a length histogram and a positional character-count matrix. Memory per
+# track is constant no matter how long the track lives.
+CHARSET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+MAX_PLATE_LEN = 12
+
+_CHARSET_ARR = np.array(list(CHARSET))
+_CHAR_INDEX = np.full(128, -1, dtype=np.int16)
+for _i, _c in enumerate(CHARSET):
+    _CHAR_INDEX[ord(_c)] = _i
+
+
+class PlateVoteAccumulator:
+    __slots__ = ("lengths", "counts")
+
+    def __init__(self):
+        self.lengths = np.zeros(MAX_PLATE_LEN + 1, dtype=np.float32)
+        self.counts = np.zeros((MAX_PLATE_LEN, len(CHARSET)), dtype=np.float32)
+
+    def add(self, text: str, weight: float = 1.0):
+        """Fold one read into the vote. Characters outside CHARSET are ignored."""
+        codes = np.frombuffer(text.upper().encode("ascii", "ignore"), dtype=np.uint8)
+        idx = _CHAR_INDEX[codes[codes < 128]]
+        idx = idx[idx >= 0][:MAX_PLATE_LEN]
+        if len(idx) == 0:
+            return
+        self.lengths[len(idx)] += weight
+        self.counts[np.arange(len(idx)), idx] += weight
+
+    def vote(self) -> str:
+        """Majority length, then majority character at each position up to that length."""
+        if not self.lengths.any():
+            return ""
+        length = int(np.argmax(self.lengths))
+        return "".join(_CHARSET_ARR[np.argmax(self.counts[:length], axis=1)])
+
+
+class PlateVotes:
+    """Accumulators of all live tracks; release() is wired to Sort's on_track_deleted."""
+
+    def __init__(self):
+        self.tracks = {}
+        self.lock = threading.Lock()
+
+    def add(self, track_id, text, weight=1.0):
+        with self.lock:
+            acc = self.tracks.get(track_id)
+            if acc is None:
+                acc = self.tracks[track_id] = PlateVoteAccumulator()
+            acc.add(text, weight)
+            return acc.vote()
+
+    def vote(self, track_id):
+        with self.lock:
+            acc = self.tracks.get(track_id)
+            return acc.vote() if acc is not None else ""
+
+    def release(self, track_id):
+        with self.lock:
+            self.tracks.pop(track_id, None)
+
+    def __len__(self):
+        return len(self.tracks)
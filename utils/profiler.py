@@ -0,0 +1,138 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+# ----------------------------
+# On-demand profiling of the running service
+# ----------------------------
+# A session runs for N seconds and writes to profiles/<timestamp>/:
+#   * <thread>.pstats       cProfile of each worker thread (load with pstats / snakeviz)
+#   * stacks.collapsed      sampled stacks of the worker threads, flamegraph.pl / speedscope ready
+#   * tracemalloc_diff.txt  allocations that grew between session start and end
+# cProfile only sees the thread that enabled it, so the workers call
+# profiler.checkpoint() once per loop iteration to join a running session.
+PROFILE_DIR = os.path.join(os.getcwd(), "profiles")
+SAMPLE_INTERVAL = 0.005
+TRACEMALLOC_FRAMES = 16
+
+
+class ProfileController:
+    def __init__(self, out_root=PROFILE_DIR):
+        self.out_root = out_root
+        self.lock = threading.RLock()  # start() may run from a signal handler on the main thread
+        self.session = None
+        self.local = threading.local()
+
+    @property
+    def active(self):
+        return self.session is not None
+
+    def start(self, seconds=30, threads=("camera", "notifier")):
+        """
+        Start a session over threads whose names start with one of the given prefixes.
+        Returns the output directory, or None if a session is already running.
+        """
+        with self.lock:
+            if self.session is not None:
+                return None
+            out_dir = os.path.join(self.out_root, datetime.now().strftime("%Y%m%d_%H%M%S"))
+            os.makedirs(out_dir, exist_ok=True)
+
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            session = {
+                "id": object(),
+                "out_dir": out_dir,
+                "deadline": time.monotonic() + seconds,
+                "threads": tuple(threads),
+                "stacks": Counter(),
+                "stop": threading.Event(),
+                "started_tracemalloc": started_tracemalloc,
+                "snapshot": tracemalloc.take_snapshot(),
+            }
+            self.session = session
+
+        sampler = threading.Thread(target=self._sample, args=(session,), name="profiler-sampler", daemon=True)
+        sampler.start()
+        timer = threading.Timer(seconds, self._finish, args=(session,))
+        timer.daemon = True
+        timer.start()
+        print(f"Profiling {', '.join(threads)} threads for {seconds}s → {out_dir}")
+        return out_dir
+
+    def checkpoint(self):
+        """Called by worker loops; enables/dumps this thread's cProfile as sessions start and end."""
+        session = self.session
+        current = getattr(self.local, "session", None)
+        if current is not None and current is not session:
+            # our session ended (or a new one started): dump what we collected
+            prof = self.local.profile
+            prof.disable()
+            name = threading.current_thread().name.replace(os.sep, "_").replace(" ", "_")
+            prof.dump_stats(os.path.join(current["out_dir"], f"{name}.pstats"))
+            self.local.session = None
+            current = None
+        if session is not None and current is None and self._wanted(session, threading.current_thread()):
+            self.local.profile = cProfile.Profile()
+            self.local.session = session
+            self.local.profile.enable()
+
+    def _wanted(self, session, thread):
+        return thread.name.startswith(session["threads"])
+
+    def _sample(self, session):
+        """Wall-clock stack sampler for the selected threads."""
+        stop = session["stop"]
+        stacks = session["stacks"]
+        while not stop.wait(SAMPLE_INTERVAL):
+            names = {t.ident: t.name for t in threading.enumerate() if self._wanted(session, t)}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident)
+                if name is None:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                parts.append(name.replace(" ", "_"))
+                stacks[";".join(reversed(parts))] += 1
+
+    def _finish(self, session):
+        session["stop"].set()
+        out_dir = session["out_dir"]
+
+        with open(os.path.join(out_dir, "stacks.collapsed"), "w") as f:
+            for stack, count in session["stacks"].most_common():
+                f.write(f"{stack} {count}\n")
+
+        after = tracemalloc.take_snapshot()
+        if session["started_tracemalloc"]:
+            tracemalloc.stop()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        before = session["snapshot"].filter_traces(filters)
+        after = after.filter_traces(filters)
+        with open(os.path.join(out_dir, "tracemalloc_diff.txt"), "w") as f:
+            f.write("Top growth by line\n")
+            for stat in after.compare_to(before, "lineno")[:50]:
+                f.write(f"{stat}\n")
+            f.write("\nTop growth by traceback\n")
+            for stat in after.compare_to(before, "traceback")[:10]:
+                f.write(f"\n{stat}\n")
+                for line in stat.traceback.format():
+                    f.write(f"{line}\n")
+
+        with self.lock:
+            if self.session is session:
+                self.session = None
+        print(f"Profile written to {out_dir} (thread .pstats files follow on their next loop)")
+
+
+# Process-wide controller, triggered by SIGUSR1 or the /profile bot command
+profiler = ProfileController()
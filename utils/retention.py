@@ -0,0 +1,187 @@
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from utils.image_store import IMAGE_ROOT, image_store
+
+# ----------------------------
+# Detection retention
+# ----------------------------
+# Rows older than their location's TTL are appended to a gzip CSV per month
+# (database/archive/detections-YYYY-MM.csv.gz) and then deleted together with
+# their images and traces. Each chunk is its own short transaction, so camera
+# writes only ever wait for one chunk.
+# RETENTION_DAYS sets the default TTL (0 keeps rows forever).
+# RETENTION_DAYS_BY_LOCATION overrides it per location, e.g. "Gate 1=30,Parking=7".
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "90"))
+RETENTION_DAYS_BY_LOCATION = os.getenv("RETENTION_DAYS_BY_LOCATION", "")
+RETENTION_ARCHIVE = os.getenv("RETENTION_ARCHIVE", "1") == "1"
+ARCHIVE_DIR = os.path.join("database", "archive")
+CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK", "500"))
+CHUNK_PAUSE = 0.05          # seconds between chunks, lets writers in
+ORPHAN_GRACE = 3600         # images younger than this may still be waiting for their row
+VACUUM_PAGES = 2000         # pages released per incremental_vacuum pass
+
+
+def parse_ttls(spec=RETENTION_DAYS_BY_LOCATION):
+    """'Gate 1=30,Parking=7' -> {'Gate 1': 30.0, 'Parking': 7.0}"""
+    ttls = {}
+    for item in spec.split(","):
+        if "=" in item:
+            location, days = item.rsplit("=", 1)
+            ttls[location.strip()] = float(days)
+    return ttls
+
+
+def _cutoff(days, now):
+    # detected_at is SQLite's CURRENT_TIMESTAMP, i.e. UTC "YYYY-MM-DD HH:MM:SS"
+    return (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def archive_rows(df, archive_dir=ARCHIVE_DIR):
+    """Append detections rows to their month's gzip CSV (gzip members concatenate cleanly)."""
+    os.makedirs(archive_dir, exist_ok=True)
+    for month, rows in df.groupby(df["detected_at"].str[:7]):
+        path = os.path.join(archive_dir, f"detections-{month}.csv.gz")
+        rows.to_csv(path, mode="a", header=not os.path.exists(path), index=False, compression="gzip")
+
+
+def _remove_image(conn, path):
+    if not path or conn.execute("SELECT 1 FROM detections WHERE image_path=? LIMIT 1", (path,)).fetchone():
+        return False  # still referenced (deduplicated images are shared between rows)
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def expire_detections(conn, ttls, default_days, now, archive=True, archive_dir=ARCHIVE_DIR, dry_run=False):
+    stats = {"rows_deleted": 0, "rows_archived": 0, "images_deleted": 0}
+    locations = [row[0] for row in conn.execute("SELECT DISTINCT location FROM detections")]
+    for location in locations:
+        days = ttls.get(location, default_days)
+        if not days or days <= 0:
+            continue
+        cutoff = _cutoff(days, now)
+        last_id = 0
+        while True:
+            df = pd.read_sql_query(
+                "SELECT * FROM detections WHERE location=? AND detected_at < ? AND detect_id > ? "
+                "ORDER BY detect_id LIMIT ?",
+                conn, params=(location, cutoff, last_id, CHUNK_SIZE))
+            if df.empty:
+                break
+            last_id = int(df["detect_id"].iloc[-1])
+            if dry_run:
+                stats["rows_deleted"] += len(df)
+                continue
+            if archive:
+                archive_rows(df, archive_dir)
+                stats["rows_archived"] += len(df)
+
+            ids = [(int(i),) for i in df["detect_id"]]
+            with conn:
+                conn.executemany("DELETE FROM detection_traces WHERE detect_id=?", ids)
+                conn.executemany("DELETE FROM detections WHERE detect_id=?", ids)
+            stats["rows_deleted"] += len(ids)
+            for path in df["image_path"].dropna().unique():
+                stats["images_deleted"] += _remove_image(conn, path)
+            time.sleep(CHUNK_PAUSE)
+    return stats
+
+
+def _referenced_in(conn, directory):
+    """
+    Absolute paths of the images stored under directory, as rows reference them (relative
+    or absolute). A range scan on idx_detections_image_path, so only this shard's rows
+    are read.
+    """
+    found = set()
+    for prefix in {os.path.join(directory, ""), os.path.join(os.path.abspath(directory), "")}:
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        rows = conn.execute("SELECT image_path FROM detections WHERE image_path >= ? AND image_path < ?",
+                            (prefix, upper))
+        found.update(os.path.abspath(row[0]) for row in rows)
+    return found
+
+
+def remove_orphan_images(conn, image_root=IMAGE_ROOT, grace=ORPHAN_GRACE, dry_run=False):
+    """Delete images no detections row points at (and leftover .tmp files), then empty shard dirs."""
+    if not os.path.isdir(image_root):
+        return 0
+    limit = time.time() - grace
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(image_root, topdown=False):
+        # per directory, so memory follows the largest shard, not the whole table
+        referenced = _referenced_in(conn, dirpath) if filenames else set()
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.abspath(path) in referenced:
+                continue
+            try:
+                if os.path.getmtime(path) < limit:
+                    if not dry_run:
+                        os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        if dirpath != image_root and not dry_run:
+            try:
+                os.rmdir(dirpath)  # only succeeds when empty
+                image_store.forget_dir(dirpath)
+            except OSError:
+                pass
+    return removed
+
+
+def incremental_vacuum(conn, pages=VACUUM_PAGES):
+    """Return up to `pages` free pages to the OS. Needs auto_vacuum=INCREMENTAL (see init_db)."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return False
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()  # frees one page per step
+    return True
+
+
+def run_retention(db_path, ttls=None, default_days=RETENTION_DAYS, archive=RETENTION_ARCHIVE,
+                  archive_dir=ARCHIVE_DIR, image_root=IMAGE_ROOT, now=None, dry_run=False):
+    """One full pass: expire rows, remove orphaned images, compact. Returns a stats dict."""
+    ttls = parse_ttls() if ttls is None else ttls
+    now = now or datetime.now(timezone.utc)
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        stats = expire_detections(conn, ttls, default_days, now, archive, archive_dir, dry_run)
+        stats["orphans_deleted"] = remove_orphan_images(conn, image_root, dry_run=dry_run)
+        stats["vacuumed"] = False if dry_run else incremental_vacuum(conn)
+    finally:
+        conn.close()
+    return stats
+
+
+def main():
+    from utils.db_helper import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Archive and delete expired detections")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be removed")
+    parser.add_argument("--no-archive", action="store_true", help="Delete without writing archive files")
+    parser.add_argument("--full-vacuum", action="store_true",
+                        help="Switch the database to incremental auto_vacuum with a one-off VACUUM "
+                             "(locks the database while it runs; stop the service first)")
+    args = parser.parse_args()
+
+    if args.full_vacuum:
+        conn = sqlite3.connect(args.db)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.close()
+    stats = run_retention(args.db, archive=not args.no_archive, dry_run=args.dry_run)
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import time
+import cv2
+
+# ----------------------------
+# Frame sources
+# ----------------------------
+# Everything CameraWorker reads frames from looks like cv2.VideoCapture
+# (read() -> (ok, frame), release()). Besides live cameras this covers
+# recorded video files and directories of still images, so the pipeline
+# can be replayed offline.
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class ImageDirectoryCapture:
+    """Reads the images of a directory in name order, one per read()."""
+
+    def __init__(self, path, fps=25.0):
+        self.files = sorted(
+            os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.fps = fps
+        self.pos = 0
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.files)
+        return 0
+
+    def read(self):
+        while self.pos < len(self.files):
+            frame = cv2.imread(self.files[self.pos])
+            self.pos += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        self.files = []
+
+
+class PacedCapture:
+    """
+    Wraps a capture and sleeps so frames come out at the source frame rate,
+    i.e. a recorded file behaves like a live camera.
+    """
+
+    def __init__(self, cap, fps=None):
+        self.cap = cap
+        self.fps = fps or cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.next_at = None
+
+    def read(self):
+        now = time.monotonic()
+        if self.next_at is not None and now < self.next_at:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at or now) + 1.0 / self.fps
+        return self.cap.read()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+def is_live_source(source):
+    """Integer device indexes and stream URLs are live; files and directories are not."""
+    if isinstance(source, int):
+        return True
+    return isinstance(source, str) and "://" in source
+
+
+def open_capture(source, realtime=False):
+    """
+    Open a camera index, stream URL, video file or image directory.
+    realtime=True paces recorded sources at their native frame rate.
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        cap = ImageDirectoryCapture(source)
+    else:
+        cap = cv2.VideoCapture(source)
+    if realtime and not is_live_source(source):
+        cap = PacedCapture(cap)
+    return cap
@@ -0,0 +1,133 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import sqlite3
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# ----------------------------
+# Detection latency traces
+# ----------------------------
+# Each emitted detection carries a DetectionTrace from the frame its plate was
+# first seen on to the Telegram delivery. The "buffer" stage is the time the track
+# spent collecting crops (BestFrameBuffer confirm_after, retirement) before the frame
+# that triggered the read. Stamps are wall-clock seconds so
+# they stay comparable across threads and after being persisted.
+# A sampled subset is stored in detection_traces next to the detections row.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+# Stage order along the pipeline; the report measures each stage from the previous stamp
+# (buffer: until the frame that triggered the read; publish: handed to the event bus;
+# db_write/enqueue then happen on the db sink thread)
+STAGES = ("capture", "buffer", "track", "ocr", "save_image", "publish", "db_write", "enqueue", "dequeue", "lookup_chats",
+          "send_photo")
+
+_ids = itertools.count(1)
+
+
+class DetectionTrace:
+    __slots__ = ("trace_id", "location", "capture_ts", "stamps", "sampled", "detect_id")
+
+    def __init__(self, location, capture_ts=None, sample_rate=None):
+        self.trace_id = next(_ids)
+        self.location = location
+        self.capture_ts = capture_ts if capture_ts is not None else time.time()
+        self.stamps = [("capture", self.capture_ts)]
+        rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.sampled = rate >= 1.0 or random.random() < rate
+        self.detect_id = None
+
+    def stamp(self, stage, ts=None):
+        self.stamps.append((stage, ts if ts is not None else time.time()))
+
+    def stages(self):
+        """{stage: seconds since capture} (last stamp wins for repeated stages)."""
+        return {stage: ts - self.capture_ts for stage, ts in self.stamps}
+
+    def total(self):
+        return self.stamps[-1][1] - self.capture_ts
+
+
+def stage_durations(stages):
+    """Per-stage durations from a {stage: seconds since capture} dict, in pipeline order."""
+    out = {}
+    prev = 0.0
+    for stage in STAGES[1:]:
+        if stage in stages:
+            out[stage] = stages[stage] - prev
+            prev = stages[stage]
+    return out
+
+
+# ----------------------------
+# Report
+# ----------------------------
+def trace_report(db_path, since_hours=None):
+    """
+    p50/p95/p99 capture-to-delivery latency per camera, plus the same for every stage.
+    Returns {location: {"total": {...}, "stages": {stage: {...}}, "count": n}}.
+    """
+    conn = sqlite3.connect(db_path)
+    query = "SELECT location, stages FROM detection_traces WHERE delivered_ts IS NOT NULL"
+    params = ()
+    if since_hours:
+        query += " AND capture_ts >= ?"
+        params = (time.time() - since_hours * 3600,)
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+
+    totals = defaultdict(list)
+    per_stage = defaultdict(lambda: defaultdict(list))
+    for location, stages_json in rows:
+        stages = json.loads(stages_json)
+        totals[location].append(max(stages.values()))
+        for stage, seconds in stage_durations(stages).items():
+            per_stage[location][stage].append(seconds)
+
+    def pct(values):
+        arr = np.asarray(values) * 1000
+        return {"p50_ms": float(np.percentile(arr, 50)), "p95_ms": float(np.percentile(arr, 95)),
+                "p99_ms": float(np.percentile(arr, 99))}
+
+    return {
+        location: {
+            "count": len(values),
+            "total": pct(values),
+            "stages": {stage: pct(v) for stage, v in per_stage[location].items()},
+        }
+        for location, values in totals.items()
+    }
+
+
+def main():
+    from utils.db_helper import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Capture-to-delivery latency report")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--since-hours", type=float, help="Only traces captured in the last N hours")
+    parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    report = trace_report(args.db, args.since_hours)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    if not report:
+        print("No delivered traces recorded yet.")
+        return
+    for location, r in sorted(report.items()):
+        t = r["total"]
+        print(f"\n📷 {location}: {r['count']} traces, capture→delivery "
+              f"p50 {t['p50_ms']:.0f} ms, p95 {t['p95_ms']:.0f} ms, p99 {t['p99_ms']:.0f} ms")
+        for stage in STAGES[1:]:
+            if stage in r["stages"]:
+                s = r["stages"][stage]
+                print(f"   {stage:<14} p50 {s['p50_ms']:>8.1f}  p95 {s['p95_ms']:>8.1f}  p99 {s['p99_ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
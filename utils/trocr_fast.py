@@ -0,0 +1,93 @@
+import threading
+
+import cv2
+import numpy as np
+
+# ----------------------------
+# TrOCR fast preprocessing
+# ----------------------------
+# TrOCRProcessor turns every crop into a PIL image, resizes it with PIL and rescales /
+# normalizes it in float64 NumPy, one image at a time. For plate crops this is a
+# noticeable share of each OCR call. TrOCRPreprocessor does the same steps directly on
+# the BGR uint8 crops:
+#   resize with cv2 (area filter on the axes that shrink, bilinear on the ones that grow,
+#   close to PIL's antialiased bilinear), then one lookup-table pass per channel that does
+#   BGR->RGB, rescale and normalize at once, straight into a reused (N, 3, H, W) float32
+#   batch buffer.
+# Only the resize filter differs from the processor: enlarged crops (most plates) match
+# within 1/255, shrunk ones within ~0.3/255 on average with larger differences on sharp
+# edges. benchmarks/trocr_preprocess_bench.py measures both paths.
+
+
+class TrOCRPreprocessor:
+    def __init__(self, height=384, width=384, mean=(0.5, 0.5, 0.5), std=(0.5, 0.5, 0.5),
+                 rescale_factor=1 / 255, do_rescale=True, do_normalize=True):
+        self.height, self.width = height, width
+        values = np.arange(256, dtype=np.float64)
+        if do_rescale:
+            values = values * rescale_factor
+        luts = []
+        for m, s in zip(mean, std):
+            luts.append((values - m) / s if do_normalize else values)
+        self.lut = np.stack(luts).astype(np.float32)  # (3, 256), RGB order
+        self._local = threading.local()
+
+    @classmethod
+    def from_processor(cls, processor):
+        """Take size, mean, std and rescale settings from a TrOCRProcessor / ViTImageProcessor."""
+        ip = getattr(processor, "image_processor", processor)
+        size = ip.size
+        if isinstance(size, int):
+            height = width = size
+        else:  # dict, or SizeDict in newer transformers
+            height = size.get("height") or size.get("shortest_edge")
+            width = size.get("width") or size.get("shortest_edge")
+        return cls(
+            height=height,
+            width=width,
+            mean=ip.image_mean,
+            std=ip.image_std,
+            rescale_factor=ip.rescale_factor,
+            do_rescale=ip.do_rescale,
+            do_normalize=ip.do_normalize,
+        )
+
+    def _buffer(self, n):
+        """Per-thread batch buffer, grown when a larger batch comes in."""
+        buf = getattr(self._local, "buf", None)
+        if buf is None or len(buf) < n:
+            buf = np.empty((n, 3, self.height, self.width), dtype=np.float32)
+            self._local.buf = buf
+        return buf[:n]
+
+    def _resize(self, crop):
+        """Area-shrink the axes that are too large first, then bilinear to the exact size."""
+        h, w = crop.shape[:2]
+        if w > self.width or h > self.height:
+            crop = cv2.resize(crop, (min(w, self.width), min(h, self.height)), interpolation=cv2.INTER_AREA)
+            h, w = crop.shape[:2]
+        if (w, h) == (self.width, self.height):
+            return crop
+        return cv2.resize(crop, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+
+    def fill(self, crops):
+        """
+        crops: list of BGR (or gray / BGRA) uint8 np.ndarray
+        Returns an (N, 3, H, W) float32 view of this thread's buffer; it is overwritten
+        by the next call from the same thread.
+        """
+        out = self._buffer(len(crops))
+        for i, crop in enumerate(crops):
+            if crop.ndim == 2:
+                crop = cv2.cvtColor(crop, cv2.COLOR_GRAY2BGR)
+            elif crop.shape[2] == 4:
+                crop = cv2.cvtColor(crop, cv2.COLOR_BGRA2BGR)
+            resized = self._resize(crop)
+            for c in range(3):
+                np.take(self.lut[c], resized[:, :, 2 - c], out=out[i, c])
+        return out
+
+    def __call__(self, crops):
+        """Drop-in for processor(images=..., return_tensors="pt").pixel_values."""
+        import torch
+        return torch.from_numpy(self.fill(crops))
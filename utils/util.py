@@ -1,20 +1,40 @@
 import os
+import threading
 import cv2
 from datetime import datetime
 from collections import defaultdict, Counter
-import cv2
 from PIL import Image
 import torch
 from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+from utils.image_store import image_store
+from utils.plate_grammar import normalize as normalize_plate
+from utils.trocr_fast import TrOCRPreprocessor
+from utils.ocr_cache import ocr_cache, crop_hash
 
 # ----------------------------
 # Initialize TrOCR
 # ----------------------------
-processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-printed")
-model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-printed")
+# Loaded on first use, so importing this module (e.g. for save_detected_car or with a
+# stub OCR backend) does not pull the weights.
+processor = None
+model = None
+preprocess = None
+_trocr_lock = threading.Lock()
+# OpenCV/NumPy preprocessing instead of PIL + TrOCRProcessor (utils/trocr_fast.py)
+TROCR_FAST_PREPROCESS = os.getenv("TROCR_FAST_PREPROCESS", "1") == "1"
 
 device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
-model.to(device)
+
+
+def load_trocr():
+    global processor, model, preprocess
+    with _trocr_lock:
+        if model is None:
+            processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-printed")
+            preprocess = TrOCRPreprocessor.from_processor(processor)
+            model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-printed")
+            model.to(device)
+    return processor, model
 
 
 # ----------------------------
@@ -22,39 +42,36 @@ model.to(device)
 # ----------------------------
 def correct_plate_confusion(plate: str) -> str:
     """
-    Corrects common OCR misreads in Indian-style plates.
+    Canonical plate per utils.plate_grammar (confusions fixed position by position);
+    the cleaned read when it fits no known format.
     """
-    plate = plate.upper()
-
-    # State code (first 2 letters)
-    if len(plate) >= 2:
-        plate = plate[:2].replace("0", "O").replace("1", "I").replace("5", "S") + plate[2:]
-
-    # District code (next 2 digits)
-    if len(plate) >= 4:
-        plate = plate[:2] + plate[2:4].replace("O", "0").replace("I", "1") + plate[4:]
-
-    # Series letters (next 1-2 letters)
-    if len(plate) >= 6:
-        plate = plate[:4] + plate[4:6].replace("0", "O").replace("1", "I").replace("5", "S") + plate[6:]
-
-    # Numeric part (last 4 digits)
-    if len(plate) >= 10:
-        plate = plate[:-4] + plate[-4:].replace("O", "0").replace("I", "1").replace("S", "5").replace("B", "8")
-
-    return plate
+    return normalize_plate(plate).plate
 
 
 # ----------------------------
 # OCR function
 # ----------------------------
+def trocr_pixel_values(imgs):
+    """BGR crops -> TrOCR pixel_values tensor (N, 3, 384, 384)."""
+    if TROCR_FAST_PREPROCESS:
+        return preprocess(imgs)
+    pil_imgs = [Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)) for img in imgs]
+    return processor(images=pil_imgs, return_tensors="pt").pixel_values
+
+
 def ocr_plate(img):
     """
     img: np.ndarray cropped plate image (BGR)
     Returns: (final_plate, raw_text)
+    Crops seen recently (same perceptual hash) are answered from ocr_cache without the model.
     """
-    pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-    pixel_values = processor(images=pil_img, return_tensors="pt").pixel_values.to(device)
+    key = crop_hash(img)
+    cached = ocr_cache.get(key)
+    if cached is not None:
+        return cached
+
+    processor, model = load_trocr()
+    pixel_values = trocr_pixel_values([img]).to(device)
     generated_ids = model.generate(pixel_values, max_new_tokens=20)
     raw_text = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
 
@@ -64,13 +81,9 @@ def ocr_plate(img):
     # Apply confusion correction
     corrected = correct_plate_confusion(cleaned)
 
+    ocr_cache.put(key, (corrected, raw_text))
     return corrected, raw_text
 # Save vehicle crop to file
 def save_detected_car(frame, plate_number, location):
-    img_dir = os.path.join("database", "detections")
-    os.makedirs(img_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{plate_number}_{timestamp}.jpg"
-    filepath = os.path.join(img_dir, filename)
-    cv2.imwrite(filepath, frame)
-    return filepath
+    """Queue the crop on the shared image store; returns the path it will be written to."""
+    return image_store.put(frame, plate_number, location)
@@ -1,65 +1,242 @@
+import os
 import threading
+import time
 import cv2
 import numpy as np
-from queue import Queue
 
 from sympy import false
 from ultralytics import YOLO
-from sort.sort import Sort
+from sort.sort import TRACKER_BACKENDS
 from utils.util import save_detected_car
-from utils.db_helper import add_detection
+from utils.event_policy import DetectionEventPolicy, NEW, MERGE
+from utils.plate_dedup import plate_dedup, MERGED, DUPLICATE
+from utils.event_bus import DetectionEvent
+from utils.frame_selector import BestFrameBuffer, score_plate_crop
+from utils.plate_vote import PlateVoteAccumulator
+from utils.plate_grammar import normalize, normalize_many
+from utils.sources import open_capture, is_live_source
+from utils.metrics import metrics
+from utils.tracing import DetectionTrace
+from utils.profiler import profiler
+from utils.keyframe import FlowRefiner, KEYFRAME_INTERVAL, KEYFRAME_REFINE, KEYFRAME_MIN_CONFIDENCE
 
 class CameraWorker(threading.Thread):
-    def __init__(self, camera, plate_model_path, ocr_func, notify_queue):
-        super().__init__()
+    def __init__(self, camera, plate_model_path, ocr_func, bus, event_policy=None,
+                 top_k=3, confirm_after=5, vehicle_model=None, plate_model=None, realtime=False,
+                 keyframe_interval=None, keyframe_refine=None):
+        """
+        vehicle_model / plate_model: callables with the ultralytics YOLO interface; loaded
+        from weights when not given (benchmarks pass stubs here)
+        realtime: pace recorded sources (video files, image directories) at their frame rate
+        keyframe_interval / keyframe_refine: run the vehicle detector every Nth frame and
+        propagate the tracks in between (utils/keyframe.py); default from the environment
+        """
+        super().__init__(name=f"camera-{camera.getLocation()}")
         self.camera = camera
-        self.plate_model = YOLO(plate_model_path,verbose=false)
+        self.plate_model = plate_model or YOLO(plate_model_path,verbose=false)
         self.ocr_func = ocr_func
-        self.notify_queue = notify_queue
-        self.vehicle_model = YOLO("weights/yolov8n.pt",verbose=false)  # pre-trained YOLOv8n
-        self.tracker = Sort()
+        self.bus = bus
+        self.vehicle_model = vehicle_model or YOLO("weights/yolov8n.pt",verbose=false)  # pre-trained YOLOv8n
+        self.realtime = realtime
+        self.retired = []
+        tracker_cls = TRACKER_BACKENDS[os.getenv("TRACKER_BACKEND", "filterpy")]
+        self.tracker = tracker_cls(on_track_deleted=self.retired.append,
+                                   association=os.getenv("TRACKER_ASSOCIATION", "dense"))
+        # OCR already runs on a per-vehicle consensus, so one read confirms a plate
+        self.event_policy = event_policy or DetectionEventPolicy(min_confirmations=1)
+        self.frames = BestFrameBuffer(k=top_k, confirm_after=confirm_after)
+        self.frame_idx = 0
+        self.keyframe_interval = max(1, keyframe_interval or KEYFRAME_INTERVAL)
+        refine = keyframe_refine or KEYFRAME_REFINE
+        self.flow = FlowRefiner() if self.keyframe_interval > 1 and refine == "flow" else None
+        self.since_keyframe = self.keyframe_interval - 1  # the first frame is a keyframe
+        self.frame_ts = self.track_ts = None  # wall-clock capture / tracking time of the current frame
         self.running = True
 
+    def open_capture(self):
+        return open_capture(self.camera.getCamera(), realtime=self.realtime)
+
     def run(self):
-        cap = cv2.VideoCapture(self.camera.getCamera())
+        live = is_live_source(self.camera.getCamera())
+        loc = self.camera.getLocation()
+        cap = self.open_capture()
+        fps = self.configure_tracker_clock(cap)
         while self.running:
-            ret, frame = cap.read()
+            profiler.checkpoint()
+            with metrics.time("capture", loc):
+                ret, frame = cap.read()
             if not ret:
-                continue
-
-            # Detect vehicles
-            results = self.vehicle_model(frame)
-            dets = []
-            for det in results[0].boxes:
-                cls_id = int(det.cls[0])
-                if cls_id in [2,3,5,7]:  # car, truck, bus, motorcycle
-                    x1,y1,x2,y2 = map(int, det.xyxy[0])
-                    dets.append([x1,y1,x2,y2,1.0])
+                if live:
+                    metrics.inc("dropped_frames", loc)
+                    continue
+                break  # end of a recorded source
+            self.frame_idx += 1
+            self.frame_ts = time.time()
+            # live frames are stamped on arrival, recorded ones with their position in the media
+            stamp = self.frame_ts if live else self.frame_idx / fps
+            metrics.inc("frames", loc)
+            frame_start = time.perf_counter()
 
-            if len(dets)==0:
-                continue
+            if self.flow is not None:
+                self.flow.next_frame(frame)
+            if self.keyframe_due():
+                tracked_objs = self.detect_and_track(frame, loc, stamp)
+                self.since_keyframe = 0
+                if self.flow is not None:
+                    self.flow.reset()
+            else:
+                # Between keyframes SORT carries the tracks on its motion model. propagate()
+                # skips the refiner when no track is reported, so start from full confidence
+                if self.flow is not None:
+                    self.flow.reset()
+                with metrics.time("propagate", loc):
+                    tracked_objs = self.tracker.propagate(self.flow, timestamp=stamp)
+                self.since_keyframe += 1
+                metrics.inc("propagated_frames", loc)
+            if self.flow is not None:
+                self.flow.observe(tracked_objs)
+            self.track_ts = time.time()
 
-            # Update SORT tracker
-            dets_np = np.array(dets)
-            tracked_objs = self.tracker.update(dets_np)
+            # OCR the leftovers of tracks SORT just dropped
+            while self.retired:
+                self.read_track(self.retired.pop(), retired=True)
 
             for x1,y1,x2,y2,track_id in tracked_objs:
-                vehicle_crop = frame[int(y1):int(y2), int(x1):int(x2)]
+                track_id = int(track_id)
+                # predicted boxes can leave the frame; negative indexes would wrap around
+                x1, y1 = max(0, int(x1)), max(0, int(y1))
+                vehicle_crop = frame[y1:int(y2), x1:int(x2)]
+                if vehicle_crop.size == 0:
+                    continue
 
-                # Detect plate
-                plate_results = self.plate_model(vehicle_crop)
+                # Detect plate and keep only the best crops of this vehicle
+                with metrics.time("plate_detect", loc):
+                    plate_results = self.plate_model(vehicle_crop)
                 for plate_det in plate_results[0].boxes:
                     px1,py1,px2,py2 = map(int, plate_det.xyxy[0])
                     plate_crop = vehicle_crop[py1:py2, px1:px2]
-                    plate_number = self.ocr_func(plate_crop)
+                    score = score_plate_crop(plate_crop, float(plate_det.conf[0]))
+                    if score <= 0:
+                        continue
+                    metrics.inc("plate_candidates", loc)
+                    if self.frames.add(track_id, score, plate_crop, vehicle_crop, self.frame_idx, self.frame_ts):
+                        self.read_track(track_id)
 
-                    img_path = save_detected_car(vehicle_crop, plate_number, self.camera.getLocation())
-                    add_detection(plate_number, self.camera.getLocation(), img_path)
-
-                    # Send to notification queue
-                    self.notify_queue.put((plate_number, img_path, self.camera.getLocation()))
+            metrics.observe("frame", loc, time.perf_counter() - frame_start)
 
         cap.release()
+        self.flush()
+
+    def keyframe_due(self):
+        """Run the detector every keyframe_interval frames, or sooner when optical flow loses the tracks."""
+        if self.since_keyframe >= self.keyframe_interval - 1:
+            return True
+        return self.flow is not None and self.flow.confidence < KEYFRAME_MIN_CONFIDENCE
+
+    def configure_tracker_clock(self, cap):
+        """
+        Run SORT on timestamps, so dropped and skipped frames keep velocities right. Tracks
+        expire after max_age missed keyframes and at least TRACK_MAX_AGE_SECONDS (default:
+        max_age keyframes at the nominal rate), so a feed that falls behind does not cut
+        them sooner. Returns the fps.
+        """
+        fps = cap.get(cv2.CAP_PROP_FPS) if hasattr(cap, "get") else 0
+        fps = fps if fps and 0 < fps < 1000 else 25.0
+        self.tracker.frame_interval = 1.0 / fps
+        self.tracker.max_age_seconds = (float(os.getenv("TRACK_MAX_AGE_SECONDS", "0"))
+                                        or (self.tracker.max_age + 0.5) * self.keyframe_interval / fps)
+        return fps
+
+    def detect_and_track(self, frame, loc, stamp=None):
+        # Detect vehicles
+        with metrics.time("vehicle_detect", loc):
+            results = self.vehicle_model(frame)
+        dets = []
+        for det in results[0].boxes:
+            cls_id = int(det.cls[0])
+            if cls_id in [2,3,5,7]:  # car, truck, bus, motorcycle
+                x1,y1,x2,y2 = map(int, det.xyxy[0])
+                dets.append([x1,y1,x2,y2,1.0])
+
+        # Update SORT tracker (every keyframe, so lost tracks age out)
+        dets_np = np.array(dets) if dets else np.empty((0, 5))
+        with metrics.time("track", loc):
+            return self.tracker.update(dets_np, timestamp=stamp)
+
+    def flush(self):
+        """Read out every track that still has buffered crops (end of stream / shutdown)."""
+        for track_id in list(self.frames.tracks):
+            self.read_track(track_id, retired=True)
+
+    def read_track(self, track_id, retired=False):
+        """
+        OCR the top-K crops of a track that were not read yet and emit the consensus plate.
+        Called when a track is confirmed, and once more when it is retired.
+        """
+        try:
+            self.emit_consensus(track_id)
+        finally:
+            if retired:
+                self.frames.discard(track_id)
+                self.event_policy.forget_track(track_id)
+
+    def emit_consensus(self, track_id):
+        location = self.camera.getLocation()
+        # the latency clock starts at the track's first plate sighting, not at the frame
+        # that made it due: waiting for confirm_after sightings is part of the delay
+        first_seen = self.frames.first_seen(track_id)
+        trace = DetectionTrace(location, capture_ts=first_seen if first_seen is not None else self.frame_ts)
+        trace.stamp("buffer", self.frame_ts)
+        trace.stamp("track", self.track_ts)
+        for entry in self.frames.pending(track_id):
+            with metrics.time("ocr", location):
+                entry["read"], _ = self.ocr_func(entry["plate"])
+            metrics.inc("ocr_calls", location)
+
+        entries = [e for e in self.frames.best(track_id) if e["read"]]
+        if not entries:
+            return
+
+        # Only reads that parse as a plate take part in the vote
+        valid = [(e, m) for e, m in zip(entries, normalize_many([e["read"] for e in entries])) if m.valid]
+        if not valid:
+            metrics.inc("plates_rejected", location)
+            return
+
+        # Quality-weighted positional vote over the K reads
+        votes = PlateVoteAccumulator()
+        for e, m in valid:
+            votes.add(m.plate, e["score"] * m.score)
+        plate_number = votes.vote()
+        if not normalize(plate_number).valid:
+            plate_number = valid[0][1].plate  # the vote mixed reads of different formats
+        best = next((e for e, m in valid if m.plate == plate_number), valid[0][0])
+
+        action = self.event_policy.observe(track_id, plate_number, location, best["score"])
+        if action is None:
+            return
+        trace.stamp("ocr")
+
+        # Cross-camera dedup: a car another camera of the group just reported is merged into
+        # that event instead of getting its own image, row and alert
+        sighting = None
+        if action == NEW:
+            sighting, status = plate_dedup.observe(plate_number, location)
+            if status == DUPLICATE:
+                return
+            if status == MERGED:
+                metrics.inc("events_merged", location)
+                self.bus.publish(DetectionEvent(plate_number, location, None, MERGE, best["score"], track_id,
+                                                sighting=sighting))
+                return
+
+        with metrics.time("save_image", location):
+            img_path = save_detected_car(best["vehicle"], plate_number, location)
+        trace.stamp("save_image")
+        metrics.inc("events_" + action, location)
+        # storing and notifying happen on the event bus sinks
+        self.bus.publish(DetectionEvent(plate_number, location, img_path, action, best["score"], track_id,
+                                        trace=trace, sighting=sighting))
 
     def stop(self):
         self.running = False
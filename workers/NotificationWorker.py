@@ -1,30 +1,251 @@
 import threading
 import asyncio
-from utils.db_helper import get_user_chat_ids_for_plate
+import time
+from contextlib import ExitStack
+from telegram import InputMediaPhoto
+from utils.db_helper import get_subscribers_for_plate, add_trace
+from utils.metrics import metrics
+from utils.image_store import image_store
+from utils.profiler import profiler
+
+IDLE_POLL = 0.5  # seconds; notify() wakes the worker earlier
+
+# ----------------------------
+# Digest mode
+# ----------------------------
+# A chat with a digest window (/digest <seconds>, users.digest_seconds) does not get one
+# photo per detection. Its alerts are held from the first one until the window has passed,
+# or until a full album is collected, and then go out as one send_media_group with a
+# caption listing every plate. The outbox row of a held detection stays claimed until all
+# of its chats have been sent to, so a crash still re-delivers it (at-least-once).
+MAX_MEDIA_GROUP = 10      # Telegram's limit of photos per album
+MAX_CAPTION = 1024        # Telegram's limit for a photo / album caption
+
+
+class DigestItem:
+    __slots__ = ("detect_id", "plate_number", "location", "img_path", "locations", "detected_at")
+
+    def __init__(self, detect_id, plate_number, location, img_path, locations, detected_at=None):
+        self.detect_id = detect_id
+        self.plate_number = plate_number
+        self.location = location
+        self.img_path = img_path
+        self.locations = locations or location
+        self.detected_at = detected_at if detected_at is not None else time.time()
+
+
+class PendingRow:
+    """A claimed outbox row whose delivery waits for one or more digests."""
+    __slots__ = ("attempts", "waiting", "ok", "delivered", "trace")
+
+    def __init__(self, attempts, waiting, ok, delivered, trace):
+        self.attempts = attempts
+        self.waiting = waiting  # chat ids whose digest still holds the detection
+        self.ok = ok
+        self.delivered = delivered
+        self.trace = trace
+
 
 class NotificationWorker(threading.Thread):
-    def __init__(self, notify_queue, bot):
-        super().__init__()
-        self.queue = notify_queue
+    """Delivers the detections outbox (utils.outbox) to the subscribed chats."""
+
+    def __init__(self, outbox, bot):
+        super().__init__(name="notifier")
+        self.outbox = outbox
         self.bot = bot
         self.running = True
+        self.digests = {}   # chat_id -> (due monotonic time, [DigestItem])
+        self.pending = {}   # detect_id -> PendingRow
 
     def run(self):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
+        recovered = self.outbox.recover()
+        if recovered:
+            print(f"Outbox: re-queued {recovered} notifications left in flight")
+
         while self.running:
-            if not self.queue.empty():
-                plate_number, img_path, location = self.queue.get()
-                chat_ids = get_user_chat_ids_for_plate(plate_number)
-                for chat_id in chat_ids:
+            profiler.checkpoint()
+            try:
+                rows = self.outbox.claim()
+            except Exception as e:
+                print("Outbox DB Error:", e)
+                time.sleep(IDLE_POLL)
+                continue
+
+            done, failed = [], []
+            for detect_id, plate_number, location, img_path, attempts, locations, detected_at in rows:
+                ok = self.deliver(loop, detect_id, plate_number, location, img_path, locations, attempts,
+                                  detected_at)
+                if ok:
+                    done.append(detect_id)
+                elif ok is not None:
+                    failed.append((detect_id, attempts))
+            self.flush_digests(loop, done, failed)
+            self.finish(done, failed)
+
+            if not rows:
+                due = self.outbox.next_due_in()
+                waits = [IDLE_POLL, due, self.next_digest_in()]
+                self.outbox.wait(min(w for w in waits if w is not None))
+
+        # send what the digests still hold instead of leaving it to the next start's recover()
+        done, failed = [], []
+        self.flush_digests(loop, done, failed, force=True)
+        self.finish(done, failed)
+
+    def finish(self, done, failed):
+        self.outbox.mark_done(done)
+        self.outbox.mark_failed(failed)
+        metrics.inc("notification_retries", n=len(failed))
+
+    def deliver(self, loop, detect_id, plate_number, location, img_path, locations=None, attempts=0,
+                detected_at=None):
+        """
+        Send one detection to every subscribed chat. False means retry later, None that
+        some chats hold it in a digest (flush_digests settles the row).
+        locations: every camera of a merged cross-camera sighting seen before delivery
+        detected_at: epoch seconds of the detections row, shown in digests
+        """
+        trace = self.outbox.trace_for(detect_id)
+        if trace is not None:
+            trace.stamp("dequeue")
+        with metrics.time("lookup_chats", location):
+            subscribers = get_subscribers_for_plate(plate_number)
+        if trace is not None:
+            trace.stamp("lookup_chats")
+
+        ok = True
+        delivered = False
+        waiting = set()
+        for chat_id, digest_seconds in subscribers:
+            if digest_seconds > 0:
+                self.add_to_digest(chat_id, digest_seconds,
+                                   DigestItem(detect_id, plate_number, location, img_path, locations, detected_at))
+                waiting.add(chat_id)
+                continue
+            try:
+                with metrics.time("send_photo", location), image_store.open(img_path) as photo:
                     loop.run_until_complete(
                         self.bot.send_photo(
                             chat_id=chat_id,
-                            photo=open(img_path,"rb"),
-                            caption=f"🚨 Plate {plate_number} detected at {location}"
+                            photo=photo,
+                            caption=f"🚨 Plate {plate_number} detected at {locations or location}"
                         )
                     )
+                metrics.inc("notifications_sent", location)
+                delivered = True
+            except Exception as e:
+                # at-least-once: a retry re-sends to every chat of this detection
+                ok = False
+                metrics.inc("notification_errors", location)
+                print("Notification error:", e)
+
+        if waiting:
+            self.pending[detect_id] = PendingRow(attempts, waiting, ok, delivered, trace)
+            return None
+        self.record_trace(trace, delivered)
+        return ok
+
+    def record_trace(self, trace, delivered):
+        if trace is None:
+            return
+        if delivered:
+            trace.stamp("send_photo")
+        if trace.sampled:
+            try:
+                add_trace(trace, delivered_ts=time.time() if delivered else None)
+            except Exception as e:
+                print("Trace DB Error:", e)
+
+    # ----------------------------
+    # Digests
+    # ----------------------------
+    def add_to_digest(self, chat_id, digest_seconds, item):
+        due, items = self.digests.get(chat_id, (time.monotonic() + digest_seconds, []))
+        items.append(item)
+        self.digests[chat_id] = (due, items)
+
+    def next_digest_in(self):
+        """Seconds until the earliest digest is due (None when none is open)."""
+        if not self.digests:
+            return None
+        return max(0.0, min(due for due, _ in self.digests.values()) - time.monotonic())
+
+    def flush_digests(self, loop, done, failed, force=False):
+        """Send the digests that are due or full; settled rows go to done / failed."""
+        now = time.monotonic()
+        for chat_id, (due, items) in list(self.digests.items()):
+            if not force and due > now and len(items) < MAX_MEDIA_GROUP:
+                continue
+            del self.digests[chat_id]
+            for i in range(0, len(items), MAX_MEDIA_GROUP):
+                batch = items[i:i + MAX_MEDIA_GROUP]
+                sent = self.send_digest(loop, chat_id, batch)
+                for item in batch:
+                    row = self.pending.get(item.detect_id)
+                    if row is None:
+                        continue
+                    row.waiting.discard(chat_id)
+                    row.ok = row.ok and sent
+                    row.delivered = row.delivered or sent
+                    if row.waiting:
+                        continue
+                    del self.pending[item.detect_id]
+                    self.record_trace(row.trace, row.delivered)
+                    if row.ok:
+                        done.append(item.detect_id)
+                    else:
+                        failed.append((item.detect_id, row.attempts))
+
+    def send_digest(self, loop, chat_id, items):
+        """
+        One album (2-10 photos) or a single photo for the digest's items. Items whose image
+        cannot be opened are still listed in the caption; with no image at all the digest
+        is sent as text. False means retry later.
+        """
+        lines = []
+        if len(items) > 1:
+            lines.append(f"🚨 {len(items)} detections:")
+        try:
+            with metrics.time("send_digest"), ExitStack() as stack:
+                photos = []
+                for item in items:
+                    seen = time.strftime("%H:%M:%S", time.localtime(item.detected_at))
+                    try:
+                        photos.append(stack.enter_context(image_store.open(item.img_path)))
+                        note = ""
+                    except Exception as e:
+                        metrics.inc("notification_missing_images", item.location)
+                        print(f"Digest: no image for detection {item.detect_id}:", e)
+                        note = " (no photo)"
+                    if len(items) == 1:
+                        lines.append(f"🚨 Plate {item.plate_number} detected at {item.locations} ({seen}){note}")
+                    else:
+                        lines.append(f"• {item.plate_number} at {item.locations} ({seen}){note}")
+                caption = "\n".join(lines)
+                if len(caption) > MAX_CAPTION:
+                    caption = caption[:MAX_CAPTION - 1] + "…"
+
+                if not photos:
+                    request = self.bot.send_message(chat_id=chat_id, text=caption)
+                elif len(photos) == 1:
+                    request = self.bot.send_photo(chat_id=chat_id, photo=photos[0], caption=caption)
+                else:
+                    media = [InputMediaPhoto(photo, caption=caption if i == 0 else None)
+                             for i, photo in enumerate(photos)]
+                    request = self.bot.send_media_group(chat_id=chat_id, media=media)
+                loop.run_until_complete(request)
+        except Exception as e:
+            for item in items:
+                metrics.inc("notification_errors", item.location)
+            print("Digest notification error:", e)
+            return False
+        metrics.inc("notification_digests")
+        for item in items:
+            metrics.inc("notifications_sent", item.location)
+        return True
 
     def stop(self):
         self.running = False
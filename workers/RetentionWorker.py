@@ -0,0 +1,43 @@
+import os
+import threading
+import time
+from utils.db_helper import DB_PATH
+from utils.metrics import metrics
+from utils.retention import run_retention
+
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "6"))
+RETENTION_NICE = 10
+
+class RetentionWorker(threading.Thread):
+    """Runs the retention pass every RETENTION_INTERVAL_HOURS at lowered CPU priority."""
+
+    def __init__(self, db_path=DB_PATH, interval_hours=RETENTION_INTERVAL_HOURS, first_run_delay=300):
+        super().__init__(name="retention", daemon=True)
+        self.db_path = db_path
+        self.interval = interval_hours * 3600
+        self.first_run_delay = first_run_delay
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            # Linux applies the nice value to this thread only
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), RETENTION_NICE)
+        except (AttributeError, OSError):
+            pass
+
+        delay = self.first_run_delay
+        while not self.stopped.wait(delay):
+            started = time.perf_counter()
+            try:
+                stats = run_retention(self.db_path)
+                print("Retention pass:", stats)
+                for key in ("rows_deleted", "rows_archived", "images_deleted", "orphans_deleted"):
+                    metrics.inc("retention_" + key, n=stats[key])
+            except Exception as e:
+                metrics.inc("retention_errors")
+                print("Retention error:", e)
+            metrics.observe("retention_pass", "", time.perf_counter() - started)
+            delay = self.interval
+
+    def stop(self):
+        self.stopped.set()